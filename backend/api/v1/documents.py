@@ -0,0 +1,120 @@
+import uuid
+from datetime import datetime
+from pathlib import Path
+from typing import List, Optional
+from fastapi import APIRouter, Depends, File, HTTPException, UploadFile, status
+from pydantic import BaseModel
+from backend.api.v1.deps import get_current_user
+from backend.core.config import settings
+from backend.crud import document_crud, ingestion_job_crud
+from backend.schemas.nosql.document_metadata import DocumentMetadata
+from backend.schemas.sql.user import User
+from backend.services.ingestion_jobs import IngestionQueueFull, UploadTooLarge, ingestion_jobs, save_upload, upload_path
+
+router = APIRouter()
+
+ALLOWED_SUFFIXES = (".docx",)
+
+# Schemas
+class IngestionJobStatus(BaseModel):
+    job_id: str
+    status: str  # reserved | queued | running | completed | completed_with_errors | failed
+    files: List[str]
+    documents_total: int = 0
+    documents_done: int = 0
+    documents_skipped: int = 0
+    chunks_written: int = 0
+    chunks_reused: int = 0
+    chunks_deleted: int = 0
+    chunks_per_sec: float = 0.0
+    elapsed_s: float = 0.0
+    errors: List[str] = []
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+
+def _job_status(job: dict) -> IngestionJobStatus:
+    progress = job.get("progress") or {}
+    return IngestionJobStatus(
+        job_id=str(job["_id"]),
+        status=job["status"],
+        files=[f["name"] for f in job["files"]],
+        documents_total=progress.get("documents_total", len(job["files"])),
+        documents_done=progress.get("documents_done", 0),
+        documents_skipped=progress.get("documents_skipped", 0),
+        chunks_written=progress.get("chunks_written", 0),
+        chunks_reused=progress.get("chunks_reused", 0),
+        chunks_deleted=progress.get("chunks_deleted", 0),
+        chunks_per_sec=progress.get("chunks_per_sec", 0.0),
+        elapsed_s=progress.get("elapsed_s", 0.0),
+        errors=job.get("errors", []),
+        created_at=job["created_at"],
+        started_at=job.get("started_at"),
+        finished_at=job.get("finished_at"),
+    )
+
+# Endpoints
+
+@router.post("", response_model=IngestionJobStatus, status_code=status.HTTP_202_ACCEPTED)
+async def upload_documents(
+    files: List[UploadFile] = File(...),
+    current_user: User = Depends(get_current_user)
+):
+    """Stores the uploaded files and queues them for ingestion into the caller's company. Poll the job for progress."""
+    names = set()
+    for upload in files:
+        if not (upload.filename or "").lower().endswith(ALLOWED_SUFFIXES):
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Unsupported file type: {upload.filename}")
+        name = Path(upload.filename).name # type: ignore
+        if name in names:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Duplicate file name: {name}")
+        names.add(name)
+
+    # Take the queue slot before storing anything. The request body is already spooled to
+    # temporary files by now; a full queue only saves copying them into the upload directory.
+    try:
+        reservation = await ingestion_jobs.reserve(current_user.company_id, current_user.id) # type: ignore
+    except IngestionQueueFull as e:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=str(e))
+
+    upload_id = uuid.uuid4().hex
+    paths = []
+    try:
+        for upload in files:
+            path = upload_path(current_user.company_id, upload_id, upload.filename) # type: ignore
+            try:
+                await save_upload(upload, path, settings.INGEST_MAX_UPLOAD_MB * 1024 * 1024)
+            except UploadTooLarge as e:
+                raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail=str(e))
+            finally:
+                await upload.close()
+            paths.append(path)
+    except BaseException:
+        await ingestion_jobs.cancel(reservation)
+        raise
+
+    try:
+        job = await ingestion_jobs.submit(reservation, paths)
+    except IngestionQueueFull as e:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=str(e))
+    return _job_status(job)
+
+
+@router.get("", response_model=List[DocumentMetadata])
+async def list_documents(current_user: User = Depends(get_current_user)):
+    return await document_crud.list_documents(current_user.company_id) # type: ignore
+
+
+@router.get("/jobs", response_model=List[IngestionJobStatus])
+async def list_jobs(limit: int = 20, current_user: User = Depends(get_current_user)):
+    jobs = await ingestion_job_crud.list_jobs(current_user.company_id, min(limit, 100)) # type: ignore
+    return [_job_status(job) for job in jobs]
+
+
+@router.get("/jobs/{job_id}", response_model=IngestionJobStatus)
+async def get_job(job_id: str, current_user: User = Depends(get_current_user)):
+    job = await ingestion_job_crud.get_job(job_id, current_user.company_id) # type: ignore
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return _job_status(job)
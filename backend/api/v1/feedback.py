@@ -1,9 +1,9 @@
-from fastapi import APIRouter, HTTPException, BackgroundTasks, Depends
+from fastapi import APIRouter, HTTPException, BackgroundTasks
 from backend.crud import ai_crud
 from backend.services.feedback import process_ai_feedback
+from backend.services.feedback_aggregator import feedback_aggregator
+from backend.core.config import settings
 from pydantic import BaseModel, Field
-from backend.core.database import get_sql_db
-from sqlalchemy.orm import Session
 
 router = APIRouter()
 
@@ -12,12 +12,15 @@ class FeedbackSubmit(BaseModel):
     rating: int = Field(ge=1, le=5)
 
 @router.post("/submit")
-async def submit_feedback(data: FeedbackSubmit, background_tasks: BackgroundTasks, db_sql: Session = Depends(get_sql_db)):
+async def submit_feedback(data: FeedbackSubmit, background_tasks: BackgroundTasks):
     try:
         await ai_crud.update_event_rating(data.event_id, data.rating)
         
-        background_tasks.add_task(process_ai_feedback,db_sql, data.event_id, data.rating)
-        
+        if settings.FEEDBACK_WRITE_BEHIND:
+            await feedback_aggregator.submit(data.event_id, data.rating)
+            return {"status": "success", "message": "Feedback recorded; AI learning update queued"}
+
+        background_tasks.add_task(process_ai_feedback, data.event_id, data.rating)
         return {"status": "success", "message": "Feedback recorded and AI learning updated"}
     except Exception as e:
         raise HTTPException(status_code=400, detail=f"Feedback failed: {str(e)}")
@@ -1,7 +1,9 @@
+import json
 from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 from backend.api.v1.deps import get_current_user 
-from backend.services.rag_pipeline import run_rag_pipeline
+from backend.services.rag_pipeline import RAGResult, run_rag_pipeline, stream_rag_pipeline
 from backend.crud.ai_crud import has_pending_feedback
 from backend.schemas.sql.user import User 
 
@@ -16,6 +18,7 @@ class PromptResponse(BaseModel):
     response_text: str
     model: str
     feedback_required: bool = True
+    used_cached_answer: bool = False
 
 # Endpoints 
 
@@ -42,5 +45,44 @@ async def submit_prompt(
     "ai_response_id": result.ai_response_id, 
     "response_text": result.response_text,
     "model": result.model,
-    "feedback_required": result.feedback_required
-}
\ No newline at end of file
+    "feedback_required": result.feedback_required,
+    "used_cached_answer": result.used_cached_answer
+}
+
+
+def _sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+@router.post("/submit/stream")
+async def submit_prompt_stream(
+    data: PromptRequest,
+    current_user: User = Depends(get_current_user)
+):
+    """Server-Sent Events: `token` events carry answer text as it is generated, `done` carries the final PromptResponse and the event_id to rate."""
+
+    if await has_pending_feedback(current_user.id): # type: ignore
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN, 
+            detail="Feedback required for previous response before submitting a new prompt."
+        )
+
+    async def event_stream():
+        try:
+            async for item in stream_rag_pipeline(
+                user_id=current_user.id, # type: ignore
+                query=data.prompt_text,
+                company_id=current_user.company_id # type: ignore
+            ):
+                if isinstance(item, RAGResult):
+                    yield _sse("done", {**PromptResponse(**item.model_dump()).model_dump(), "event_id": item.event_id})
+                else:
+                    yield _sse("token", {"text": item})
+        except Exception as e:
+            print(f"Streaming prompt failed: {e}")
+            yield _sse("error", {"detail": "Generation failed"})
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
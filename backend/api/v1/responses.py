@@ -2,6 +2,7 @@ from typing import List, Optional
 from fastapi import APIRouter, HTTPException, Body, status
 from backend.crud import ai_crud
 from backend.schemas.nosql.ai_response import AIResponse
+from backend.services.prompt_index import prompt_index
 
 router = APIRouter()
 
@@ -35,6 +36,7 @@ async def get_response(res_id: str):
 async def create_response(response: AIResponse):
     
     new_id = await ai_crud.create_ai_response(response)
+    await prompt_index.register(response.company_id, str(new_id), [response.canonical_prompt, *response.aliases])
 
     created_res = await ai_crud.get_ai_response_by_id(str(new_id))
     return created_res
@@ -50,8 +52,13 @@ async def update_response_content(res_id: str, update_data: dict = Body(...)):
     clean_data = {k: v for k, v in update_data.items() if k not in protected_fields}
     
     await ai_crud.update_ai_response_fields(res_id, clean_data)
+    updated = await ai_crud.get_ai_response_by_id(res_id)
+
+    if "canonical_prompt" in clean_data or "aliases" in clean_data:
+        await prompt_index.remove_response(res_id)
+        await prompt_index.register(updated["company_id"], res_id, [updated["canonical_prompt"], *updated.get("aliases", [])]) # type: ignore
     
-    return await ai_crud.get_ai_response_by_id(res_id)
+    return updated
 
 @router.patch("/{res_id}/status")
 async def patch_status(res_id: str, status: str = Body(...,embed=True ,pattern="^(candidate|canonical|quarantine)$")):
@@ -68,4 +75,5 @@ async def delete_response(res_id: str):
         raise HTTPException(status_code=404, detail="Response not found")
 
     await ai_crud.delete_ai_response_record(res_id)
+    await prompt_index.remove_response(res_id)
     return None
\ No newline at end of file
@@ -0,0 +1,175 @@
+"""
+Checks `DocumentProcessor.chunk_text` against the previous chunker and times
+both on the handbooks in backend/storage/raw_docs.
+
+    python -m backend.benchmarks.chunker_bench --repeat 5 --output chunker.json
+
+With overlap 0 the new chunker must reproduce the previous boundaries
+exactly. With the configured overlap, every chunk must fit in
+CHUNK_SIZE_TOKENS (unless it is a single oversized sentence) and must start
+with the overlap carried over from the chunk before it, measured in tokens,
+unless that overlap would not fit next to its first sentence.
+"""
+import argparse
+import json
+import re
+import time
+from pathlib import Path
+from typing import Callable, List
+
+RAW_DOCS = Path("backend/storage/raw_docs")
+
+
+def legacy_chunk_text(text: str, chunk_size: int, count_tokens: Callable[[str], int]) -> List[str]:
+    """The previous chunker: re-tokenizes the growing chunk for every sentence."""
+    sentences = re.split(r'(?<=[.!?])\s+', text)
+
+    chunk_texts = []
+    current_chunk = ""
+
+    for sentence in sentences:
+        potential = f"{current_chunk} {sentence}".strip() if current_chunk else sentence
+
+        if count_tokens(potential) > chunk_size:
+            if current_chunk:
+                chunk_texts.append(current_chunk)
+            current_chunk = sentence
+        else:
+            current_chunk = potential
+
+    if current_chunk:
+        chunk_texts.append(current_chunk)
+    return chunk_texts
+
+
+def best_of(repeat: int, fn: Callable[[], List[str]]) -> tuple[float, List[str]]:
+    best, result = float("inf"), []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def first_difference(a: List[str], b: List[str]) -> int | None:
+    for i, (x, y) in enumerate(zip(a, b)):
+        if x != y:
+            return i
+    return None if len(a) == len(b) else min(len(a), len(b))
+
+
+def shared_text(left: str, right: str) -> str:
+    """The longest suffix of `left` that is also a prefix of `right`."""
+    for size in range(min(len(left), len(right)), 0, -1):
+        if left.endswith(right[:size]):
+            return right[:size]
+    return ""
+
+
+def expected_overlap(chunk: str, overlap: int, count_tokens: Callable[[str], int], splitter) -> int:
+    """
+    Tokens the chunker carries over from `chunk` into the next one: its
+    trailing whole sentences that fit in `overlap`, otherwise `overlap`
+    tokens from the end of its last sentence.
+    """
+    specials = count_tokens("")
+    tokens = 0
+    for start, end in reversed(splitter(chunk)):
+        count = count_tokens(chunk[start:end]) - specials
+        if tokens + count > overlap:
+            break
+        tokens += count
+    return tokens or overlap
+
+
+def check_overlapped(chunks: List[str], chunk_size: int, overlap: int, count_tokens: Callable[[str], int], splitter, tolerance: int = 1) -> List[str]:
+    """
+    Every chunk must fit in `chunk_size` unless it is a single sentence, and
+    must share `expected_overlap` tokens (less `tolerance`, for re-tokenizing a
+    fragment) with the chunk before it.
+    """
+    problems = []
+    specials = count_tokens("")
+    for i, chunk in enumerate(chunks):
+        spans = splitter(chunk)
+        if count_tokens(chunk) > chunk_size and len(spans) > 1:
+            problems.append(f"chunk {i} has {count_tokens(chunk)} tokens")
+        if not i:
+            continue
+
+        expected = expected_overlap(chunks[i - 1], overlap, count_tokens, splitter)
+        shared = count_tokens(shared_text(chunks[i - 1], chunk)) - specials
+        if shared >= expected - tolerance:
+            continue
+        # The overlap is dropped when it would not fit next to the chunk's first sentence.
+        first = count_tokens(chunk[spans[0][0]:spans[0][1]]) - specials if spans else 0
+        if expected + first > chunk_size - specials:
+            continue
+        problems.append(f"chunk {i} shares {shared} tokens with chunk {i - 1}, expected {expected}")
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Verify and time the single-pass chunker against the previous one.")
+    parser.add_argument("files", nargs="*", type=Path, help="docx files (default: every handbook in backend/storage/raw_docs)")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--output", help="write the JSON report here as well as to stdout")
+    args = parser.parse_args()
+
+    from backend.services.bi_encoder import count_tokens
+    from backend.services.document_processor import DocumentProcessor
+
+    size = DocumentProcessor.CHUNK_SIZE_TOKENS
+    overlap = DocumentProcessor.CHUNK_OVERLAP_TOKENS
+    files = args.files or sorted(RAW_DOCS.glob("*.docx"))
+
+    documents = []
+    totals = {"legacy_s": 0.0, "single_pass_s": 0.0}
+    for path in files:
+        text = DocumentProcessor.extract_docx_text(str(path))
+        count_tokens(text)  # load the tokenizer outside the timed region
+
+        legacy_s, legacy = best_of(args.repeat, lambda: legacy_chunk_text(text, size, count_tokens))
+        single_s, single = best_of(args.repeat, lambda: DocumentProcessor.chunk_text(text, overlap=0))
+        _, overlapped = best_of(1, lambda: DocumentProcessor.chunk_text(text))
+
+        diff = first_difference(legacy, single)
+        problems = check_overlapped(overlapped, size, overlap, count_tokens, DocumentProcessor._sentence_spans)
+        totals["legacy_s"] += legacy_s
+        totals["single_pass_s"] += single_s
+
+        documents.append({
+            "file": path.name,
+            "chars": len(text),
+            "tokens": count_tokens(text),
+            "chunks": len(legacy),
+            "chunks_with_overlap": len(overlapped),
+            "legacy_s": legacy_s,
+            "single_pass_s": single_s,
+            "speedup": legacy_s / single_s if single_s else None,
+            "boundaries_match": diff is None,
+            "first_mismatch": diff,
+            "overlap_problems": problems,
+        })
+
+    report = {
+        "chunk_size_tokens": size,
+        "chunk_overlap_tokens": overlap,
+        "repeat": args.repeat,
+        "documents": documents,
+        "total_legacy_s": totals["legacy_s"],
+        "total_single_pass_s": totals["single_pass_s"],
+        "total_speedup": totals["legacy_s"] / totals["single_pass_s"] if totals["single_pass_s"] else None,
+        "all_boundaries_match": all(d["boundaries_match"] for d in documents),
+        "all_overlaps_valid": not any(d["overlap_problems"] for d in documents),
+    }
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(output)
+    print(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,561 @@
+"""
+In-memory stand-ins for the benchmark suite: a Mongo database covering the
+operations the pipeline uses (including `$vectorSearch`), a SQL session, and
+deterministic tokenizer / embedding / reranker models.
+
+`install_fakes()` must run before any other `backend.*` module is imported,
+because the CRUD and service modules bind their collections at import time.
+"""
+import asyncio
+import copy
+import hashlib
+import re
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+import numpy as np
+from bson import ObjectId
+
+_WORD = re.compile(r"\w+")
+
+
+# Mongo
+
+def _get(doc: dict, path: str) -> Any:
+    value: Any = doc
+    for part in path.split("."):
+        if not isinstance(value, dict):
+            return None
+        value = value.get(part)
+    return value
+
+
+def _set(doc: dict, path: str, value: Any):
+    *parents, leaf = path.split(".")
+    for part in parents:
+        doc = doc.setdefault(part, {})
+    doc[leaf] = value
+
+
+def _unset(doc: dict, path: str):
+    *parents, leaf = path.split(".")
+    for part in parents:
+        doc = doc.get(part)
+        if not isinstance(doc, dict):
+            return
+    doc.pop(leaf, None)
+
+
+def _matches(doc: dict, query: dict) -> bool:
+    for key, expected in query.items():
+        if key == "$or":
+            if not any(_matches(doc, branch) for branch in expected):
+                return False
+            continue
+        value = _get(doc, key)
+        if isinstance(expected, dict) and any(k.startswith("$") for k in expected):
+            for op, arg in expected.items():
+                if op == "$in" and value not in arg and not (isinstance(value, list) and set(value) & set(arg)):
+                    return False
+                if op == "$nin" and value in arg:
+                    return False
+                if op == "$ne" and value == arg:
+                    return False
+                if op == "$exists" and (key in doc) != arg:
+                    return False
+                if op in ("$gt", "$gte", "$lt", "$lte"):
+                    if value is None:
+                        return False
+                    if op == "$gt" and not value > arg: return False
+                    if op == "$gte" and not value >= arg: return False
+                    if op == "$lt" and not value < arg: return False
+                    if op == "$lte" and not value <= arg: return False
+        elif isinstance(value, list) and not isinstance(expected, list):
+            if expected not in value:
+                return False
+        elif value != expected:
+            return False
+    return True
+
+
+def _project(doc: dict, projection: Optional[dict]) -> dict:
+    if not projection:
+        return copy.deepcopy(doc)
+    if all(not v for k, v in projection.items() if k != "_id"):
+        return {k: copy.deepcopy(v) for k, v in doc.items() if k not in projection or projection[k]}
+    result = {k: copy.deepcopy(doc[k]) for k, v in projection.items() if v and k in doc}
+    if projection.get("_id", 1) and "_id" in doc:
+        result["_id"] = doc["_id"]
+    return result
+
+
+_EXPRESSIONS = {
+    "$add": lambda args: sum(args),
+    "$subtract": lambda args: args[0] - args[1],
+    "$multiply": lambda args: args[0] * args[1],
+    "$divide": lambda args: args[0] / args[1],
+    "$max": lambda args: max(args),
+    "$min": lambda args: min(args),
+    "$eq": lambda args: args[0] == args[1],
+    "$lt": lambda args: args[0] < args[1],
+    "$lte": lambda args: args[0] <= args[1],
+    "$gt": lambda args: args[0] > args[1],
+    "$gte": lambda args: args[0] >= args[1],
+}
+
+
+def _eval(expr: Any, doc: dict) -> Any:
+    """Evaluates the aggregation expressions used by pipeline updates."""
+    if isinstance(expr, str) and expr.startswith("$"):
+        return _get(doc, expr[1:])
+    if isinstance(expr, list):
+        return [_eval(e, doc) for e in expr]
+    if not isinstance(expr, dict) or len(expr) != 1 or not next(iter(expr)).startswith("$"):
+        return expr
+
+    (op, args), = expr.items()
+    if op == "$literal":
+        return args
+    if op == "$ifNull":
+        value = _eval(args[0], doc)
+        return _eval(args[1], doc) if value is None else value
+    if op == "$cond":
+        cond, then, otherwise = (args["if"], args["then"], args["else"]) if isinstance(args, dict) else args
+        return _eval(then if _eval(cond, doc) else otherwise, doc)
+    if op == "$switch":
+        for branch in args["branches"]:
+            if _eval(branch["case"], doc):
+                return _eval(branch["then"], doc)
+        return _eval(args.get("default"), doc)
+    return _EXPRESSIONS[op](_eval(args if isinstance(args, list) else [args], doc))
+
+
+def _apply_pipeline_update(doc: dict, stages: List[dict]):
+    for stage in stages:
+        (op, spec), = stage.items()
+        if op in ("$set", "$addFields"):
+            values = {key: _eval(value, doc) for key, value in spec.items()}
+            doc.update(values)
+        elif op == "$unset":
+            for key in [spec] if isinstance(spec, str) else spec:
+                doc.pop(key, None)
+
+
+def _apply_update(doc: dict, update: dict, inserting: bool = False):
+    if isinstance(update, list):
+        _apply_pipeline_update(doc, update)
+        return
+    for key, value in update.get("$set", {}).items():
+        _set(doc, key, copy.deepcopy(value))
+    if inserting:
+        for key, value in update.get("$setOnInsert", {}).items():
+            doc[key] = copy.deepcopy(value)
+    for key, value in update.get("$inc", {}).items():
+        doc[key] = doc.get(key, 0) + value
+    for key, value in update.get("$addToSet", {}).items():
+        items = value["$each"] if isinstance(value, dict) and "$each" in value else [value]
+        target = doc.setdefault(key, [])
+        for item in items:
+            if item not in target:
+                target.append(item)
+    for key, value in update.get("$push", {}).items():
+        items = value["$each"] if isinstance(value, dict) and "$each" in value else [value]
+        doc.setdefault(key, []).extend(items)
+    for key in update.get("$unset", {}):
+        _unset(doc, key)
+
+
+def _sorted(docs: List[dict], spec: List[Tuple[str, int]]) -> List[dict]:
+    for field, direction in reversed(spec):
+        docs = sorted(docs, key=lambda d: (_get(d, field) is None, _get(d, field)), reverse=direction < 0)
+    return docs
+
+
+class FakeResult:
+    def __init__(self, **fields):
+        self.__dict__.update(fields)
+
+
+class FakeCursor:
+    def __init__(self, docs: List[dict], projection: Optional[dict] = None):
+        self._docs = docs
+        self._projection = projection
+        self._sort: List[Tuple[str, int]] = []
+        self._skip = 0
+        self._limit = 0
+
+    def sort(self, key, direction: int = 1):
+        self._sort = list(key) if isinstance(key, list) else [(key, direction)]
+        return self
+
+    def skip(self, n: int):
+        self._skip = n
+        return self
+
+    def limit(self, n: int):
+        self._limit = n
+        return self
+
+    def _results(self) -> List[dict]:
+        docs = _sorted(self._docs, self._sort) if self._sort else self._docs
+        docs = docs[self._skip:]
+        docs = docs[:self._limit] if self._limit else docs
+        # Projected after sorting, so a cursor can sort on fields it does not return.
+        return [_project(d, self._projection) for d in docs]
+
+    async def to_list(self, length: Optional[int] = None) -> List[dict]:
+        docs = self._results()
+        return docs[:length] if length else docs
+
+    def __aiter__(self):
+        return self._iterate()
+
+    async def _iterate(self):
+        for doc in self._results():
+            yield doc
+
+
+class FakeCollection:
+    def __init__(self, name: str, latency: float):
+        self.name = name
+        self.latency = latency
+        self.docs: Dict[Any, dict] = {}
+
+    async def _io(self):
+        await asyncio.sleep(self.latency)
+
+    def _find(self, query: Optional[dict]) -> List[dict]:
+        return [d for d in self.docs.values() if _matches(d, query or {})]
+
+    async def create_index(self, *args, **kwargs):
+        return "fake_index"
+
+    async def insert_one(self, document: dict):
+        await self._io()
+        doc = copy.deepcopy(document)
+        doc.setdefault("_id", ObjectId())
+        self.docs[doc["_id"]] = doc
+        document.setdefault("_id", doc["_id"])
+        return FakeResult(inserted_id=doc["_id"])
+
+    async def insert_many(self, documents: Iterable[dict], ordered: bool = True):
+        await self._io()
+        ids = []
+        for document in documents:
+            doc = copy.deepcopy(document)
+            doc.setdefault("_id", ObjectId())
+            self.docs[doc["_id"]] = doc
+            document.setdefault("_id", doc["_id"])
+            ids.append(doc["_id"])
+        return FakeResult(inserted_ids=ids)
+
+    async def find_one(self, query: Optional[dict] = None, projection: Optional[dict] = None, sort=None):
+        await self._io()
+        docs = self._find(query)
+        if sort:
+            docs = _sorted(docs, list(sort))
+        return _project(docs[0], projection) if docs else None
+
+    def find(self, query: Optional[dict] = None, projection: Optional[dict] = None, sort=None, **kwargs):
+        cursor = FakeCursor(self._find(query), projection)
+        if sort:
+            cursor.sort(list(sort))
+        return cursor
+
+    def _upsert_doc(self, query: dict) -> dict:
+        doc = {k: v for k, v in query.items() if not isinstance(v, dict)}
+        doc.setdefault("_id", ObjectId())
+        self.docs[doc["_id"]] = doc
+        return doc
+
+    def _update(self, query: dict, update: dict, upsert: bool, many: bool) -> FakeResult:
+        docs = self._find(query)
+        if not many:
+            docs = docs[:1]
+        for doc in docs:
+            _apply_update(doc, update)
+        upserted_id = None
+        if not docs and upsert:
+            doc = self._upsert_doc(query)
+            _apply_update(doc, update, inserting=True)
+            upserted_id = doc["_id"]
+        return FakeResult(matched_count=len(docs), modified_count=len(docs), upserted_id=upserted_id)
+
+    async def update_one(self, query: dict, update: dict, upsert: bool = False):
+        await self._io()
+        return self._update(query, update, upsert, many=False)
+
+    async def update_many(self, query: dict, update: dict, upsert: bool = False):
+        await self._io()
+        return self._update(query, update, upsert, many=True)
+
+    async def replace_one(self, query: dict, replacement: dict, upsert: bool = False):
+        await self._io()
+        return self._replace(query, replacement, upsert)
+
+    def _replace(self, query: dict, replacement: dict, upsert: bool) -> FakeResult:
+        docs = self._find(query)
+        if docs:
+            _id = docs[0]["_id"]
+        elif upsert:
+            _id = query.get("_id", ObjectId())
+        else:
+            return FakeResult(matched_count=0, modified_count=0, upserted_id=None)
+        self.docs[_id] = {**copy.deepcopy(replacement), "_id": _id}
+        return FakeResult(matched_count=len(docs), modified_count=len(docs), upserted_id=None if docs else _id)
+
+    async def find_one_and_update(self, query: dict, update: dict, projection: Optional[dict] = None, upsert: bool = False, return_document: bool = False, sort: Optional[List[Tuple[str, int]]] = None, **kwargs):
+        await self._io()
+        docs = _sorted(self._find(query), sort) if sort else self._find(query)
+        if docs:
+            before = copy.deepcopy(docs[0])
+            _apply_update(docs[0], update)
+            return _project(docs[0] if return_document else before, projection)
+        if not upsert:
+            return None
+        doc = self._upsert_doc(query)
+        _apply_update(doc, update, inserting=True)
+        return _project(doc, projection) if return_document else None
+
+    async def delete_one(self, query: dict):
+        await self._io()
+        docs = self._find(query)[:1]
+        for doc in docs:
+            del self.docs[doc["_id"]]
+        return FakeResult(deleted_count=len(docs))
+
+    async def delete_many(self, query: dict):
+        await self._io()
+        docs = self._find(query)
+        for doc in docs:
+            del self.docs[doc["_id"]]
+        return FakeResult(deleted_count=len(docs))
+
+    async def count_documents(self, query: dict):
+        await self._io()
+        return len(self._find(query))
+
+    async def distinct(self, key: str, query: Optional[dict] = None):
+        await self._io()
+        values = []
+        for doc in self._find(query):
+            value = _get(doc, key)
+            if value is not None and value not in values:
+                values.append(value)
+        return values
+
+    async def bulk_write(self, requests: list, ordered: bool = True):
+        await self._io()
+        counts = {"inserted_count": 0, "modified_count": 0, "deleted_count": 0, "upserted_count": 0}
+        for request in requests:
+            kind = type(request).__name__
+            doc = getattr(request, "_doc", None)
+            if kind == "InsertOne":
+                doc = copy.deepcopy(doc)
+                doc.setdefault("_id", ObjectId())
+                self.docs[doc["_id"]] = doc
+                counts["inserted_count"] += 1
+            elif kind == "ReplaceOne":
+                result = self._replace(request._filter, doc, request._upsert)
+                counts["modified_count"] += result.modified_count
+                counts["upserted_count"] += result.upserted_id is not None
+            elif kind in ("UpdateOne", "UpdateMany"):
+                result = self._update(request._filter, doc, request._upsert, many=kind == "UpdateMany")
+                counts["modified_count"] += result.modified_count
+                counts["upserted_count"] += result.upserted_id is not None
+            elif kind in ("DeleteOne", "DeleteMany"):
+                docs = self._find(request._filter)
+                for d in docs if kind == "DeleteMany" else docs[:1]:
+                    del self.docs[d["_id"]]
+                    counts["deleted_count"] += 1
+        return FakeResult(**counts)
+
+    async def aggregate(self, pipeline: List[dict]):
+        await self._io()
+        docs = list(self.docs.values())
+        for stage in pipeline:
+            (op, spec), = stage.items()
+            if op == "$vectorSearch":
+                docs = self._vector_search(docs, spec)
+            elif op == "$match":
+                docs = [d for d in docs if _matches(d, spec)]
+            elif op == "$project":
+                docs = [self._project_stage(d, spec) for d in docs]
+            elif op == "$sort":
+                docs = _sorted(docs, list(spec.items()))
+            elif op == "$limit":
+                docs = docs[:spec]
+            elif op == "$group":
+                docs = self._group(docs, spec)
+            else:
+                raise NotImplementedError(f"FakeCollection does not support {op}")
+        return FakeCursor(docs)
+
+    def _vector_search(self, docs: List[dict], spec: dict) -> List[dict]:
+        from backend.core.vector_codec import decode_vector
+
+        docs = [d for d in docs if _matches(d, spec.get("filter", {})) and spec["path"] in d]
+        if not docs:
+            return []
+        query = np.asarray(spec["queryVector"], dtype=np.float32)
+        matrix = np.stack([decode_vector(d[spec["path"]]) for d in docs])
+        sims = matrix @ query / (np.linalg.norm(matrix, axis=1) * np.linalg.norm(query) + 1e-12)
+        top = np.argsort(-sims)[:spec["limit"]]
+        return [{**docs[i], "__score": float((1 + sims[i]) / 2)} for i in top]
+
+    def _project_stage(self, doc: dict, spec: dict) -> dict:
+        result = {}
+        for key, value in spec.items():
+            if isinstance(value, dict) and value.get("$meta") == "vectorSearchScore":
+                result[key] = doc.get("__score", 0.0)
+            elif value and key in doc:
+                result[key] = doc[key]
+        return result
+
+    def _group(self, docs: List[dict], spec: dict) -> List[dict]:
+        groups: Dict[Any, dict] = {}
+        key_spec = spec["_id"]
+        for doc in docs:
+            key = _get(doc, key_spec[1:]) if isinstance(key_spec, str) else key_spec
+            group = groups.setdefault(key, {"_id": key})
+            for field, acc in spec.items():
+                if field == "_id":
+                    continue
+                (op, arg), = acc.items()
+                value = arg if not isinstance(arg, str) else (_get(doc, arg[1:]) or 0)
+                if op == "$sum":
+                    group[field] = group.get(field, 0) + value
+                else:
+                    raise NotImplementedError(f"FakeCollection $group does not support {op}")
+        return list(groups.values())
+
+
+class FakeDatabase:
+    def __init__(self, latency_ms: float = 0.0):
+        self.latency = latency_ms / 1000
+        self.collections: Dict[str, FakeCollection] = {}
+
+    def __getitem__(self, name: str) -> FakeCollection:
+        if name not in self.collections:
+            self.collections[name] = FakeCollection(name, self.latency)
+        return self.collections[name]
+
+    def __getattr__(self, name: str) -> FakeCollection:
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return self[name]
+
+    async def command(self, name: str, *args, **kwargs):
+        if name == "collStats":
+            docs = self[args[0]].docs
+            return {"count": len(docs), "size": 0, "avgObjSize": 0}
+        return {"ok": 1}
+
+
+# SQL
+
+class FakeEngine:
+    """Stands in for the audit writer's engine; each transaction costs one simulated round trip."""
+
+    def __init__(self, latency_ms: float = 0.0):
+        self.latency = latency_ms / 1000
+        self.rows: List[dict] = []
+
+    @contextmanager
+    def begin(self) -> Iterator["FakeEngine"]:
+        yield self
+        time.sleep(self.latency)
+
+    def execute(self, statement: Any, rows: Optional[List[dict]] = None):
+        self.rows.extend(rows or [])
+
+
+# Models
+
+def _word_ids(text: str, limit: int = 512) -> List[int]:
+    return [int.from_bytes(hashlib.blake2b(w.encode("utf-8"), digest_size=4).digest(), "little") for w in _WORD.findall(text.lower())][:limit]
+
+
+class FakeTokenizer:
+    """Word-level tokenizer with the call signature of the Hugging Face tokenizer used by bi_encoder."""
+
+    def encode(self, text: str) -> List[int]:
+        return _word_ids(text, limit=10**9)
+
+    def __call__(self, texts: List[str], max_length: int = 512, padding: bool = False, truncation: bool = False, return_tensors: Optional[str] = None):
+        ids = [_word_ids(t, max_length if truncation else 10**9) or [0] for t in texts]
+        if return_tensors is None:
+            return {"input_ids": ids}
+        width = max(len(i) for i in ids)
+        input_ids = np.zeros((len(ids), width), dtype=np.int64)
+        mask = np.zeros((len(ids), width), dtype=np.int64)
+        for row, seq in enumerate(ids):
+            input_ids[row, :len(seq)] = seq
+            mask[row, :len(seq)] = 1
+        return {"input_ids": input_ids, "attention_mask": mask}
+
+
+class FakeEmbeddingBackend:
+    """
+    Sum of a fixed random vector per token, L2-normalized: texts sharing words
+    get similar vectors, so retrieval and the cascade behave plausibly.
+    `latency_ms` is charged per batch to stand in for the forward pass.
+    """
+
+    name = "fake"
+
+    def __init__(self, dim: int = 768, latency_ms: float = 0.0):
+        self.dim = dim
+        self.latency = latency_ms / 1000
+        self._token_vectors: Dict[int, np.ndarray] = {}
+
+    def _vector(self, token: int) -> np.ndarray:
+        vector = self._token_vectors.get(token)
+        if vector is None:
+            vector = np.random.default_rng(token).standard_normal(self.dim).astype(np.float32)
+            self._token_vectors[token] = vector
+        return vector
+
+    def encode(self, input_ids: np.ndarray, attention_mask: np.ndarray) -> List[List[float]]:
+        time.sleep(self.latency)
+        results = []
+        for ids, mask in zip(input_ids, attention_mask):
+            summed = np.sum([self._vector(int(t)) for t, m in zip(ids, mask) if m], axis=0)
+            results.append((summed / (np.linalg.norm(summed) + 1e-12)).tolist())
+        return results
+
+
+class FakeReranker:
+    """Scores a pair by word overlap, squashed into (0, 1) like the sigmoid cross-encoder."""
+
+    def __init__(self, latency_ms: float = 0.0):
+        self.latency = latency_ms / 1000
+
+    def predict(self, pairs: List[List[str]], batch_size: int = 16) -> List[float]:
+        time.sleep(self.latency * max(1, -(-len(pairs) // batch_size)))
+        scores = []
+        for query, doc in pairs:
+            q, d = set(_WORD.findall(query.lower())), set(_WORD.findall(doc.lower()))
+            overlap = len(q & d) / max(1, len(q))
+            scores.append(float(1 / (1 + np.exp(-10 * (overlap - 0.5)))))
+        return scores
+
+
+def install_fakes(mongo: bool, models: bool, mongo_latency_ms: float = 0.0, model_latency_ms: float = 0.0) -> Optional[FakeDatabase]:
+    """Swaps the in-memory stand-ins into `backend.core.database` and the model registry."""
+    fake_db = None
+    if mongo:
+        import backend.core.database as database
+        fake_db = FakeDatabase(mongo_latency_ms)
+        database.mongo_db = fake_db # type: ignore
+        database.ai_responses = fake_db["ai_responses"] # type: ignore
+        database.prompt_events = fake_db["prompt_events"] # type: ignore
+        database.document_chunks = fake_db["document_chunks"] # type: ignore
+
+    if models:
+        from backend.services import model_registry
+        model_registry._models["tokenizer"] = FakeTokenizer()
+        model_registry._models["embedding_backend"] = FakeEmbeddingBackend(latency_ms=model_latency_ms)
+        model_registry._models["reranker"] = FakeReranker(latency_ms=model_latency_ms)
+
+    return fake_db
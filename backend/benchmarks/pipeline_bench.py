@@ -0,0 +1,305 @@
+"""
+End-to-end benchmark for `run_rag_pipeline` and `process_ai_feedback`.
+
+Runs a synthetic workload at a fixed concurrency against either in-memory
+stand-ins (`--stores memory`, the default) or the Mongo/Postgres configured
+in the environment (`--stores local`, which wipes the `--mongo-db` database
+and needs its vector search indexes). The LLM is always the gateway's stub
+provider; `--fake-models` also replaces the tokenizer, embedding model and
+reranker so the run needs no model files. Every other setting, such as the
+CASCADE_* thresholds, is read from the environment as usual.
+
+    python -m backend.benchmarks.pipeline_bench --requests 500 --concurrency 32 --fake-models --output before.json
+
+The JSON report holds p50/p95/p99 per pipeline and per stage, throughput,
+cache outcomes, peak RSS and the component stats() of the run.
+"""
+import argparse
+import asyncio
+import contextlib
+import json
+import os
+import random
+import resource
+import sys
+import time
+from typing import Dict, List
+
+TOPICS = [
+    "data retention", "model deployment", "feature store", "access control", "incident response",
+    "experiment tracking", "pipeline monitoring", "data quality checks", "gpu quotas", "model review",
+    "schema evolution", "pii handling", "batch scoring", "onboarding", "cost allocation", "backfills",
+]
+ASPECTS = ["policy", "owner", "approval process", "default settings", "escalation path", "checklist", "limits", "best practices"]
+FILLER = "The platform team maintains this standard and reviews it every quarter with each data owner."
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Offline end-to-end benchmark for the RAG and feedback pipelines.")
+    parser.add_argument("--requests", type=int, default=200, help="prompts submitted to run_rag_pipeline")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--warmup", type=int, default=10, help="prompts run before measuring")
+    parser.add_argument("--unique-prompts", type=int, default=100, help="size of the prompt pool requests are drawn from")
+    parser.add_argument("--companies", type=int, default=2)
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--chunks-per-company", type=int, default=300)
+    parser.add_argument("--memories-per-company", type=int, default=40)
+    parser.add_argument("--feedback", type=int, default=None, help="feedback events processed (default: one per measured request)")
+    parser.add_argument("--stores", choices=("memory", "local"), default="memory")
+    parser.add_argument("--mongo-db", default="adaptive_benchmark", help="database used, and wiped, with --stores local")
+    parser.add_argument("--mongo-latency-ms", type=float, default=1.0, help="simulated round trip of the in-memory Mongo")
+    parser.add_argument("--sql-latency-ms", type=float, default=2.0, help="simulated round trip of one in-memory audit insert")
+    parser.add_argument("--fake-models", action="store_true", help="use deterministic stand-ins for the tokenizer, embedder and reranker")
+    parser.add_argument("--model-latency-ms", type=float, default=0.0, help="simulated forward pass per batch of the fake models")
+    parser.add_argument("--llm-latency-ms", type=float, default=800.0)
+    parser.add_argument("--llm-token-ms", type=float, default=10.0)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--output", help="write the JSON report here as well as to stdout")
+    parser.add_argument("--verbose", action="store_true", help="keep the pipeline's own log output")
+    return parser.parse_args()
+
+
+def configure_environment(args: argparse.Namespace):
+    # Settings are read when backend.core.config is first imported.
+    os.environ["LLM_PROVIDER"] = "stub"
+    os.environ["LLM_STUB_LATENCY_MS"] = str(args.llm_latency_ms)
+    os.environ["LLM_STUB_TOKEN_MS"] = str(args.llm_token_ms)
+    os.environ["EMBED_CACHE_DIR"] = ""
+    os.environ["DOC_RETRIEVER"] = "atlas"
+    os.environ["WARMUP_MODELS"] = "false"
+    if args.stores == "memory":
+        os.environ.setdefault("MONGO_URI", "mongodb://localhost:27017")
+        os.environ.setdefault("POSTGRES_URI", "sqlite://")
+        os.environ.setdefault("SECRET_KEY", "benchmark")
+    os.environ["MONGO_DB_NAME"] = args.mongo_db
+
+
+def percentiles(samples: List[float]) -> Dict[str, float]:
+    if not samples:
+        return {"count": 0}
+    ordered = sorted(samples)
+
+    def pct(q: float) -> float:
+        pos = (len(ordered) - 1) * q
+        low = int(pos)
+        high = min(low + 1, len(ordered) - 1)
+        return ordered[low] + (ordered[high] - ordered[low]) * (pos - low)
+
+    return {
+        "count": len(ordered),
+        "mean": sum(ordered) / len(ordered),
+        "p50": pct(0.50),
+        "p95": pct(0.95),
+        "p99": pct(0.99),
+        "max": ordered[-1],
+    }
+
+
+def peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes.
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+class Recorder:
+    """Collects every finished StageTimer run, grouped by pipeline."""
+
+    def __init__(self):
+        self.runs: Dict[str, List[tuple]] = {}
+
+    def __call__(self, pipeline: str, company_id: str, cache: str, stages: Dict[str, float], total: float):
+        self.runs.setdefault(pipeline, []).append((cache, stages, total))
+
+    def clear(self):
+        self.runs.clear()
+
+    def report(self, pipeline: str, wall: float, errors: int) -> dict:
+        runs = self.runs.get(pipeline, [])
+        stages: Dict[str, List[float]] = {}
+        outcomes: Dict[str, int] = {}
+        for cache, run_stages, _ in runs:
+            outcomes[cache] = outcomes.get(cache, 0) + 1
+            for name, seconds in run_stages.items():
+                stages.setdefault(name, []).append(seconds)
+
+        return {
+            "completed": len(runs),
+            "errors": errors,
+            "wall_s": wall,
+            "throughput_rps": len(runs) / wall if wall else 0.0,
+            "latency_s": percentiles([total for _, _, total in runs]),
+            "cache_outcomes": outcomes,
+            "stages_s": {name: percentiles(samples) for name, samples in sorted(stages.items())},
+        }
+
+
+def make_prompts(rng: random.Random, count: int) -> List[str]:
+    prompts = set()
+    while len(prompts) < count:
+        topic, aspect = rng.choice(TOPICS), rng.choice(ASPECTS)
+        prompts.add(rng.choice([
+            f"What is the {aspect} for {topic}?",
+            f"Who is responsible for the {topic} {aspect}?",
+            f"Explain the {topic} {aspect} for new engineers",
+            f"How do I follow the {aspect} for {topic} on team {rng.randint(1, 9)}?",
+        ]))
+    return sorted(prompts)
+
+
+async def seed(args: argparse.Namespace, rng: random.Random, prompts: List[str]):
+    from bson import ObjectId
+    from backend.core import database
+    from backend.core.vector_codec import encode_embedding, encode_response_embedding
+    from backend.services.bi_encoder import create_embeddings_bucketed
+    from backend.services.prompt_index import prompt_index
+
+    for name in ("ai_responses", "prompt_events", "document_chunks", "prompt_hashes", "summary_cache", "company_stats"):
+        await database.mongo_db[name].delete_many({})
+
+    for company_id in range(1, args.companies + 1):
+        parent_ids = [ObjectId() for _ in range(max(1, args.chunks_per_company // 20))]
+        texts = []
+        for i in range(args.chunks_per_company):
+            topic, aspect = rng.choice(TOPICS), rng.choice(ASPECTS)
+            texts.append(f"{topic.capitalize()} {aspect}: section {i}. Requests about {topic} follow the {aspect} documented here. {FILLER}")
+        embeddings = await asyncio.to_thread(create_embeddings_bucketed, texts, 32)
+        await database.document_chunks.insert_many([
+            {
+                "parent_doc_id": str(parent_ids[i // 20 % len(parent_ids)]),
+                "company_id": company_id,
+                "chunk_index": i % 20,
+                "content": text,
+                "embedding": encode_embedding(embedding),
+            }
+            for i, (text, embedding) in enumerate(zip(texts, embeddings))
+        ])
+
+        # Paraphrases of pool prompts: close enough for memory retrieval, never an exact match.
+        remembered = [f"In short, {p[0].lower()}{p[1:]}" for p in rng.sample(prompts, min(args.memories_per_company, len(prompts)))]
+        vectors = await asyncio.to_thread(create_embeddings_bucketed, [f"query: {p}" for p in remembered], 32)
+        await database.ai_responses.insert_many([
+            {
+                "canonical_prompt": prompt,
+                "response": f"Stored answer about: {prompt} {FILLER}",
+                "embedding": encode_response_embedding(vector),
+                "aliases": [],
+                "model": "gemini-2.5-flash",
+                "status": rng.choice(["canonical", "candidate", "candidate"]),
+                "reuse_count": 0,
+                "rating_sum": 0.0,
+                "bayesian_score": 0.0,
+                "company_id": company_id,
+            }
+            for prompt, vector in zip(remembered, vectors)
+        ])
+
+    await prompt_index.rebuild()
+
+
+async def run_concurrently(jobs: List, concurrency: int) -> tuple[list, int, float]:
+    semaphore = asyncio.Semaphore(concurrency)
+    errors = 0
+
+    async def guarded(job):
+        nonlocal errors
+        async with semaphore:
+            try:
+                return await job()
+            except Exception as e:
+                errors += 1
+                print(f"Benchmark job failed: {e!r}", file=sys.stderr)
+                return None
+
+    start = time.perf_counter()
+    results = await asyncio.gather(*(guarded(job) for job in jobs))
+    return results, errors, time.perf_counter() - start
+
+
+async def run(args: argparse.Namespace) -> dict:
+    from backend.benchmarks.fakes import FakeEngine, install_fakes
+    install_fakes(
+        mongo=args.stores == "memory",
+        models=args.fake_models,
+        mongo_latency_ms=args.mongo_latency_ms,
+        model_latency_ms=args.model_latency_ms
+    )
+
+    from backend.core.metrics import add_stage_observer
+    from backend.services.audit_writer import audit_writer
+    from backend.services.embedding_service import get_embedding_stats
+    from backend.services.feedback import process_ai_feedback
+    from backend.services.llm_gateway import gateway
+    from backend.services.prompt_index import prompt_index
+    from backend.services.rag_pipeline import answer_flight, run_rag_pipeline, summary_flight
+    from backend.services.rerank_scheduler import get_rerank_stats
+    from backend.services.summary_cache import summary_cache
+
+    recorder = Recorder()
+    add_stage_observer(recorder)
+
+    rng = random.Random(args.seed)
+    prompts = make_prompts(rng, args.unique_prompts)
+    await seed(args, rng, prompts)
+
+    def prompt_job():
+        query = rng.choice(prompts)
+        user_id = rng.randint(1, args.users)
+        company_id = (user_id % args.companies) + 1
+        return lambda: run_rag_pipeline(query=query, user_id=user_id, company_id=company_id)
+
+    if args.warmup:
+        await run_concurrently([prompt_job() for _ in range(args.warmup)], args.concurrency)
+        recorder.clear()
+
+    results, rag_errors, rag_wall = await run_concurrently([prompt_job() for _ in range(args.requests)], args.concurrency)
+
+    if args.stores == "memory":
+        audit_writer.engine = FakeEngine(args.sql_latency_ms)
+    await audit_writer.start()
+
+    def feedback_job(event_id: str):
+        async def job():
+            await process_ai_feedback(event_id, rng.randint(1, 5))
+        return job
+
+    event_ids = [r.event_id for r in results if r is not None]
+    n_feedback = len(event_ids) if args.feedback is None else args.feedback
+    feedback_jobs = [feedback_job(event_ids[i % len(event_ids)]) for i in range(n_feedback)] if event_ids else []
+    _, feedback_errors, feedback_wall = await run_concurrently(feedback_jobs, args.concurrency)
+    await audit_writer.stop()
+
+    return {
+        "config": vars(args),
+        "rag": recorder.report("rag", rag_wall, rag_errors),
+        "feedback": recorder.report("feedback", feedback_wall, feedback_errors),
+        "peak_rss_mb": peak_rss_mb(),
+        "components": {
+            "llm": gateway.stats(),
+            "embedding": get_embedding_stats(),
+            "rerank": get_rerank_stats(),
+            "prompt_index": prompt_index.stats(),
+            "summary_cache": summary_cache.stats(),
+            "answer_flight": answer_flight.stats(),
+            "summary_flight": summary_flight.stats(),
+            "audit_writer": audit_writer.stats(),
+        },
+    }
+
+
+def main():
+    args = parse_args()
+    configure_environment(args)
+
+    log = contextlib.nullcontext() if args.verbose else contextlib.redirect_stdout(open(os.devnull, "w"))
+    with log:
+        report = asyncio.run(run(args))
+
+    output = json.dumps(report, indent=2, default=str)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(output)
+    print(output)
+
+
+if __name__ == "__main__":
+    main()
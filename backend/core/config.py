@@ -1,5 +1,6 @@
 from pydantic_settings import BaseSettings, SettingsConfigDict
 from pathlib import Path
+from typing import Literal
 
 BASE_DIR = Path(__file__).resolve().parent.parent
 ENV_FILE = BASE_DIR / ".env"
@@ -8,7 +9,18 @@ class Settings(BaseSettings):
     ENV: str = "development"
 
     # API
-    GEMINI_API_KEY: str
+    GEMINI_API_KEY: str = ""
+
+    # LLM gateway
+    LLM_PROVIDER: str = "gemini"  # gemini | stub
+    LLM_MAX_CONCURRENCY: int = 8
+    LLM_TIMEOUT_S: float = 60.0
+    # Budget of one pipeline request for its LLM call, retries and backoff included
+    LLM_REQUEST_DEADLINE_S: float = 90.0
+    LLM_MAX_RETRIES: int = 2
+    LLM_RETRY_BASE_S: float = 0.5
+    LLM_STUB_LATENCY_MS: float = 800.0
+    LLM_STUB_TOKEN_MS: float = 10.0
 
     # Databases
     POSTGRES_URI: str
@@ -18,6 +30,94 @@ class Settings(BaseSettings):
     #JWT
     SECRET_KEY : str
 
+    # Embedding inference
+    EMBEDDING_BACKEND: str = "torch"  # torch | int8 | onnx
+    EMBEDDING_ONNX_PATH: str = "backend/ml_models/multilingual-e5-base-onnx/model.onnx"
+    EMBEDDING_NUM_THREADS: int | None = None
+    WARMUP_MODELS: bool = False
+
+    # Embedding micro-batching
+    EMBED_MAX_BATCH_SIZE: int = 32
+    EMBED_MAX_WAIT_MS: float = 5.0
+
+    # Bulk ingestion: parse processes, chunks handed to the embed stage per call, texts per
+    # model forward pass within that call (length-bucketed), and chunks per insert_many
+    INGEST_PARSE_WORKERS: int = 4
+    INGEST_EMBED_BATCH_SIZE: int = 256
+    INGEST_MODEL_BATCH_SIZE: int = 16
+    INGEST_INSERT_BATCH_SIZE: int = 100
+
+    # Ingestion API: concurrent jobs per process, queued jobs beyond which uploads get 503,
+    # progress and lease renewal interval, lease after which a silent worker's job is taken
+    # over, how often idle workers look for queued jobs, and how long an upload still being
+    # copied holds its queue slot
+    INGEST_MAX_JOBS: int = 1
+    INGEST_MAX_QUEUED_JOBS: int = 16
+    INGEST_JOB_REPORT_S: float = 1.0
+    INGEST_JOB_LEASE_S: float = 60.0
+    INGEST_JOB_POLL_S: float = 5.0
+    INGEST_UPLOAD_RESERVE_S: float = 600.0
+    INGEST_UPLOAD_DIR: str = "backend/storage/uploads"
+    INGEST_MAX_UPLOAD_MB: int = 50
+
+    # Feedback write-behind: ratings are logged to disk and applied in coalesced batches.
+    # Each process logs to FEEDBACK_LOG_PATH.<pid>; FEEDBACK_LOG_FSYNC also survives power loss.
+    FEEDBACK_WRITE_BEHIND: bool = True
+    FEEDBACK_FLUSH_INTERVAL_S: float = 2.0
+    FEEDBACK_FLUSH_MAX_PENDING: int = 500
+    FEEDBACK_MAX_ATTEMPTS: int = 3
+    FEEDBACK_LOG_PATH: str = "backend/storage/feedback/feedback.log"
+    FEEDBACK_LOG_FSYNC: bool = False
+
+    # Audit writer: generation_events rows per multi-row insert, max wait before a partial batch
+    # is written, rows buffered before new ones are dropped, and how long shutdown waits to drain
+    AUDIT_BATCH_SIZE: int = 500
+    AUDIT_MAX_WAIT_MS: float = 200.0
+    AUDIT_MAX_QUEUE: int = 10000
+    AUDIT_SHUTDOWN_TIMEOUT_S: float = 10.0
+
+    # Reranker micro-batching
+    RERANK_MAX_BATCH_SIZE: int = 64
+    RERANK_MAX_WAIT_MS: float = 5.0
+
+    # Stored embedding format of document_chunks: array | float32 | float16 (BSON Binary),
+    # and of ai_responses, which is always searched by Atlas $vectorSearch and so cannot
+    # be float16. Atlas reads array and float32 only; float16 chunks need DOC_RETRIEVER=local.
+    EMBEDDING_STORAGE_FORMAT: Literal["array", "float32", "float16"] = "array"
+    RESPONSE_EMBEDDING_STORAGE_FORMAT: Literal["array", "float32"] = "array"
+
+    # Document retrieval: "atlas" uses $vectorSearch, "local" the in-process index
+    DOC_RETRIEVER: str = "atlas"
+    LOCAL_INDEX_DIR: str = "backend/storage/vector_index"
+
+    # Cascaded retrieval: vectorSearchScore prefilter before the cross-encoder.
+    # CASCADE_MARGIN is the recall/latency knob: wider keeps more candidates.
+    CASCADE_MEMORY_MIN_SCORE: float = 0.85
+    CASCADE_DOC_MIN_SCORE: float = 0.80
+    CASCADE_DOC_ACCEPT_SCORE: float | None = None
+    CASCADE_MARGIN: float = 0.06
+    CASCADE_MAX_RERANK: int = 10
+
+    # Smart cache: serve a canonical answer directly when the reranker is this confident
+    ANSWER_CACHE_ENABLED: bool = True
+    ANSWER_CACHE_THRESHOLD: float = 0.92
+
+    # Exact-match prompt lookup over canonical_prompt and aliases. Only rated canonical answers
+    # are reused by default; adding "candidate" opts in to serving unrated answers to repeats.
+    EXACT_MATCH_STATUSES: list[str] = ["canonical"]
+    PROMPT_INDEX_REFRESH_S: float = 300.0
+
+    # Summary cache for long prompts and responses, persisted in Mongo
+    SUMMARY_CACHE_TTL_S: int = 30 * 24 * 3600
+    SUMMARY_CACHE_MAX_MB: int = 50
+
+    # Context assembly: token budget for the context sections of the final prompt
+    CONTEXT_TOKEN_BUDGET: int = 3000
+
+    # Embedding cache
+    EMBED_CACHE_MAX_MB: int = 64
+    EMBED_CACHE_DIR: str | None = "backend/storage/embedding_cache"
+
     BACKEND_CORS_ORIGINS: list[str] = [
         "http://127.0.0.1:5500"
     ]
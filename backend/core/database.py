@@ -1,11 +1,14 @@
 from sqlalchemy import create_engine, text
 from sqlalchemy.orm import sessionmaker, Session
+from sqlalchemy.pool import QueuePool
 from pymongo import AsyncMongoClient
 from typing import Generator
 from backend.core.config import settings
 
 engine = create_engine(settings.POSTGRES_URI, pool_pre_ping=True)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# Used only by the audit writer's thread, so audit inserts never wait for a request connection.
+audit_engine = create_engine(settings.POSTGRES_URI, poolclass=QueuePool, pool_size=1, max_overflow=0, pool_pre_ping=True)
 
 def get_sql_db() -> Generator[Session, None, None]:
     """FastAPI Dependency for SQL sessions."""
@@ -0,0 +1,124 @@
+import os
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List
+from prometheus_client import CONTENT_TYPE_LATEST, CollectorRegistry, Histogram, REGISTRY, generate_latest
+from prometheus_client.core import GaugeMetricFamily
+from prometheus_client.registry import Collector
+
+# Stage latencies run from sub-millisecond cache hits to multi-second LLM calls.
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+STAGE_SECONDS = Histogram(
+    "adaptive_stage_seconds",
+    "Duration of one stage of a pipeline run.",
+    ["pipeline", "stage", "company_id", "cache"],
+    buckets=LATENCY_BUCKETS
+)
+PIPELINE_SECONDS = Histogram(
+    "adaptive_pipeline_seconds",
+    "End-to-end duration of a pipeline run.",
+    ["pipeline", "company_id", "cache"],
+    buckets=LATENCY_BUCKETS
+)
+HTTP_REQUEST_SECONDS = Histogram(
+    "adaptive_http_request_seconds",
+    "Duration of API requests by route template.",
+    ["method", "route", "status"],
+    buckets=LATENCY_BUCKETS
+)
+
+# Called as observer(pipeline, company_id, cache, stages, total_seconds) for every finished run.
+_stage_observers: List[Callable[[str, str, str, Dict[str, float], float], None]] = []
+
+
+def add_stage_observer(observer: Callable[[str, str, str, Dict[str, float], float], None]):
+    _stage_observers.append(observer)
+
+
+class StageTimer:
+    """
+    Collects stage durations for one pipeline run and records them together
+    once the run's outcome (the `cache` label) is known.
+    """
+
+    def __init__(self, pipeline: str):
+        self.pipeline = pipeline
+        self.started = time.perf_counter()
+        self.stages: Dict[str, float] = {}
+
+    def record(self, name: str, seconds: float):
+        self.stages[name] = self.stages.get(name, 0.0) + seconds
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - start)
+
+    def observe(self, company_id: int, cache: str):
+        company = str(company_id)
+        total = time.perf_counter() - self.started
+        for name, seconds in self.stages.items():
+            STAGE_SECONDS.labels(self.pipeline, name, company, cache).observe(seconds)
+        PIPELINE_SECONDS.labels(self.pipeline, company, cache).observe(total)
+        for observer in _stage_observers:
+            observer(self.pipeline, company, cache, dict(self.stages), total)
+
+    def summary(self) -> str:
+        parts = [f"{name}={seconds:.3f}s" for name, seconds in self.stages.items()]
+        parts.append(f"total={time.perf_counter() - self.started:.3f}s")
+        return " ".join(parts)
+
+
+class ComponentStatsCollector(Collector):
+    """
+    Exposes the numeric values of the in-process `stats()` dicts (batchers,
+    caches, LLM gateway) as gauges named `adaptive_component_<key>`. A nested
+    dict of dicts, such as the gateway's per-model stats, is reported with
+    `component="<name>:<subkey>"`.
+    """
+
+    def __init__(self):
+        self.sources: Dict[str, Callable[[], dict]] = {}
+
+    def register(self, name: str, stats: Callable[[], dict]):
+        self.sources[name] = stats
+
+    def collect(self):
+        families: Dict[str, GaugeMetricFamily] = {}
+
+        def add(component: str, values: dict):
+            for key, value in values.items():
+                if isinstance(value, bool) or not isinstance(value, (int, float)):
+                    continue
+                if key not in families:
+                    families[key] = GaugeMetricFamily(f"adaptive_component_{key}", f"'{key}' from component stats().", labels=["component"])
+                families[key].add_metric([component], float(value))
+
+        for name, stats in self.sources.items():
+            values = stats()
+            add(name, values)
+            for nested in values.values():
+                if isinstance(nested, dict) and nested and all(isinstance(v, dict) for v in nested.values()):
+                    for key, sub_values in nested.items():
+                        add(f"{name}:{key}", sub_values)
+
+        yield from families.values()
+
+
+component_stats = ComponentStatsCollector()
+REGISTRY.register(component_stats)
+
+
+def render_metrics() -> tuple[bytes, str]:
+    if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        # Several workers: merge their histogram files. Component stats are per
+        # process and are only available without multiprocess mode.
+        from prometheus_client import multiprocess
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry), CONTENT_TYPE_LATEST
+    return generate_latest(REGISTRY), CONTENT_TYPE_LATEST
@@ -0,0 +1,61 @@
+from typing import Annotated, Any, List, Sequence
+import numpy as np
+from bson.binary import Binary
+from pydantic import BeforeValidator
+from backend.core.config import settings
+
+# BSON binary subtype 9 ("vector") with the float32 dtype header, which Atlas
+# $vectorSearch indexes natively. float16 has no BSON vector dtype, so it is
+# stored under a user-defined subtype and only the local retriever can search it.
+VECTOR_SUBTYPE = 9
+FLOAT32_DTYPE = 0x27
+FLOAT16_SUBTYPE = 0x80
+
+EMBEDDING_FORMATS = ("array", "float32", "float16")
+
+
+def encode_vector(vector: Sequence[float] | np.ndarray, fmt: str) -> Any:
+    if fmt == "array":
+        return [float(x) for x in vector]
+    if fmt == "float32":
+        return Binary(bytes((FLOAT32_DTYPE, 0)) + np.asarray(vector, dtype="<f4").tobytes(), VECTOR_SUBTYPE)
+    if fmt == "float16":
+        return Binary(np.asarray(vector, dtype="<f2").tobytes(), FLOAT16_SUBTYPE)
+    raise ValueError(f"Unknown embedding format '{fmt}', expected one of {EMBEDDING_FORMATS}")
+
+
+def encode_embedding(vector: Sequence[float] | np.ndarray) -> Any:
+    """Encodes a document_chunks embedding."""
+    return encode_vector(vector, settings.EMBEDDING_STORAGE_FORMAT)
+
+
+def encode_response_embedding(vector: Sequence[float] | np.ndarray) -> Any:
+    """Encodes an ai_responses embedding, which must stay readable by Atlas $vectorSearch."""
+    return encode_vector(vector, settings.RESPONSE_EMBEDDING_STORAGE_FORMAT)
+
+
+def decode_vector(value: Any) -> np.ndarray:
+    """
+    Accepts every stored format, so documents can be read while a migration is
+    half done. Binary values are viewed in place: the float32 result shares
+    memory with the BSON payload.
+    """
+    if isinstance(value, Binary):
+        if value.subtype == VECTOR_SUBTYPE:
+            if value[0] != FLOAT32_DTYPE:
+                raise ValueError(f"Unsupported BSON vector dtype {value[0]:#x}")
+            return np.frombuffer(value, dtype="<f4", offset=2)
+        if value.subtype == FLOAT16_SUBTYPE:
+            return np.frombuffer(value, dtype="<f2").astype(np.float32)
+        raise ValueError(f"Unsupported embedding binary subtype {value.subtype}")
+
+    return np.asarray(value, dtype=np.float32)
+
+
+def _to_list(value: Any) -> Any:
+    if isinstance(value, Binary):
+        return decode_vector(value).tolist()
+    return value
+
+
+Embedding = Annotated[List[float], BeforeValidator(_to_list)]
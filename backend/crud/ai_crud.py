@@ -2,10 +2,13 @@ from backend.core.database import mongo_db
 from backend.schemas.nosql.ai_response import AIResponse
 from backend.schemas.nosql.prompt_event import PromptEvent
 from bson import ObjectId
-from typing import List
+from pymongo import DeleteMany, UpdateOne
+from typing import Dict, List, Tuple
 from datetime import datetime, UTC
-from sqlalchemy.orm import Session
+from sqlalchemy import Connection, insert
 from backend.schemas.sql import GenerationEvent
+from backend.core.vector_codec import encode_response_embedding
+from backend.services.math_utils import bayesian_rating_expr, status_expr
 
 ai_response_col = mongo_db.ai_responses
 prompt_events_col = mongo_db.prompt_events
@@ -13,6 +16,7 @@ company_stats_col = mongo_db.company_stats
 
 async def create_ai_response(response_data: AIResponse):
     data = response_data.model_dump(by_alias=True, exclude={"id"})
+    data["embedding"] = encode_response_embedding(data["embedding"])
     result = await ai_response_col.insert_one(data)
     return result.inserted_id
 
@@ -21,6 +25,9 @@ async def create_prompt_event(event_data: PromptEvent):
     result = await prompt_events_col.insert_one(data)
     return result.inserted_id
 
+async def delete_prompt_event(event_id: ObjectId):
+    await prompt_events_col.delete_one({"_id": event_id})
+
 async def push_ai_response_to_event(event_id: ObjectId, response_ids: List[str]):
 
     oid_list = [ObjectId(rid) for rid in response_ids]
@@ -34,6 +41,19 @@ async def push_ai_response_to_event(event_id: ObjectId, response_ids: List[str])
         }
     )
 
+async def record_cached_answer(event_id: ObjectId, response_id: str):
+    await prompt_events_col.update_one(
+        {"_id": event_id},
+        {
+            "$set": {"used_cached_answer": True},
+            "$addToSet": {"ai_response_ids": ObjectId(response_id)}
+        }
+    )
+    await ai_response_col.update_one(
+        {"_id": ObjectId(response_id)},
+        {"$inc": {"cache_hits": 1}}
+    )
+
 async def has_pending_feedback(user_id: int) -> bool:
 
     latest_event = await mongo_db.prompt_events.find_one(
@@ -57,6 +77,38 @@ async def update_event_rating(event_id: str, rating: int):
 async def get_event_by_id(event_id: str):
     return await prompt_events_col.find_one({"_id": ObjectId(event_id)})
 
+async def get_events_by_ids(event_ids: List[str]) -> Dict[str, dict]:
+    cursor = prompt_events_col.find(
+        {"_id": {"$in": [ObjectId(eid) for eid in event_ids]}},
+        {"user_id": 1, "company_id": 1, "ai_response_ids": 1, "feedback_stages": 1, "feedback_applied": 1}
+    )
+    return {str(doc["_id"]): doc async for doc in cursor}
+
+async def mark_feedback_stage(ratings: Dict[str, List[str]], stage: str):
+    """
+    Records, per event, that one stage of the given ratings (event id ->
+    rating ids) is written, so a retried batch skips it.
+    """
+    if not ratings:
+        return
+    now = datetime.now(UTC)
+    await prompt_events_col.bulk_write([
+        UpdateOne({"_id": ObjectId(event_id)}, {"$set": {f"feedback_stages.{rid}.{stage}": now for rid in rating_ids}})
+        for event_id, rating_ids in ratings.items()
+    ], ordered=False)
+
+async def mark_feedback_applied(ratings: Dict[str, List[str]]):
+    """Records the ratings (event id -> rating ids) as fully applied and drops their stage markers."""
+    if not ratings:
+        return
+    await prompt_events_col.bulk_write([
+        UpdateOne({"_id": ObjectId(event_id)}, {
+            "$addToSet": {"feedback_applied": {"$each": rating_ids}},
+            "$unset": {f"feedback_stages.{rid}": "" for rid in rating_ids}
+        })
+        for event_id, rating_ids in ratings.items()
+    ], ordered=False)
+
 async def get_ai_response_by_id(res_id: str):
     return await ai_response_col.find_one({"_id": ObjectId(res_id)})
 
@@ -79,6 +131,41 @@ async def update_ai_response_stats(res_id: str, rating: float, b_score: float, s
         }
     )
 
+async def apply_response_feedback(updates: Dict[str, Tuple[int, float]], company_avg: float) -> List[str]:
+    """
+    Adds `count` ratings totalling `rating_sum` to each response in a single
+    bulk_write of pipeline updates. The new bayesian_score and status are
+    computed from the stored counters inside MongoDB, so concurrent ratings
+    cannot overwrite each other. Responses whose status comes out as DELETE
+    are removed by the last operation of the same bulk_write. Returns the ids
+    that are gone afterwards.
+    """
+    if not updates:
+        return []
+
+    now = datetime.now(UTC)
+    ids = [ObjectId(res_id) for res_id in updates]
+    ops = [
+        UpdateOne({"_id": oid}, [
+            {"$set": {
+                "reuse_count": {"$add": [{"$ifNull": ["$reuse_count", 0]}, count]},
+                "rating_sum": {"$add": [{"$ifNull": ["$rating_sum", 0.0]}, float(rating_sum)]},
+                "updated_at": now
+            }},
+            {"$set": {"bayesian_score": bayesian_rating_expr("$reuse_count", "$rating_sum", company_avg)}},
+            {"$set": {"status": status_expr("$reuse_count", "$bayesian_score")}},
+        ])
+        for oid, (count, rating_sum) in zip(ids, updates.values())
+    ]
+    ops.append(DeleteMany({"_id": {"$in": ids}, "status": "DELETE"}))
+
+    result = await ai_response_col.bulk_write(ops, ordered=True)
+    if not result.deleted_count:
+        return []
+
+    remaining = {doc["_id"] async for doc in ai_response_col.find({"_id": {"$in": ids}}, {"_id": 1})}
+    return [str(oid) for oid in ids if oid not in remaining]
+
 async def get_company_avg_rating(company_id: int) -> float:
 
     stats = await company_stats_col.find_one({"company_id": company_id})
@@ -91,30 +178,29 @@ async def get_company_avg_rating(company_id: int) -> float:
     return float(avg)
 
 async def update_company_stats(company_id: int, rating: int) -> float:
+    return await apply_company_feedback(company_id, 1, float(rating))
+
+async def apply_company_feedback(company_id: int, count: int, rating_sum: float) -> float:
+    """Adds `count` ratings to the company totals and recomputes the average in the same round trip."""
     result = await company_stats_col.find_one_and_update(
         {"company_id": company_id},
-        {
-            "$inc": {
-                "total_rating_sum": float(rating), 
-                "total_review_count": 1
-            },
-            "$set": {"updated_at": datetime.now(UTC)}
-        },
+        [
+            {"$set": {
+                "total_rating_sum": {"$add": [{"$ifNull": ["$total_rating_sum", 0.0]}, float(rating_sum)]},
+                "total_review_count": {"$add": [{"$ifNull": ["$total_review_count", 0]}, count]},
+                "updated_at": datetime.now(UTC)
+            }},
+            {"$set": {"company_avg_score": {"$cond": [
+                {"$gt": ["$total_review_count", 0]},
+                {"$divide": ["$total_rating_sum", "$total_review_count"]},
+                3.5
+            ]}}},
+        ],
+        projection={"company_avg_score": 1},
         upsert=True,
         return_document=True
     )
-
-    total_sum = result.get("total_rating_sum", 0) # type: ignore
-    total_count = result.get("total_review_count", 0) # type: ignore
-    
-    new_c = total_sum / total_count if total_count > 0 else 3.5
-    
-    await company_stats_col.update_one(
-        {"company_id": company_id},
-        {"$set": {"company_avg_score": new_c}}
-    )
-    
-    return new_c
+    return float(result["company_avg_score"]) # type: ignore
     
 async def get_user_feedback_history(user_id: int, limit: int = 10):
 
@@ -146,15 +232,7 @@ async def update_ai_response_status(res_id: str, status: str) -> bool:
     )
     return result.modified_count > 0
 
-def create_generation_audit(db: Session, user_id: int, mongo_id: str, rating: int):
-    try:
-        new_audit = GenerationEvent(
-            user_id=user_id,
-            mongo_event_id=mongo_id,
-            rating=rating
-        )
-        db.add(new_audit)
-        db.commit()
-    except Exception as e:
-        db.rollback()
-        print(f"Audit log failed: {e}")
\ No newline at end of file
+def insert_generation_audits(conn: Connection, rows: List[dict]):
+    """Inserts audit rows with one executemany INSERT, sent as multi-row VALUES on Postgres. The caller owns the transaction."""
+    if rows:
+        conn.execute(insert(GenerationEvent), rows)
\ No newline at end of file
@@ -0,0 +1,62 @@
+from backend.core.database import mongo_db
+from datetime import datetime, UTC
+from pymongo import ReturnDocument, UpdateOne
+from typing import Any, List, Optional, Tuple
+
+documents_col = mongo_db.documents
+document_chunks_col = mongo_db.document_chunks
+
+async def ensure_document_indexes():
+    await documents_col.create_index([("company_id", 1), ("source_path", 1)], unique=True)
+    await document_chunks_col.create_index("parent_doc_id")
+
+async def get_document(company_id: int, source_path: str) -> Optional[dict]:
+    return await documents_col.find_one({"company_id": company_id, "source_path": source_path})
+
+async def get_or_create_document(company_id: int, source_path: str, name: str) -> dict:
+    now = datetime.now(UTC)
+    return await documents_col.find_one_and_update(
+        {"company_id": company_id, "source_path": source_path},
+        {
+            "$set": {"name": name, "updated_at": now},
+            "$setOnInsert": {"company_id": company_id, "source_path": source_path, "fingerprint": None, "created_at": now},
+        },
+        upsert=True,
+        return_document=ReturnDocument.AFTER
+    )
+
+async def mark_document_ingested(document_id: Any, fingerprint: str, chunk_count: int):
+    """Written last, so a document whose fingerprint matches the file is fully stored."""
+    await documents_col.update_one(
+        {"_id": document_id},
+        {"$set": {"fingerprint": fingerprint, "chunk_count": chunk_count, "updated_at": datetime.now(UTC)}}
+    )
+
+async def get_chunk_hashes(parent_doc_id: str) -> List[dict]:
+    cursor = document_chunks_col.find({"parent_doc_id": parent_doc_id}, {"_id": 1, "chunk_index": 1, "content_hash": 1})
+    return await cursor.to_list(length=None)
+
+async def insert_chunks(chunks: List[dict]) -> List[Any]:
+    result = await document_chunks_col.insert_many(chunks, ordered=False)
+    return result.inserted_ids
+
+async def renumber_chunks(moves: List[Tuple[Any, int]]):
+    if not moves:
+        return
+    ops = [UpdateOne({"_id": chunk_id}, {"$set": {"chunk_index": index}}) for chunk_id, index in moves]
+    await document_chunks_col.bulk_write(ops, ordered=False)
+
+async def delete_chunks(chunk_ids: List[Any]) -> int:
+    if not chunk_ids:
+        return 0
+    result = await document_chunks_col.delete_many({"_id": {"$in": chunk_ids}})
+    return result.deleted_count
+
+async def delete_all_documents() -> int:
+    await documents_col.delete_many({})
+    result = await document_chunks_col.delete_many({})
+    return result.deleted_count
+
+async def list_documents(company_id: int) -> List[dict]:
+    cursor = documents_col.find({"company_id": company_id}).sort("name", 1)
+    return await cursor.to_list(length=None)
@@ -0,0 +1,106 @@
+from backend.core.database import mongo_db
+from bson import ObjectId
+from datetime import datetime, timedelta, UTC
+from pymongo import ReturnDocument
+from typing import List, Optional
+
+ingestion_jobs_col = mongo_db.ingestion_jobs
+
+async def ensure_ingestion_job_indexes():
+    await ingestion_jobs_col.create_index([("company_id", 1), ("created_at", -1)])
+    await ingestion_jobs_col.create_index([("status", 1), ("created_at", 1)])
+
+async def reserve_job(company_id: int, user_id: int, max_queued: int, reserve_s: float) -> Optional[dict]:
+    """
+    Takes one of `max_queued` queue slots for an upload whose files are still
+    being copied, or returns None when the queue is full. The reservation is
+    inserted first and the slots counted after, so every racing upload sees
+    the others' reservations: two uploads after the last slot may both be
+    refused, but never both admitted. A reservation whose upload never
+    finished stops counting after `reserve_s`.
+    """
+    now = datetime.now(UTC)
+    job = {
+        "company_id": company_id,
+        "user_id": user_id,
+        "files": [],
+        "status": "reserved",
+        "progress": {},
+        "errors": [],
+        "created_at": now,
+        "started_at": None,
+        "finished_at": None,
+        "lease_expires_at": now + timedelta(seconds=reserve_s),
+    }
+    result = await ingestion_jobs_col.insert_one(job)
+    job["_id"] = result.inserted_id
+
+    taken = await ingestion_jobs_col.count_documents(
+        {"$or": [{"status": "queued"}, {"status": "reserved", "lease_expires_at": {"$gt": now}}]}
+    )
+    if taken > max_queued:
+        await cancel_reservation(job["_id"])
+        return None
+    return job
+
+async def queue_reserved_job(job_id: ObjectId, files: List[dict]) -> Optional[dict]:
+    """Hands a reserved job its stored files and makes it claimable."""
+    return await ingestion_jobs_col.find_one_and_update(
+        {"_id": job_id, "status": "reserved"},
+        {"$set": {"status": "queued", "files": files, "created_at": datetime.now(UTC), "lease_expires_at": None}},
+        return_document=ReturnDocument.AFTER
+    )
+
+async def cancel_reservation(job_id: ObjectId):
+    await ingestion_jobs_col.delete_one({"_id": job_id, "status": "reserved"})
+
+async def count_queued_jobs() -> int:
+    return await ingestion_jobs_col.count_documents({"status": "queued"})
+
+async def claim_next_job(owner: str, lease_s: float) -> Optional[dict]:
+    """
+    Moves the oldest queued job, or a running job whose lease has expired
+    because its worker died, to running under `owner`. The owner must renew
+    the lease while it works; returns None when there is nothing to claim.
+    """
+    now = datetime.now(UTC)
+    return await ingestion_jobs_col.find_one_and_update(
+        {"$or": [{"status": "queued"}, {"status": "running", "lease_expires_at": {"$lt": now}}]},
+        {"$set": {"status": "running", "owner": owner, "started_at": now, "lease_expires_at": now + timedelta(seconds=lease_s)}},
+        sort=[("created_at", 1)],
+        return_document=ReturnDocument.AFTER
+    )
+
+async def update_job_progress(job_id: ObjectId, owner: str, progress: dict, lease_s: float) -> bool:
+    """Stores progress and renews the lease; False means the job was taken over and should stop."""
+    result = await ingestion_jobs_col.update_one(
+        {"_id": job_id, "owner": owner, "status": "running"},
+        {"$set": {
+            "progress": progress,
+            "errors": progress.get("errors", []),
+            "lease_expires_at": datetime.now(UTC) + timedelta(seconds=lease_s)
+        }}
+    )
+    return result.matched_count > 0
+
+async def release_job(job_id: ObjectId, owner: str):
+    """Puts a job this owner stopped working on back in the queue; ingestion is idempotent, so it simply runs again."""
+    await ingestion_jobs_col.update_one(
+        {"_id": job_id, "owner": owner, "status": "running"},
+        {"$set": {"status": "queued", "owner": None, "started_at": None, "lease_expires_at": None}}
+    )
+
+async def finish_job(job_id: ObjectId, owner: str, status: str, progress: dict, errors: List[str]):
+    await ingestion_jobs_col.update_one(
+        {"_id": job_id, "owner": owner},
+        {"$set": {"status": status, "progress": progress, "errors": errors, "finished_at": datetime.now(UTC)}}
+    )
+
+async def get_job(job_id: str, company_id: int) -> Optional[dict]:
+    if not ObjectId.is_valid(job_id):
+        return None
+    return await ingestion_jobs_col.find_one({"_id": ObjectId(job_id), "company_id": company_id})
+
+async def list_jobs(company_id: int, limit: int = 20) -> List[dict]:
+    cursor = ingestion_jobs_col.find({"company_id": company_id}).sort("created_at", -1).limit(limit)
+    return await cursor.to_list(length=limit)
@@ -0,0 +1,38 @@
+from backend.core.database import mongo_db
+from bson import ObjectId
+from pymongo import ReplaceOne
+from typing import Dict, List
+
+prompt_hashes_col = mongo_db.prompt_hashes
+ai_response_col = mongo_db.ai_responses
+
+async def ensure_prompt_hash_indexes():
+    await prompt_hashes_col.create_index([("company_id", 1), ("hash", 1)], unique=True)
+    await prompt_hashes_col.create_index("ai_response_id")
+
+async def get_company_prompt_hashes(company_id: int) -> Dict[str, str]:
+    cursor = prompt_hashes_col.find({"company_id": company_id}, {"hash": 1, "ai_response_id": 1})
+    return {doc["hash"]: str(doc["ai_response_id"]) async for doc in cursor}
+
+async def upsert_prompt_hashes(company_id: int, response_id: str, hashes: List[str]):
+    if not hashes:
+        return
+    ops = [
+        ReplaceOne(
+            {"company_id": company_id, "hash": h},
+            {"company_id": company_id, "hash": h, "ai_response_id": ObjectId(response_id)},
+            upsert=True
+        )
+        for h in hashes
+    ]
+    await prompt_hashes_col.bulk_write(ops, ordered=False)
+
+async def delete_prompt_hashes_for_response(response_id: str):
+    await prompt_hashes_col.delete_many({"ai_response_id": ObjectId(response_id)})
+
+async def delete_all_prompt_hashes(company_id: int | None = None):
+    await prompt_hashes_col.delete_many({} if company_id is None else {"company_id": company_id})
+
+def iter_indexable_responses(company_id: int | None = None):
+    query = {} if company_id is None else {"company_id": company_id}
+    return ai_response_col.find(query, {"_id": 1, "company_id": 1, "canonical_prompt": 1, "aliases": 1})
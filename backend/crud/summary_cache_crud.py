@@ -0,0 +1,59 @@
+from backend.core.database import mongo_db
+from datetime import datetime, UTC
+from pymongo.errors import OperationFailure
+from typing import Optional
+
+summary_cache_col = mongo_db.summary_cache
+
+async def ensure_summary_cache_indexes(ttl_seconds: int):
+    try:
+        await summary_cache_col.create_index("last_used_at", expireAfterSeconds=ttl_seconds)
+    except OperationFailure:
+        # The TTL changed since the index was created; update it in place.
+        await mongo_db.command("collMod", "summary_cache", index={"keyPattern": {"last_used_at": 1}, "expireAfterSeconds": ttl_seconds})
+
+async def get_summary(key: str) -> Optional[dict]:
+    return await summary_cache_col.find_one_and_update(
+        {"_id": key},
+        {"$set": {"last_used_at": datetime.now(UTC)}, "$inc": {"hits": 1}},
+        projection={"summary": 1}
+    )
+
+async def put_summary(key: str, summary: str, model: str, input_chars: int):
+    now = datetime.now(UTC)
+    await summary_cache_col.replace_one(
+        {"_id": key},
+        {
+            "summary": summary,
+            "model": model,
+            "input_chars": input_chars,
+            "size_bytes": len(summary.encode("utf-8")),
+            "hits": 0,
+            "created_at": now,
+            "last_used_at": now
+        },
+        upsert=True
+    )
+
+async def get_summary_cache_size() -> int:
+    cursor = await summary_cache_col.aggregate([{"$group": {"_id": None, "bytes": {"$sum": "$size_bytes"}}}])
+    result = await cursor.to_list(length=1)
+    return result[0]["bytes"] if result else 0
+
+async def evict_least_recent(bytes_to_free: int) -> int:
+    """Deletes the least recently used summaries until `bytes_to_free` bytes are gone. Returns the number deleted."""
+    ids = []
+    freed = 0
+    cursor = summary_cache_col.find({}, {"_id": 1, "size_bytes": 1}).sort("last_used_at", 1)
+    async for doc in cursor:
+        if freed >= bytes_to_free:
+            break
+        ids.append(doc["_id"])
+        freed += doc.get("size_bytes", 0)
+
+    if ids:
+        await summary_cache_col.delete_many({"_id": {"$in": ids}})
+    return len(ids)
+
+async def clear_summary_cache():
+    await summary_cache_col.delete_many({})
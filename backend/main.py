@@ -1,10 +1,24 @@
+import asyncio
+import time
 from contextlib import asynccontextmanager
-from fastapi import FastAPI
+from fastapi import FastAPI, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
-from backend.api.v1 import analytics, auth, feedback, prompts, responses
-from backend.core.database import check_database_health
+from backend.api.v1 import analytics, auth, documents, feedback, prompts, responses
+from backend.core.database import check_database_health, document_chunks
 import uvicorn
 from backend.core.config import settings
+from backend.core.metrics import HTTP_REQUEST_SECONDS, component_stats, render_metrics
+from backend.services.audit_writer import audit_writer
+from backend.services.embedding_service import get_embedding_stats
+from backend.services.feedback_aggregator import feedback_aggregator
+from backend.services.ingestion_jobs import ingestion_jobs
+from backend.services.llm_gateway import gateway
+from backend.services.prompt_index import prompt_index
+from backend.services.rag_pipeline import answer_flight, summary_flight
+from backend.services.rerank_scheduler import get_rerank_stats
+from backend.services.summary_cache import summary_cache
+from backend.services.model_registry import warmup_models
+from backend.services.vector_index import doc_index
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
@@ -15,9 +29,28 @@ async def lifespan(app: FastAPI):
     
     if "🔴" in status.values():
         print("Warning: One or more databases are unreachable.")
+
+    if settings.DOC_RETRIEVER == "local":
+        print("Loading local document vector index...")
+        await doc_index.load_or_build(document_chunks)
+
+    if settings.WARMUP_MODELS:
+        print("Warming up models...")
+        await asyncio.to_thread(warmup_models)
+
+    await audit_writer.start()
+    await ingestion_jobs.start()
+    if settings.FEEDBACK_WRITE_BEHIND:
+        await feedback_aggregator.start()
     
     yield
 
+    if settings.FEEDBACK_WRITE_BEHIND:
+        await feedback_aggregator.stop()
+    await ingestion_jobs.stop()
+    # Last, so the audit rows of the final feedback flush are written too.
+    await audit_writer.stop()
+
 
 app = FastAPI(lifespan=lifespan, title="Adaptive GenAI API")
 
@@ -29,11 +62,43 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+component_stats.register("embedding_batcher", lambda: get_embedding_stats()["batcher"])
+component_stats.register("embedding_cache", lambda: get_embedding_stats()["cache"])
+component_stats.register("rerank_batcher", get_rerank_stats)
+component_stats.register("llm", gateway.stats)
+component_stats.register("prompt_index", prompt_index.stats)
+component_stats.register("summary_cache", summary_cache.stats)
+component_stats.register("answer_flight", answer_flight.stats)
+component_stats.register("summary_flight", summary_flight.stats)
+component_stats.register("ingestion_jobs", ingestion_jobs.stats)
+component_stats.register("feedback_aggregator", feedback_aggregator.stats)
+component_stats.register("audit_writer", audit_writer.stats)
+
+@app.middleware("http")
+async def record_request_latency(request: Request, call_next):
+    start = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        # Label by route template so path parameters do not explode cardinality.
+        route = request.scope.get("route")
+        path = getattr(route, "path", "unmatched")
+        HTTP_REQUEST_SECONDS.labels(request.method, path, str(status)).observe(time.perf_counter() - start)
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    body, content_type = render_metrics()
+    return Response(content=body, media_type=content_type)
+
 app.include_router(auth.router, prefix="/api/v1/auth", tags=["Auth"])
 app.include_router(prompts.router, prefix="/api/v1/prompts", tags=["Prompts"])
 app.include_router(feedback.router, prefix="/api/v1/feedback", tags=["Feedback"])
 app.include_router(responses.router, prefix="/api/v1/responses", tags=["Responses"])
 app.include_router(analytics.router, prefix="/api/v1/analytics", tags=["Analytics"])
+app.include_router(documents.router, prefix="/api/v1/documents", tags=["Documents"])
 
 
 if __name__ == "__main__":
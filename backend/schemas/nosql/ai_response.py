@@ -2,6 +2,7 @@ from typing import Annotated, List, Optional
 from datetime import datetime, UTC
 from bson import ObjectId
 from pydantic import BaseModel, Field, BeforeValidator, PlainSerializer, ConfigDict
+from backend.core.vector_codec import Embedding
 
 PyObjectId = Annotated[
     str, 
@@ -15,18 +16,20 @@ class AIResponse(BaseModel):
 
     canonical_prompt: str
     response: str
-    embedding: List[float]
+    embedding: Embedding
 
     aliases: List[str] = Field(default_factory=list)
     topics: List[str] = Field(default_factory=list)
     source_doc_ids: List[str] = Field(default_factory=list)
 
     model: str
+    prompt_tokens: int = 0
     status: str = "candidate"  # canonical | candidate | quarantine
 
     reuse_count: int = 0
     rating_sum : float = 0.0
     bayesian_score: float = 0.0
+    cache_hits: int = 0
 
     company_id: int  # SQL Reference
 
@@ -1,7 +1,8 @@
-from typing import Annotated, List, Optional
+from typing import Annotated, Optional
 from datetime import datetime, UTC
 from bson import ObjectId
 from pydantic import BaseModel, Field, BeforeValidator, PlainSerializer, ConfigDict
+from backend.core.vector_codec import Embedding
 
 PyObjectId = Annotated[
     str, 
@@ -17,7 +18,8 @@ class DocumentChunk(BaseModel):
     
     chunk_index: int           
     content: str               
-    embedding: List[float]     
+    embedding: Embedding     
+    content_hash: Optional[str] = None  # sha256 of content; unchanged chunks keep their embedding on re-ingestion
 
     page_number: Optional[int] = None
     
@@ -0,0 +1,29 @@
+from typing import Annotated, Optional
+from datetime import datetime, UTC
+from bson import ObjectId
+from pydantic import BaseModel, Field, BeforeValidator, PlainSerializer, ConfigDict
+
+PyObjectId = Annotated[
+    str, 
+    BeforeValidator(lambda x: str(x) if ObjectId.is_valid(x) else x),
+    PlainSerializer(lambda x: str(x), return_type=str),
+]
+
+class DocumentMetadata(BaseModel):
+    id: Optional[PyObjectId] = Field(alias="_id", default=None)
+
+    company_id: int
+    name: str
+    source_path: str
+
+    # sha256 of the source file, set once all of its chunks are stored
+    fingerprint: Optional[str] = None
+    chunk_count: int = 0
+
+    created_at: datetime = Field(default_factory=lambda: datetime.now(UTC))
+    updated_at: datetime = Field(default_factory=lambda: datetime.now(UTC))
+
+    model_config = ConfigDict(
+        populate_by_name=True,
+        arbitrary_types_allowed=True
+    )
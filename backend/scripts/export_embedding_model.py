@@ -0,0 +1,130 @@
+import argparse
+import time
+from pathlib import Path
+from typing import List
+
+import numpy as np
+import torch
+from transformers import AutoModel, AutoTokenizer
+
+from backend.services.embedding_backends import BACKENDS, TorchBackend, load_backend
+
+MODEL_DIR = "backend/ml_models/multilingual-e5-base"
+DEFAULT_ONNX_PATH = "backend/ml_models/multilingual-e5-base-onnx/model.onnx"
+
+SAMPLE_TEXTS = [
+    "query: What is the remote work policy for engineers?",
+    "query: How do I reset my corporate VPN password?",
+    "query: Какие требования к хранению персональных данных?",
+    "passage: Model artifacts must be versioned in the registry before they are promoted to staging.",
+    "passage: Data owners approve every new consumer of a restricted dataset and review access quarterly.",
+    "passage: The feature store exposes offline and online views that are kept consistent by a nightly backfill job.",
+    "passage: All pipelines must emit lineage metadata, including source tables, transformation versions and run identifiers.",
+    "passage: Incidents affecting customer-facing models are triaged within four hours and documented in a post-mortem.",
+]
+
+
+class _LastHiddenState(torch.nn.Module):
+    def __init__(self, model):
+        super().__init__()
+        self.model = model
+
+    def forward(self, input_ids, attention_mask):
+        return self.model(input_ids=input_ids, attention_mask=attention_mask).last_hidden_state
+
+
+def export_onnx(model_dir: str, output_path: str, quantize: bool, opset: int):
+    output = Path(output_path)
+    output.parent.mkdir(parents=True, exist_ok=True)
+
+    tokenizer = AutoTokenizer.from_pretrained(model_dir)
+    model = AutoModel.from_pretrained(model_dir).eval()
+    sample = tokenizer(SAMPLE_TEXTS[:2], padding=True, return_tensors="pt")
+
+    print(f"Exporting {model_dir} -> {output}")
+    torch.onnx.export(
+        _LastHiddenState(model),
+        (sample["input_ids"], sample["attention_mask"]),
+        str(output),
+        input_names=["input_ids", "attention_mask"],
+        output_names=["last_hidden_state"],
+        dynamic_axes={
+            "input_ids": {0: "batch", 1: "sequence"},
+            "attention_mask": {0: "batch", 1: "sequence"},
+            "last_hidden_state": {0: "batch", 1: "sequence"},
+        },
+        opset_version=opset,
+    )
+    tokenizer.save_pretrained(output.parent)
+
+    if quantize:
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+
+        quantized = output.with_name(f"{output.stem}.int8{output.suffix}")
+        print(f"Quantizing -> {quantized}")
+        quantize_dynamic(str(output), str(quantized), weight_type=QuantType.QInt8)
+
+    print("Done.")
+
+
+def _embed(backend, tokenizer, texts: List[str], batch_size: int) -> tuple[np.ndarray, float]:
+    vectors = []
+    start = time.perf_counter()
+    for i in range(0, len(texts), batch_size):
+        batch = tokenizer(texts[i:i + batch_size], max_length=512, padding=True, truncation=True, return_tensors="np")
+        vectors.extend(backend.encode(batch["input_ids"], batch["attention_mask"]))
+    return np.asarray(vectors, dtype=np.float32), time.perf_counter() - start
+
+
+def check_parity(model_dir: str, backends: List[str], onnx_path: str, texts: List[str], batch_size: int, repeats: int):
+    tokenizer = AutoTokenizer.from_pretrained(model_dir)
+    texts = texts * repeats
+
+    baseline_backend = TorchBackend(model_dir, device="cpu")
+    _embed(baseline_backend, tokenizer, texts[:batch_size], batch_size)  # warm up
+    baseline, baseline_time = _embed(baseline_backend, tokenizer, texts, batch_size)
+
+    print(f"{'Backend':<8} | {'Mean cos':>9} | {'Min cos':>9} | {'Max |diff|':>10} | {'Texts/sec':>9} | {'Speedup':>7}")
+    print("-" * 68)
+    print(f"{'fp32':<8} | {1.0:>9.6f} | {1.0:>9.6f} | {0.0:>10.6f} | {len(texts) / baseline_time:>9.1f} | {1.0:>6.2f}x")
+
+    for name in backends:
+        backend = load_backend(name, model_dir, onnx_path=onnx_path)
+        _embed(backend, tokenizer, texts[:batch_size], batch_size)
+        vectors, elapsed = _embed(backend, tokenizer, texts, batch_size)
+
+        cosine = (baseline * vectors).sum(axis=1)
+        drift = np.abs(baseline - vectors).max()
+        print(f"{name:<8} | {cosine.mean():>9.6f} | {cosine.min():>9.6f} | {drift:>10.6f} | {len(texts) / elapsed:>9.1f} | {baseline_time / elapsed:>6.2f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export the bi-encoder and compare inference backends.")
+    parser.add_argument("--model-dir", default=MODEL_DIR)
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    export = sub.add_parser("export", help="Export the bi-encoder to ONNX")
+    export.add_argument("--output", default=DEFAULT_ONNX_PATH)
+    export.add_argument("--quantize", action="store_true", help="Also write a dynamically int8-quantized ONNX model")
+    export.add_argument("--opset", type=int, default=17)
+
+    parity = sub.add_parser("parity", help="Report cosine drift and speed of each backend against fp32 torch")
+    parity.add_argument("--backends", nargs="+", default=["int8", "onnx"], choices=BACKENDS)
+    parity.add_argument("--onnx-path", default=DEFAULT_ONNX_PATH)
+    parity.add_argument("--texts-file", help="One text per line; defaults to built-in samples")
+    parity.add_argument("--batch-size", type=int, default=8)
+    parity.add_argument("--repeats", type=int, default=4)
+
+    args = parser.parse_args()
+
+    if args.command == "export":
+        export_onnx(args.model_dir, args.output, args.quantize, args.opset)
+    else:
+        texts = SAMPLE_TEXTS
+        if args.texts_file:
+            texts = [line.strip() for line in Path(args.texts_file).read_text(encoding="utf-8").splitlines() if line.strip()]
+        check_parity(args.model_dir, args.backends, args.onnx_path, texts, args.batch_size, args.repeats)
+
+
+if __name__ == "__main__":
+    main()
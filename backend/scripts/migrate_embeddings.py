@@ -0,0 +1,91 @@
+import argparse
+import asyncio
+import time
+from bson.binary import Binary
+from pymongo import UpdateOne
+
+from backend.core.database import mongo_db
+from backend.core.vector_codec import EMBEDDING_FORMATS, FLOAT16_SUBTYPE, VECTOR_SUBTYPE, decode_vector, encode_vector
+
+COLLECTIONS = ("ai_responses", "document_chunks")
+
+
+def _already_encoded(value, fmt: str) -> bool:
+    if fmt == "array":
+        return isinstance(value, list)
+    subtype = VECTOR_SUBTYPE if fmt == "float32" else FLOAT16_SUBTYPE
+    return isinstance(value, Binary) and value.subtype == subtype
+
+
+async def migrate_collection(name: str, fmt: str, batch_size: int, dry_run: bool) -> int:
+    collection = mongo_db[name]
+    # Binary subtypes cannot be filtered server-side on every MongoDB version,
+    # so binary targets scan all embeddings and skip the ones already converted.
+    query = {"embedding": {"$type": "binData"}} if fmt == "array" else {"embedding": {"$exists": True}}
+    pending = await collection.count_documents(query)
+    print(f"{name}: {pending} documents to check for '{fmt}'")
+    if dry_run or not pending:
+        return 0
+
+    checked = 0
+    converted = 0
+    start = time.perf_counter()
+    last_id = None
+
+    while True:
+        page_query = query if last_id is None else {**query, "_id": {"$gt": last_id}}
+        cursor = collection.find(page_query, {"_id": 1, "embedding": 1}).sort("_id", 1).limit(batch_size)
+        docs = await cursor.to_list(length=batch_size)
+        if not docs:
+            break
+
+        ops = []
+        for doc in docs:
+            if _already_encoded(doc["embedding"], fmt):
+                continue
+            encoded = encode_vector(decode_vector(doc["embedding"]), fmt)
+            ops.append(UpdateOne({"_id": doc["_id"]}, {"$set": {"embedding": encoded}}))
+        if ops:
+            await collection.bulk_write(ops, ordered=False)
+
+        checked += len(docs)
+        converted += len(ops)
+        last_id = docs[-1]["_id"]
+        print(f"  {checked}/{pending} checked, {converted} converted ({checked / max(time.perf_counter() - start, 1e-9):.0f} docs/sec)")
+
+    return converted
+
+
+async def report_sizes():
+    for name in COLLECTIONS:
+        stats = await mongo_db.command("collStats", name)
+        print(f"{name}: {stats.get('count', 0)} docs, avg {stats.get('avgObjSize', 0):.0f} bytes, data {stats.get('size', 0) / 1e6:.1f} MB")
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Convert stored embeddings between BSON arrays and packed Binary vectors.")
+    parser.add_argument("--format", choices=EMBEDDING_FORMATS, default="float32")
+    parser.add_argument("--collections", nargs="+", choices=COLLECTIONS, default=list(COLLECTIONS))
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--dry-run", action="store_true")
+    args = parser.parse_args()
+
+    if args.format == "float16" and "ai_responses" in args.collections:
+        parser.error("ai_responses cannot be stored as float16: Atlas $vectorSearch reads array and float32 only")
+
+    print("Before:")
+    await report_sizes()
+
+    for name in args.collections:
+        await migrate_collection(name, args.format, args.batch_size, args.dry_run)
+
+    print("After:")
+    await report_sizes()
+    if "document_chunks" in args.collections:
+        print(f"Set EMBEDDING_STORAGE_FORMAT={args.format} so new document chunks are written in the same format.")
+    if "ai_responses" in args.collections:
+        print(f"Set RESPONSE_EMBEDDING_STORAGE_FORMAT={args.format} so new responses are written in the same format.")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
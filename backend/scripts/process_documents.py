@@ -1,143 +1,36 @@
+import argparse
 import asyncio
 from pathlib import Path
-from bson import ObjectId
 from typing import Dict, List
 
 # Import your existing components
-from backend.services.document_processor import DocumentProcessor
-from backend.schemas.nosql.document_chunk import DocumentChunk
 from backend.core.database import mongo_db
+from backend.core.config import settings
+from backend.core.vector_codec import decode_vector
+from backend.crud import document_crud
+from backend.services.ingestion import IngestionItem, IngestionPipeline, load_manifest, scan_directory
+from backend.services.vector_index import doc_index
 
 # Use your existing collection
 document_chunks_col = mongo_db.document_chunks
 
-async def process_and_store_documents() -> Dict:
+RAW_DOCS_PATH = Path("backend/storage/raw_docs")
+
+async def process_and_store_documents(items: List[IngestionItem], workers: int) -> Dict:
     """
-    Process all 6 documents and store chunks directly to MongoDB.
+    Runs the staged ingestion pipeline over `items`. Unchanged files are
+    skipped and changed ones only re-embed the chunks that changed.
     """
-    raw_docs_path = Path("backend/storage/raw_docs")
-    
-    # Document mapping
-    documents_info = [
-        {
-            "name": "AIML Project Implementation Handbook",
-            "company_id": 1,
-        },
-        {
-            "name": "Internal Machine Learning Platform User Manual", 
-            "company_id": 1,
-        },
-        {
-            "name": "Data Science Team Playbook",
-            "company_id": 1,
-        },
-        {
-            "name": "Data Governance Policy Framework",
-            "company_id": 2,
-        },
-        {
-            "name": "Data Engineering Standards",
-            "company_id": 2,
-        },
-        {
-            "name": "Enterprise Data Platform Implementation",
-            "company_id": 2,
-        }
-    ]
-    
-    processor = DocumentProcessor()
-    statistics = {
-        "total_documents": 0,
-        "total_chunks": 0,
-        "company_1_chunks": 0,
-        "company_2_chunks": 0,
-        "errors": []
-    }
-    
     print("="*70)
     print("DOCUMENT PROCESSING AND STORAGE TO MONGODB")
     print("="*70)
     print(f"Collection: {document_chunks_col.name}")
+    print(f"Documents: {len(items)}")
+    print(f"Parse workers: {workers}")
     print("-"*70)
-    
-    for doc_info in documents_info:
-        try:
-            # Generate a unique parent ID for this document
-            parent_id = ObjectId()
-            
-            # Find the actual file
-            file_name = f"{doc_info['name']}.docx"
-            file_path = raw_docs_path / file_name
-            
-            if not file_path.exists():
-                error_msg = f"File not found: {file_path}"
-                print(f"❌ {error_msg}")
-                statistics["errors"].append(error_msg)
-                continue
-            
-            print(f"\n📄 Processing: {doc_info['name']}")
-            print(f"   Company ID: {doc_info['company_id']}")
-            print(f"   Parent ID: {parent_id}")
-            
-            # Process the document - parent_doc_id must be string for your schema
-            chunks: List[DocumentChunk] = processor.process_docx(
-                file_path=str(file_path),
-                parent_id=str(parent_id),  # Convert to string for PyObjectId
-                company_id=doc_info['company_id']
-            )
-            
-            if not chunks:
-                error_msg = f"No chunks generated for {doc_info['name']}"
-                print(f"⚠️  {error_msg}")
-                statistics["errors"].append(error_msg)
-                continue
-            
-            print(f"   Generated {len(chunks)} chunks")
-            
-            # Insert chunks into MongoDB (ASYNC)
-            if chunks:
-                # Prepare chunks for insertion
-                chunks_to_insert = []
-                for chunk in chunks:
-                    # Use model_dump with by_alias=True to convert to dict with MongoDB field names
-                    chunk_dict = chunk.model_dump(by_alias=True, exclude_none=True)
-                    
-                    # Remove _id if it's None (let MongoDB generate it)
-                    if "_id" in chunk_dict and chunk_dict["_id"] is None:
-                        del chunk_dict["_id"]
-                    
-                    chunks_to_insert.append(chunk_dict)
-                
-                # Insert into MongoDB (AWAIT the async operation)
-                result = await document_chunks_col.insert_many(chunks_to_insert)
-                inserted_count = len(result.inserted_ids)
-                
-                # Update statistics
-                statistics["total_documents"] += 1
-                statistics["total_chunks"] += inserted_count
-                
-                if doc_info['company_id'] == 1:
-                    statistics["company_1_chunks"] += inserted_count
-                else:
-                    statistics["company_2_chunks"] += inserted_count
-                
-                print(f"   ✅ Stored {inserted_count} chunks")
-                
-                # Show sample info
-                if chunks:
-                    sample = chunks[0]
-                    print(f"   Sample parent_doc_id: {sample.parent_doc_id}")
-                    print(f"   Sample chunk_index: {sample.chunk_index}")
-                    print(f"   Sample embedding length: {len(sample.embedding)}")
-            
-        except Exception as e:
-            error_msg = f"Error processing {doc_info['name']}: {str(e)}"
-            print(f"❌ {error_msg}")
-            statistics["errors"].append(error_msg)
-            import traceback
-            traceback.print_exc()
-    
-    return statistics
+
+    pipeline = IngestionPipeline(parse_workers=workers)
+    return await pipeline.run(items)
 
 async def verify_chunks_structure():
     """Verify that chunks follow the exact schema structure."""
@@ -154,8 +47,9 @@ async def verify_chunks_structure():
         print(f"  parent_doc_id: {sample_chunk.get('parent_doc_id')} (type: {type(sample_chunk.get('parent_doc_id'))})")
         print(f"  company_id: {sample_chunk.get('company_id')} (type: {type(sample_chunk.get('company_id'))})")
         print(f"  chunk_index: {sample_chunk.get('chunk_index')} (type: {type(sample_chunk.get('chunk_index'))})")
+        print(f"  content_hash: {sample_chunk.get('content_hash')}")
         print(f"  content length: {len(sample_chunk.get('content', ''))} chars")
-        print(f"  embedding length: {len(sample_chunk.get('embedding', []))}")
+        print(f"  embedding length: {len(decode_vector(sample_chunk.get('embedding', [])))}")
         print(f"  page_number: {sample_chunk.get('page_number')}")
         print(f"  created_at: {sample_chunk.get('created_at')}")
         print(f"  schema_version: {sample_chunk.get('schema_version')}")
@@ -166,52 +60,69 @@ async def verify_chunks_structure():
         assert isinstance(sample_chunk.get('company_id'), int), "company_id should be int"
         assert isinstance(sample_chunk.get('chunk_index'), int), "chunk_index should be int"
         assert isinstance(sample_chunk.get('content'), str), "content should be string"
-        assert isinstance(sample_chunk.get('embedding'), list), "embedding should be list"
+        assert len(decode_vector(sample_chunk.get('embedding'))) == 768, "embedding should have 768 dimensions"
         print("✓ All types match schema")
     else:
         print("No chunks found in collection")
 
 async def main():
     """Main async function."""
+    parser = argparse.ArgumentParser(description="Parse, chunk, embed and store documents; reruns only redo what changed.")
+    source = parser.add_mutually_exclusive_group()
+    source.add_argument("--manifest", type=Path, help="JSON list of {path, company_id, name?} (default: raw_docs/manifest.json)")
+    source.add_argument("--dir", type=Path, help="ingest every .docx in this directory for --company-id")
+    parser.add_argument("--company-id", type=int, help="company for --dir")
+    parser.add_argument("--workers", type=int, default=settings.INGEST_PARSE_WORKERS, help="parse processes")
+    parser.add_argument("--clear", action="store_true", help="delete every stored document and chunk first")
+    args = parser.parse_args()
+
     print("\n🚀 Starting document processing...")
-    
-    # Check if raw_docs directory exists
-    raw_docs_path = Path("backend/storage/raw_docs")
-    if not raw_docs_path.exists():
-        print(f"❌ Directory not found: {raw_docs_path}")
-        return
-    
-    # List available files
-    docx_files = list(raw_docs_path.glob("*.docx"))
-    if not docx_files:
-        print(f"❌ No .docx files found in {raw_docs_path}")
+
+    if args.dir:
+        if args.company_id is None:
+            parser.error("--dir needs --company-id")
+        items = scan_directory(args.dir, args.company_id)
+    else:
+        manifest = args.manifest or RAW_DOCS_PATH / "manifest.json"
+        if not manifest.exists():
+            print(f"❌ Manifest not found: {manifest}")
+            return
+        items = load_manifest(manifest)
+
+    if not items:
+        print("❌ No documents to ingest")
         return
-    
-    print(f"📁 Found {len(docx_files)} .docx files:")
-    for file in docx_files:
-        print(f"   - {file.name}")
-    
-    # Optional: Clear existing chunks
+
+    print(f"📁 Found {len(items)} documents:")
+    for item in items:
+        print(f"   - {item.path.name} (company {item.company_id})")
+
+    await document_crud.ensure_document_indexes()
     existing_count = await document_chunks_col.count_documents({})
-    if existing_count > 0:
-        print(f"\n⚠️  Collection has {existing_count} existing chunks")
-        response = input("Clear existing chunks? (yes/no): ")
-        if response.lower() == 'yes':
-            result = await document_chunks_col.delete_many({})
-            print(f"✓ Cleared {result.deleted_count} chunks")
-    
+    if args.clear:
+        deleted = await document_crud.delete_all_documents()
+        doc_index.clear()
+        print(f"✓ Cleared {deleted} chunks")
+    elif existing_count > 0:
+        print(f"\n⚠️  Collection has {existing_count} existing chunks; only changed documents are re-ingested")
+        if not await document_crud.documents_col.count_documents({}):
+            print("   None of them belong to a document record; run once with --clear to avoid duplicates")
+
     # Process documents
-    stats = await process_and_store_documents()
-    
+    stats = await process_and_store_documents(items, args.workers)
+
     # Summary
     print("\n" + "="*70)
     print("SUMMARY")
     print("="*70)
-    print(f"Documents processed: {stats['total_documents']}")
-    print(f"Total chunks stored: {stats['total_chunks']}")
-    print(f"  - Company 1: {stats['company_1_chunks']} chunks")
-    print(f"  - Company 2: {stats['company_2_chunks']} chunks")
-    
+    print(f"Documents processed: {stats['documents_done']} (skipped {stats['documents_skipped']} unchanged)")
+    print(f"New chunks stored: {stats['chunks_written']} in {stats['elapsed_s']:.1f}s ({stats['chunks_per_sec']:.1f} chunks/sec)")
+    print(f"Unchanged chunks kept: {stats['chunks_reused']}, vanished chunks deleted: {stats['chunks_deleted']}")
+    for company_id, count in sorted(stats['chunks_by_company'].items()):
+        print(f"  - Company {company_id}: {count} chunks")
+    stage_times = ", ".join(f"{stage} {seconds:.1f}s" for stage, seconds in stats['stage_seconds'].items())
+    print(f"Stage time: {stage_times}")
+
     if stats['errors']:
         print(f"\nErrors: {len(stats['errors'])}")
         for error in stats['errors']:
@@ -227,4 +138,4 @@ async def main():
 
 if __name__ == "__main__":
     # Run the async main function
-    asyncio.run(main())
\ No newline at end of file
+    asyncio.run(main())
@@ -8,7 +8,10 @@ from dateutil import parser
 
 # Import your existing services
 from backend.services.bi_encoder import create_embedding, count_tokens
-from backend.services.llm import summarize, TOKENIZER
+from backend.services.summary_cache import summary_cache
+from backend.services.model_registry import get_tokenizer
+from backend.core.vector_codec import encode_response_embedding
+from backend.services.prompt_index import prompt_index
 from backend.core.database import get_sql_db, mongo_db, engine
 from backend.schemas.sql import Base
 
@@ -33,10 +36,11 @@ def get_date(date_str: str) -> datetime:
 
 def truncate_for_embedding(text: str, max_tokens: int = 500) -> str:
     """Truncate text to fit within embedding model's token limit"""
-    tokens = TOKENIZER.encode(text)
+    tokenizer = get_tokenizer()
+    tokens = tokenizer.encode(text)
     if len(tokens) > max_tokens:
         truncated_tokens = tokens[:max_tokens]
-        return TOKENIZER.decode(truncated_tokens)
+        return tokenizer.decode(truncated_tokens)
     return text
 
 def generate_real_embedding(text: str) -> list[float]:
@@ -65,7 +69,7 @@ async def generate_summary_for_response(response_text: str) -> str:
     # If response is very long, generate a summary
     if token_count > 300:
         try:
-            summary = await summarize(response_text)
+            summary = await summary_cache.summarize(response_text)
             logger.debug(f"Generated summary for long response (original: {token_count} tokens)")
             return summary
         except Exception as e:
@@ -540,13 +544,13 @@ async def seed():
         embedding = generate_real_embedding(r["response"])
         
         # Generate a summary for the response if it's long
-        summarized_response = generate_summary_for_response(r["response"])
+        summarized_response = await generate_summary_for_response(r["response"])
         
         doc = {
             "_id": get_oid(r["_id"]),
             "canonical_prompt": r["canonical_prompt"],
             "response": summarized_response if summarized_response != r["response"] else r["response"],
-            "embedding": embedding,
+            "embedding": encode_response_embedding(embedding),
             "aliases": r.get("aliases", []),
             "topics": r.get("topics", []),
             "source_doc_ids": r.get("source_doc_ids", []),
@@ -574,6 +578,9 @@ async def seed():
     if clean_responses:
         await ai_responses_col.insert_many(clean_responses)
         logger.info(f"✅ Mongo: Inserted {len(clean_responses)} AI responses with real embeddings.")
+
+    indexed = await prompt_index.rebuild()
+    logger.info(f"✅ Mongo: Indexed prompts and aliases of {indexed} AI responses for exact-match lookup.")
     
     # 3. Mongo: Prompt Events
     # -----------------------------------------------
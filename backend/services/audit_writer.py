@@ -0,0 +1,162 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, List, Optional
+from backend.core.config import settings
+from backend.core.database import audit_engine
+from backend.crud import ai_crud
+
+
+class AuditWriter:
+    """
+    Buffers generation_events rows and writes them from one dedicated thread
+    over the audit engine's single connection, as multi-row inserts of up to
+    `batch_size` rows. A partial batch is written once its oldest row has
+    waited `max_wait_ms`. The buffer holds at most `max_queue` rows; beyond
+    that new rows are dropped and counted rather than slowing down feedback.
+    When a batch insert fails, its rows are retried one at a time.
+    """
+
+    def __init__(self, engine: Any, batch_size: int, max_wait_ms: float, max_queue: int, shutdown_timeout_s: float):
+        self.engine = engine
+        self.batch_size = max(1, batch_size)
+        self.max_wait = max(0.0, max_wait_ms) / 1000
+        self.max_queue = max(1, max_queue)
+        self.shutdown_timeout = shutdown_timeout_s
+
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._thread: Optional[ThreadPoolExecutor] = None
+        self._closing = asyncio.Event()
+
+        self._enqueued = 0
+        self._written = 0
+        self._batches = 0
+        self._max_batch = 0
+        self._dropped = 0
+        self._failed = 0
+        self._write_total = 0.0
+        self._write_max = 0.0
+
+    async def start(self):
+        self._queue = asyncio.Queue(maxsize=self.max_queue)
+        self._thread = ThreadPoolExecutor(max_workers=1, thread_name_prefix="audit-writer")
+        self._closing = asyncio.Event()
+        self._worker = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stops taking rows and waits up to `shutdown_timeout_s` for the buffered ones to be written."""
+        self._closing.set()
+        if self._queue is not None:
+            try:
+                await asyncio.wait_for(self._queue.join(), timeout=self.shutdown_timeout)
+            except asyncio.TimeoutError:
+                print(f"Audit writer stopped with {self._queue.qsize()} rows unwritten")
+        if self._worker:
+            self._worker.cancel()
+            await asyncio.gather(self._worker, return_exceptions=True)
+            self._worker = None
+        if self._thread:
+            self._thread.shutdown(wait=True)
+            self._thread = None
+
+    def submit(self, user_id: int, mongo_event_id: str, rating: int):
+        if self._queue is None or self._closing.is_set():
+            self._dropped += 1
+            return
+        try:
+            self._queue.put_nowait(({"user_id": user_id, "mongo_event_id": mongo_event_id, "rating": rating}, time.perf_counter()))
+            self._enqueued += 1
+        except asyncio.QueueFull:
+            self._dropped += 1
+
+    async def _collect(self) -> List[tuple]:
+        queue: asyncio.Queue = self._queue # type: ignore
+        batch = [await queue.get()]
+        deadline = batch[0][1] + self.max_wait
+
+        while len(batch) < self.batch_size:
+            try:
+                batch.append(queue.get_nowait())
+                continue
+            except asyncio.QueueEmpty:
+                pass
+
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0 or self._closing.is_set():
+                break
+            # Wait for the next row, but let stop() cut the wait short so a partial batch is flushed at once.
+            getter = asyncio.ensure_future(queue.get())
+            closing = asyncio.ensure_future(self._closing.wait())
+            await asyncio.wait((getter, closing), timeout=remaining, return_when=asyncio.FIRST_COMPLETED)
+            closing.cancel()
+            if not getter.done():
+                getter.cancel()
+                break
+            batch.append(getter.result())
+
+        return batch
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = await self._collect()
+            rows = [row for row, _ in batch]
+            start = time.perf_counter()
+            try:
+                await loop.run_in_executor(self._thread, self._write, rows)
+                self._record(len(rows), time.perf_counter() - start)
+            except Exception as e:
+                print(f"Audit batch of {len(rows)} rows failed, retrying row by row: {e}")
+                written = await loop.run_in_executor(self._thread, self._write_each, rows)
+                self._record(written, time.perf_counter() - start)
+                self._failed += len(rows) - written
+            finally:
+                for _ in batch:
+                    self._queue.task_done() # type: ignore
+
+    def _write(self, rows: List[dict]):
+        with self.engine.begin() as conn:
+            ai_crud.insert_generation_audits(conn, rows)
+
+    def _write_each(self, rows: List[dict]) -> int:
+        """Writes rows in separate transactions so only the offending ones are lost. Returns the number written."""
+        written = 0
+        for row in rows:
+            try:
+                self._write([row])
+                written += 1
+            except Exception as e:
+                print(f"Audit log failed for {row}: {e}")
+        return written
+
+    def _record(self, size: int, seconds: float):
+        self._written += size
+        self._batches += 1
+        self._max_batch = max(self._max_batch, size)
+        self._write_total += seconds
+        self._write_max = max(self._write_max, seconds)
+
+    def stats(self) -> dict:
+        return {
+            "queued": self._queue.qsize() if self._queue else 0,
+            "max_queue": self.max_queue,
+            "enqueued": self._enqueued,
+            "written": self._written,
+            "batches": self._batches,
+            "avg_batch_size": self._written / self._batches if self._batches else 0.0,
+            "max_batch_size": self._max_batch,
+            "dropped": self._dropped,
+            "failed": self._failed,
+            "avg_write_ms": 1000 * self._write_total / self._batches if self._batches else 0.0,
+            "max_write_ms": 1000 * self._write_max,
+        }
+
+
+audit_writer = AuditWriter(
+    engine=audit_engine,
+    batch_size=settings.AUDIT_BATCH_SIZE,
+    max_wait_ms=settings.AUDIT_MAX_WAIT_MS,
+    max_queue=settings.AUDIT_MAX_QUEUE,
+    shutdown_timeout_s=settings.AUDIT_SHUTDOWN_TIMEOUT_S
+)
@@ -0,0 +1,118 @@
+import asyncio
+import time
+from typing import Any, Callable, Dict, List, Sequence, Tuple
+
+
+class MicroBatcher:
+    """
+    Gathers items submitted by concurrent coroutines into one batch and runs
+    `process_batch` on it in a worker thread. A batch is flushed when it reaches
+    `max_batch_size` or when its oldest item has waited `max_wait_ms`.
+    """
+
+    def __init__(self, process_batch: Callable[[List[Any]], List[Any]], max_batch_size: int, max_wait_ms: float, name: str):
+        self.process_batch = process_batch
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max(0.0, max_wait_ms) / 1000
+        self.name = name
+
+        self._queue: asyncio.Queue | None = None
+        self._worker: asyncio.Task | None = None
+        self._loop: asyncio.AbstractEventLoop | None = None
+
+        self._batches = 0
+        self._items = 0
+        self._max_batch = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+        self._batch_sizes: Dict[int, int] = {}
+
+    def _ensure_worker(self) -> asyncio.Queue:
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop or self._worker is None or self._worker.done():
+            self._loop = loop
+            self._queue = asyncio.Queue()
+            self._worker = loop.create_task(self._run())
+        return self._queue # type: ignore
+
+    async def submit(self, item: Any) -> Any:
+        results = await self.submit_many([item])
+        return results[0]
+
+    async def submit_many(self, items: Sequence[Any]) -> List[Any]:
+        if not items:
+            return []
+
+        queue = self._ensure_worker()
+        loop = asyncio.get_running_loop()
+        futures = []
+        for item in items:
+            fut = loop.create_future()
+            queue.put_nowait((item, fut, time.perf_counter()))
+            futures.append(fut)
+
+        return list(await asyncio.gather(*futures))
+
+    async def _collect(self) -> List[Tuple[Any, asyncio.Future, float]]:
+        queue: asyncio.Queue = self._queue # type: ignore
+        batch = [await queue.get()]
+        deadline = batch[0][2] + self.max_wait
+
+        while len(batch) < self.max_batch_size:
+            try:
+                batch.append(queue.get_nowait())
+                continue
+            except asyncio.QueueEmpty:
+                pass
+
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(queue.get(), timeout=remaining))
+            except asyncio.TimeoutError:
+                break
+
+        return batch
+
+    async def _run(self):
+        while True:
+            batch = await self._collect()
+            batch = [entry for entry in batch if not entry[1].done()]
+            if not batch:
+                continue
+
+            started = time.perf_counter()
+            self._record(len(batch), [started - enqueued for _, _, enqueued in batch])
+
+            try:
+                results = await asyncio.to_thread(self.process_batch, [item for item, _, _ in batch])
+            except Exception as e:
+                for _, fut, _ in batch:
+                    if not fut.done():
+                        fut.set_exception(e)
+                continue
+
+            for (_, fut, _), result in zip(batch, results):
+                if not fut.done():
+                    fut.set_result(result)
+
+    def _record(self, size: int, waits: List[float]):
+        self._batches += 1
+        self._items += size
+        self._max_batch = max(self._max_batch, size)
+        self._batch_sizes[size] = self._batch_sizes.get(size, 0) + 1
+        self._wait_total += sum(waits)
+        self._wait_max = max(self._wait_max, max(waits))
+
+    def stats(self) -> dict:
+        return {
+            "name": self.name,
+            "batches": self._batches,
+            "items": self._items,
+            "avg_batch_size": self._items / self._batches if self._batches else 0.0,
+            "max_batch_size": self._max_batch,
+            "batch_size_counts": dict(sorted(self._batch_sizes.items())),
+            "avg_queue_wait_ms": 1000 * self._wait_total / self._items if self._items else 0.0,
+            "max_queue_wait_ms": 1000 * self._wait_max,
+        }
@@ -1,36 +1,82 @@
-import torch.nn.functional as F
-import torch
-
-from torch import Tensor
-from transformers import AutoTokenizer, AutoModel
 from typing import List
+from pathlib import Path
+from backend.core.config import settings
+from backend.services.embedding_cache import EmbeddingCache
+from backend.services.model_registry import EMBEDDING_MODEL_ID, get_embedding_backend, get_tokenizer
+
+EMBEDDING_DIM = 768
+
+def _cache_namespace() -> str:
+    """Vectors differ per backend and, for onnx, per exported model file (fp32 vs int8)."""
+    namespace = f"{EMBEDDING_MODEL_ID}:{settings.EMBEDDING_BACKEND}"
+    if settings.EMBEDDING_BACKEND == "onnx":
+        # Size and mtime stand in for a hash of the file, so swapping the export in place also changes it.
+        onnx_path = Path(settings.EMBEDDING_ONNX_PATH).resolve()
+        namespace += f":{onnx_path}"
+        if onnx_path.exists():
+            namespace += f":{onnx_path.stat().st_size}:{onnx_path.stat().st_mtime_ns}"
+    return namespace
+
+embedding_cache = EmbeddingCache(
+    model_id=_cache_namespace(),
+    max_bytes=settings.EMBED_CACHE_MAX_MB * 1024 * 1024,
+    directory=Path(settings.EMBED_CACHE_DIR) / EMBEDDING_MODEL_ID if settings.EMBED_CACHE_DIR else None,
+    dim=EMBEDDING_DIM
+)
+
+def _forward(input_texts: List[str]) -> List[List[float]]:
+    batch_dict = get_tokenizer()(input_texts, max_length=512, padding=True, truncation=True, return_tensors='np')
+    return get_embedding_backend().encode(batch_dict['input_ids'], batch_dict['attention_mask'])
+
+def encode_and_cache(input_texts: List[str]) -> List[List[float]]:
+    if not input_texts:
+        return []
 
-device = "cuda" if torch.cuda.is_available() else "cpu"
-model = AutoModel.from_pretrained("backend/ml_models/multilingual-e5-base").to(device)
-tokenizer = AutoTokenizer.from_pretrained("backend/ml_models/multilingual-e5-base")
+    embeddings = _forward(input_texts)
+    for text, embedding in zip(input_texts, embeddings):
+        embedding_cache.put(text, embedding)
+    return embeddings
 
-def average_pool(last_hidden_states: Tensor,
-                 attention_mask: Tensor) -> Tensor:
-    last_hidden = last_hidden_states.masked_fill(~attention_mask[..., None].bool(), 0.0)
-    return last_hidden.sum(dim=1) / attention_mask.sum(dim=1)[..., None]
+def create_embeddings(input_texts: List[str]) -> List[List[float]]:
+    results = [embedding_cache.get(text) for text in input_texts]
+    missing = [i for i, r in enumerate(results) if r is None]
+
+    if missing:
+        computed = encode_and_cache([input_texts[i] for i in missing])
+        for i, embedding in zip(missing, computed):
+            results[i] = embedding
+
+    return results # type: ignore
 
 def create_embedding(input_text : str) -> List[float]:
-    batch_dict = tokenizer([input_text], max_length=512, padding=True, truncation=True, return_tensors='pt')
+    return create_embeddings([input_text])[0]
+
+def create_embeddings_bucketed(input_texts: List[str], batch_size: int) -> List[List[float]]:
+    """Embeds texts in batches of similar token length so little of each batch is padding."""
+    if not input_texts:
+        return []
 
-    batch_dict = {k: v.to(device) for k, v in batch_dict.items()}
-    outputs = model(**batch_dict)
-    embedding = average_pool(outputs.last_hidden_state, batch_dict['attention_mask'])
-    embedding = F.normalize(embedding, p=2, dim=1)
+    lengths = [len(ids) for ids in get_tokenizer()(input_texts, max_length=512, truncation=True)["input_ids"]]
+    order = sorted(range(len(input_texts)), key=lambda i: lengths[i])
 
-    return embedding[0].cpu().tolist()
+    results: List[List[float]] = [None] * len(input_texts) # type: ignore
+    for start in range(0, len(order), max(1, batch_size)):
+        batch = order[start:start + batch_size]
+        for i, embedding in zip(batch, create_embeddings([input_texts[i] for i in batch])):
+            results[i] = embedding
+
+    return results
 
 def count_tokens(text: str) -> int:
-    tokens = tokenizer.encode(text)
+    tokens = get_tokenizer().encode(text)
     return len(tokens)
 
 if __name__ == "__main__":
+    import torch
+    import torch.nn.functional as F
+
     print(f"CUDA available: {torch.cuda.is_available()}")
-    print(f"CrossEncoder device: {model.device}")
+    print(f"Embedding backend: {get_embedding_backend().name}")
     test_pairs = [
         ("I love this movie", "I do not love this movie"),               
         ("The dog bit the man", "The man bit the dog"),                 
@@ -42,8 +88,8 @@ if __name__ == "__main__":
     print("-" * 100)
 
     for s1, s2 in test_pairs:
-        emb1 = torch.tensor(create_embedding(s1)).to(device)
-        emb2 = torch.tensor(create_embedding(s2)).to(device)
+        emb1 = torch.tensor(create_embedding(s1))
+        emb2 = torch.tensor(create_embedding(s2))
 
         # Cosine similarity using torch
         score = F.cosine_similarity(emb1.unsqueeze(0), emb2.unsqueeze(0)).item()
@@ -0,0 +1,39 @@
+from typing import List, Optional, Tuple
+
+
+def cascade_candidates(
+    candidates: List[dict],
+    min_score: float,
+    margin: float,
+    max_candidates: int,
+    accept_score: Optional[float] = None,
+) -> Tuple[List[dict], List[dict]]:
+    """
+    First ranking stage over `$vectorSearch` hits, using their `score`
+    (`$meta: vectorSearchScore`). Returns (accepted, ambiguous):
+
+    - hits below `min_score`, or more than `margin` below the best hit, are dropped
+    - hits at or above `accept_score` are accepted without cross-encoder scoring
+    - everything else is ambiguous and goes to the cross-encoder, best first,
+      capped at `max_candidates`
+
+    A wider `margin` and a higher `max_candidates` favour recall; narrower
+    values send fewer pairs to the cross-encoder.
+    """
+    if not candidates:
+        return [], []
+
+    ranked = sorted(candidates, key=lambda c: c.get("score", 0.0), reverse=True)
+    cutoff = max(min_score, ranked[0].get("score", 0.0) - margin)
+
+    accepted, ambiguous = [], []
+    for candidate in ranked:
+        score = candidate.get("score", 0.0)
+        if score < cutoff:
+            break
+        if accept_score is not None and score >= accept_score:
+            accepted.append(candidate)
+        elif len(ambiguous) < max_candidates:
+            ambiguous.append(candidate)
+
+    return accepted, ambiguous
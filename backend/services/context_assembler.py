@@ -0,0 +1,131 @@
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional, Tuple
+
+MAX_OVERLAP_CHARS = 1000
+
+
+@dataclass(eq=False)
+class ContextSection:
+    label: str
+    text: str
+    score: float
+    source_ids: List[str] = field(default_factory=list)
+    parent_doc_id: Optional[str] = None
+    chunk_index: Optional[int] = None
+    tokens: int = 0
+
+    def render(self) -> str:
+        return f"[{self.label}]: {self.text}"
+
+
+@dataclass
+class AssembledContext:
+    text: str
+    sections: List[ContextSection]
+    dropped: int
+    context_tokens: int
+
+    @property
+    def source_ids(self) -> List[str]:
+        return [sid for s in self.sections for sid in s.source_ids]
+
+
+def _overlap(left: str, right: str) -> int:
+    """Length of the longest suffix of `left` that is also a prefix of `right`."""
+    limit = min(len(left), len(right), MAX_OVERLAP_CHARS)
+    for size in range(limit, 0, -1):
+        if left.endswith(right[:size]):
+            return size
+    return 0
+
+
+def join_overlapping(left: str, right: str) -> str:
+    size = _overlap(left, right)
+    if size:
+        return left + right[size:]
+    return f"{left}\n{right}"
+
+
+def dedupe_sections(sections: List[ContextSection]) -> List[ContextSection]:
+    """Drops sections whose text is repeated or contained in a higher-scoring section."""
+    kept: List[ContextSection] = []
+    for section in sorted(sections, key=lambda s: s.score, reverse=True):
+        text = " ".join(section.text.split())
+        if any(text in " ".join(k.text.split()) for k in kept):
+            continue
+        kept.append(section)
+
+    order = {id(s): i for i, s in enumerate(sections)}
+    return sorted(kept, key=lambda s: order[id(s)])
+
+
+def merge_adjacent(sections: List[ContextSection]) -> List[ContextSection]:
+    """
+    Joins chunks with consecutive `chunk_index` from the same parent document
+    into one section, removing the text they overlap on. The merged section
+    keeps the best score and the position of its first chunk.
+    """
+    position = {id(s): i for i, s in enumerate(sections)}
+    groups: Dict[str, List[ContextSection]] = {}
+    for section in sections:
+        if section.parent_doc_id is not None and section.chunk_index is not None:
+            groups.setdefault(section.parent_doc_id, []).append(section)
+
+    replaced: Dict[int, Optional[ContextSection]] = {}
+    for chunks in groups.values():
+        chunks.sort(key=lambda s: s.chunk_index) # type: ignore
+        run = [chunks[0]]
+        for chunk in chunks[1:] + [None]: # type: ignore
+            if chunk is not None and chunk.chunk_index == run[-1].chunk_index + 1: # type: ignore
+                run.append(chunk)
+                continue
+            if len(run) > 1:
+                text = run[0].text
+                for part in run[1:]:
+                    text = join_overlapping(text, part.text)
+                merged = ContextSection(
+                    label=run[0].label,
+                    text=text,
+                    score=max(s.score for s in run),
+                    source_ids=[sid for s in run for sid in s.source_ids],
+                    parent_doc_id=run[0].parent_doc_id,
+                    chunk_index=run[0].chunk_index
+                )
+                first = min(run, key=lambda s: position[id(s)])
+                for s in run:
+                    replaced[id(s)] = merged if s is first else None
+            run = [chunk] if chunk is not None else []
+
+    result = []
+    for section in sections:
+        if id(section) not in replaced:
+            result.append(section)
+        elif replaced[id(section)] is not None:
+            result.append(replaced[id(section)])
+    return result
+
+
+def fit_to_budget(sections: List[ContextSection], budget: int, count_tokens: Callable[[str], int]) -> Tuple[List[ContextSection], int]:
+    """Drops the lowest-scoring sections until the rendered sections fit in `budget` tokens."""
+    for section in sections:
+        section.tokens = count_tokens(section.render())
+
+    kept = list(sections)
+    total = sum(s.tokens for s in kept)
+    for section in sorted(sections, key=lambda s: s.score):
+        if total <= budget:
+            break
+        kept.remove(section)
+        total -= section.tokens
+    return kept, total
+
+
+def assemble_context(sections: List[ContextSection], budget: int, count_tokens: Callable[[str], int]) -> AssembledContext:
+    prepared = merge_adjacent(dedupe_sections(sections))
+    kept, tokens = fit_to_budget(prepared, budget, count_tokens)
+    return AssembledContext(
+        text="\n\n".join(s.render() for s in kept),
+        sections=kept,
+        dropped=len(prepared) - len(kept),
+        context_tokens=tokens
+    )
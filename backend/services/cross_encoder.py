@@ -1,31 +1,45 @@
-import torch.nn as nn
-from sentence_transformers import CrossEncoder
-from typing import List
-import torch
+from typing import List, Sequence, Tuple
+from backend.services.model_registry import get_reranker, pin_cuda_device
 
-model = CrossEncoder(
-    "./backend/ml_models/bge-reranker-v2-m3",
-    activation_fn=nn.Sigmoid(),
-    device="cuda" if torch.cuda.is_available() else "cpu"
-)
+RERANK_THRESHOLD = 0.25
+MEMORY_THRESHOLD = 0.70
+PREDICT_BATCH_SIZE = 16
 
-def get_relevant_content(query: str, docs: List[str], threshold: float, top_n: int = 5) -> List[str]:
-    if not docs:
+def score_pairs(pairs: List[Sequence[str]]) -> List[float]:
+    if not pairs:
         return []
 
-    pairs = [[query, doc] for doc in docs]
-    scores = model.predict(pairs)
+    pin_cuda_device()
+    # Similar lengths in each forward pass keep padding low when short memory
+    # questions and long document chunks share one scheduler batch.
+    order = sorted(range(len(pairs)), key=lambda i: len(pairs[i][0]) + len(pairs[i][1]))
+    scores = get_reranker().predict([list(pairs[i]) for i in order], batch_size=PREDICT_BATCH_SIZE)
+
+    results = [0.0] * len(pairs)
+    for i, score in zip(order, scores):
+        results[i] = float(score)
+    return results
 
+def select_relevant_scored(docs: List[str], scores: List[float], threshold: float, top_n: int) -> List[Tuple[str, float]]:
     ranked = sorted(zip(docs, scores), key=lambda x: x[1], reverse=True)
-    
-    return [doc for doc, score in ranked if score >= threshold][:top_n]
+    return [(doc, score) for doc, score in ranked if score >= threshold][:top_n]
+
+def select_relevant(docs: List[str], scores: List[float], threshold: float, top_n: int) -> List[str]:
+    return [doc for doc, _ in select_relevant_scored(docs, scores, threshold, top_n)]
+
+def get_relevant_content(query: str, docs: List[str], threshold: float, top_n: int = 5) -> List[str]:
+    if not docs:
+        return []
+
+    scores = score_pairs([(query, doc) for doc in docs])
+    return select_relevant(docs, scores, threshold, top_n)
 
 
 def rerank_documents(query: str, retrieved_docs: List[str], top_n=5) -> List[str]: 
-    return get_relevant_content(query, retrieved_docs, threshold=0.25, top_n=top_n)
+    return get_relevant_content(query, retrieved_docs, threshold=RERANK_THRESHOLD, top_n=top_n)
 
 def find_similarities(query: str, stored_questions: List[str], top_n=2) -> List[str]:
-    return get_relevant_content(query, stored_questions, threshold=0.70, top_n=top_n)
+    return get_relevant_content(query, stored_questions, threshold=MEMORY_THRESHOLD, top_n=top_n)
 
 if __name__ == "__main__":
 
@@ -1,7 +1,7 @@
 import re
-from typing import List
-from backend.schemas.nosql.document_chunk import DocumentChunk
-from backend.services.bi_encoder import count_tokens, create_embedding
+from bisect import bisect_right
+from typing import List, Tuple
+from backend.services.model_registry import get_tokenizer
 from unstructured.partition.docx import partition_docx
 
 class DocumentProcessor:
@@ -10,6 +10,7 @@ class DocumentProcessor:
     MAX_MODEL_TOKENS = 512
     CHUNK_SIZE_TOKENS = 400
     CHUNK_OVERLAP_TOKENS = 50
+    SENTENCE_BREAK = re.compile(r'(?<=[.!?])\s+')
     
     @staticmethod
     def clean_text_for_embedding(text: str) -> str:
@@ -23,88 +24,116 @@ class DocumentProcessor:
         return cleaned.strip()
     
     @classmethod
-    def process_docx(cls, file_path: str, parent_id: str, company_id: int) -> List[DocumentChunk]:
+    def extract_docx_text(cls, file_path: str) -> str:
+        """Joins the document's elements, starting a new section at every Title or Header."""
+        elements = partition_docx(file_path)
 
-        try:
+        sections = []
+        current_section = []
+        
+        for element in elements:
+            element_type = type(element).__name__
+            text = str(element).strip()
             
-
-            elements = partition_docx(file_path)
+            if not text:
+                continue
             
 
-            sections = []
-            current_section = []
-            
-            for element in elements:
-                element_type = type(element).__name__
-                text = str(element).strip()
-                
-                if not text:
-                    continue
-                
+            if element_type in ['Title', 'Header']:
+                if current_section:
+                    sections.append('\n'.join(current_section))
+                    current_section = []
+                current_section.append(text)
+            else:
+                current_section.append(text)
+        
 
-                if element_type in ['Title', 'Header']:
-                    if current_section:
-                        sections.append('\n'.join(current_section))
-                        current_section = []
-                    current_section.append(text)
-                else:
-                    current_section.append(text)
-            
+        if current_section:
+            sections.append('\n'.join(current_section))
+        
+        return '\n\n'.join(sections)
 
-            if current_section:
-                sections.append('\n'.join(current_section))
-            
+    @classmethod
+    def _sentence_spans(cls, text: str) -> List[Tuple[int, int]]:
+        spans = []
+        start = 0
+        for match in cls.SENTENCE_BREAK.finditer(text):
+            spans.append((start, match.start()))
+            start = match.end()
+        spans.append((start, len(text)))
+        return [(s, e) for s, e in spans if e > s]
 
-            full_text = '\n\n'.join(sections)
-            
+    @classmethod
+    def chunk_text(cls, text: str, chunk_size: int | None = None, overlap: int | None = None) -> List[str]:
+        """
+        Packs whole sentences into chunks of at most `chunk_size` tokens,
+        special tokens included. The text is tokenized once; each sentence's
+        token count comes from the offset mapping. Every chunk after the first
+        starts with the last `overlap` tokens of the previous one: whole
+        sentences when they fit, otherwise the tail of its last sentence.
+        A single sentence longer than `chunk_size` becomes its own chunk.
+        """
+        chunk_size = cls.CHUNK_SIZE_TOKENS if chunk_size is None else chunk_size
+        overlap = cls.CHUNK_OVERLAP_TOKENS if overlap is None else overlap
 
-            return cls._create_chunks(full_text, parent_id, company_id)
-            
+        spans = cls._sentence_spans(text)
+        if not spans:
+            return []
 
-        except Exception as e:
-            print(f"Error processing DOCX {file_path}: {e}")
-            raise
-    
-    @classmethod
-    def _create_chunks(cls, text: str, parent_id: str, company_id: int) -> List[DocumentChunk]:
+        tokenizer = get_tokenizer()
+        offsets = tokenizer(text, add_special_tokens=False, return_offsets_mapping=True)["offset_mapping"]
+        budget = chunk_size - tokenizer.num_special_tokens_to_add()
 
-        chunks = []
-        
+        # Start offset of every token, grouped by the sentence it falls in.
+        sentence_starts = [s for s, _ in spans]
+        token_starts: List[List[int]] = [[] for _ in spans]
+        for start, end in offsets:
+            if end > start:
+                token_starts[max(0, bisect_right(sentence_starts, start) - 1)].append(start)
 
-        sentences = re.split(r'(?<=[.!?])\s+', text)
-        
-        current_chunk = ""
-        chunk_idx = 0
-        
-        for sentence in sentences:
-            potential = f"{current_chunk} {sentence}".strip() if current_chunk else sentence
-            
-            if count_tokens(potential) > cls.CHUNK_SIZE_TOKENS:
-                if current_chunk:
+        def overlap_tail(sentences: List[int]) -> Tuple[List[str], int]:
+            pieces, tokens = [], 0
+            for i in reversed(sentences):
+                if tokens + len(token_starts[i]) > overlap:
+                    break
+                pieces.insert(0, text[spans[i][0]:spans[i][1]])
+                tokens += len(token_starts[i])
+            if not pieces and overlap > 0:
+                last = sentences[-1]
+                tail = token_starts[last][-overlap:]
+                if tail:
+                    return [text[tail[0]:spans[last][1]]], len(tail)
+            return pieces, tokens
 
-                    cleaned = cls.clean_text_for_embedding(current_chunk)
-                    chunks.append(DocumentChunk(
-                        parent_doc_id=parent_id,
-                        company_id=company_id,
-                        chunk_index=chunk_idx,
-                        content=current_chunk,  
-                        embedding=create_embedding(cleaned), 
-                    ))
-                    chunk_idx += 1
-                current_chunk = sentence
-            else:
-                current_chunk = potential
-        
-        if current_chunk:
-            cleaned = cls.clean_text_for_embedding(current_chunk)
-            chunks.append(DocumentChunk(
-                parent_doc_id=parent_id,
-                company_id=company_id,
-                chunk_index=chunk_idx,
-                content=current_chunk,
-                embedding=create_embedding(cleaned),
-            ))
-        
-        return chunks
+        chunks = []
+        pieces: List[str] = []
+        sentences: List[int] = []
+        tokens = 0
+
+        for i, (start, end) in enumerate(spans):
+            count = len(token_starts[i])
+            if sentences and tokens + count > budget:
+                chunks.append(" ".join(pieces))
+                pieces, tokens = overlap_tail(sentences)
+                sentences = []
+                if tokens + count > budget:
+                    pieces, tokens = [], 0
 
+            pieces.append(text[start:end])
+            sentences.append(i)
+            tokens += count
 
+        if sentences:
+            chunks.append(" ".join(pieces))
+        return chunks
+    
+    @classmethod
+    def chunk_sections(cls, text: str) -> List[str]:
+        """
+        Chunks each section of `extract_docx_text` output on its own, so an
+        edit only moves chunk boundaries inside the section it touches.
+        """
+        chunks = []
+        for section in text.split("\n\n"):
+            chunks.extend(cls.chunk_text(section))
+        return chunks
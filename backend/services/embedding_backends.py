@@ -0,0 +1,111 @@
+import torch.nn.functional as F
+import torch
+import numpy as np
+
+from torch import Tensor
+from transformers import AutoModel, AutoConfig
+from typing import List
+
+BACKENDS = ("torch", "int8", "onnx")
+
+def average_pool(last_hidden_states: Tensor,
+                 attention_mask: Tensor) -> Tensor:
+    last_hidden = last_hidden_states.masked_fill(~attention_mask[..., None].bool(), 0.0)
+    return last_hidden.sum(dim=1) / attention_mask.sum(dim=1)[..., None]
+
+
+class EmbeddingBackend:
+    """Runs a tokenized batch through the encoder and returns L2-normalized mean-pooled vectors."""
+
+    name = "base"
+
+    def __init__(self, model_dir: str):
+        self.model_dir = model_dir
+        self.dim = AutoConfig.from_pretrained(model_dir).hidden_size
+
+    def encode(self, input_ids: np.ndarray, attention_mask: np.ndarray) -> List[List[float]]:
+        raise NotImplementedError
+
+
+class TorchBackend(EmbeddingBackend):
+    name = "torch"
+
+    def __init__(self, model_dir: str, device: str | None = None):
+        super().__init__(model_dir)
+        self.device = device or ("cuda" if torch.cuda.is_available() else "cpu")
+        self.model = self._load_model()
+
+    def _load_model(self):
+        return AutoModel.from_pretrained(self.model_dir).to(self.device).eval()
+
+    def encode(self, input_ids: np.ndarray, attention_mask: np.ndarray) -> List[List[float]]:
+        ids = torch.from_numpy(input_ids).to(self.device)
+        mask = torch.from_numpy(attention_mask).to(self.device)
+
+        with torch.inference_mode():
+            outputs = self.model(input_ids=ids, attention_mask=mask)
+            embeddings = average_pool(outputs.last_hidden_state, mask)
+            embeddings = F.normalize(embeddings, p=2, dim=1)
+
+        return embeddings.float().cpu().tolist()
+
+
+class Int8TorchBackend(TorchBackend):
+    """fp32 weights with every nn.Linear dynamically quantized to int8. CPU only."""
+
+    name = "int8"
+
+    def __init__(self, model_dir: str):
+        super().__init__(model_dir, device="cpu")
+
+    def _load_model(self):
+        model = AutoModel.from_pretrained(self.model_dir).eval()
+        return torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+
+
+class OnnxBackend(EmbeddingBackend):
+    name = "onnx"
+
+    def __init__(self, model_dir: str, onnx_path: str, num_threads: int | None = None):
+        super().__init__(model_dir)
+        try:
+            import onnxruntime as ort
+        except ImportError as e:
+            raise RuntimeError("EMBEDDING_BACKEND=onnx requires the onnxruntime package") from e
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if num_threads:
+            options.intra_op_num_threads = num_threads
+
+        self.session = ort.InferenceSession(onnx_path, options, providers=["CPUExecutionProvider"])
+        self.input_names = {i.name for i in self.session.get_inputs()}
+
+    def encode(self, input_ids: np.ndarray, attention_mask: np.ndarray) -> List[List[float]]:
+        feeds = {"input_ids": input_ids.astype(np.int64), "attention_mask": attention_mask.astype(np.int64)}
+        if "token_type_ids" in self.input_names:
+            feeds["token_type_ids"] = np.zeros_like(feeds["input_ids"])
+
+        last_hidden = self.session.run(["last_hidden_state"], feeds)[0]
+
+        mask = attention_mask[..., None].astype(np.float32)
+        embeddings = (last_hidden * mask).sum(axis=1) / mask.sum(axis=1)
+        embeddings /= np.linalg.norm(embeddings, axis=1, keepdims=True).clip(min=1e-12)
+
+        return embeddings.tolist()
+
+
+def load_backend(name: str, model_dir: str, onnx_path: str | None = None, num_threads: int | None = None) -> EmbeddingBackend:
+    if num_threads:
+        torch.set_num_threads(num_threads)
+
+    if name == "torch":
+        return TorchBackend(model_dir)
+    if name == "int8":
+        return Int8TorchBackend(model_dir)
+    if name == "onnx":
+        if not onnx_path:
+            raise ValueError("EMBEDDING_ONNX_PATH must be set for the onnx backend")
+        return OnnxBackend(model_dir, onnx_path, num_threads)
+
+    raise ValueError(f"Unknown embedding backend '{name}', expected one of {BACKENDS}")
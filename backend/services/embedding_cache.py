@@ -0,0 +1,180 @@
+import fcntl
+import hashlib
+import json
+import os
+import threading
+import unicodedata
+from collections import OrderedDict
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+import numpy as np
+
+
+def normalize_text(text: str) -> str:
+    return " ".join(unicodedata.normalize("NFC", text).split())
+
+
+class MmapVectorStore:
+    """
+    Append-only on-disk tier shared by every process using the same directory.
+    `entries.bin` holds fixed-size records of a 64-byte key followed by the
+    float32 vector, so a record's row is its offset divided by the record
+    size. Appends take an exclusive flock and write the whole record at once;
+    lookups of unknown keys first pick up records appended by other processes.
+    Rows are read back through a read-only memory map.
+    """
+
+    KEY_BYTES = 64  # hex sha256
+
+    def __init__(self, directory: Path, dim: int):
+        self.directory = directory
+        self.dim = dim
+        self.entries_path = directory / "entries.bin"
+        self.meta_path = directory / "meta.json"
+        self.record = np.dtype([("key", f"S{self.KEY_BYTES}"), ("vector", "<f4", (dim,))])
+
+        self.index: Dict[str, int] = {}
+        self._rows = 0
+        self._map: np.memmap | None = None
+
+        directory.mkdir(parents=True, exist_ok=True)
+        self._open()
+
+    @contextmanager
+    def _locked(self, mode: int) -> Iterator[int]:
+        fd = os.open(self.entries_path, os.O_RDWR | os.O_CREAT | os.O_APPEND, 0o644)
+        try:
+            fcntl.flock(fd, mode)
+            yield fd
+        finally:
+            os.close(fd)
+
+    def _open(self):
+        with self._locked(fcntl.LOCK_EX) as fd:
+            if self.meta_path.exists() and json.loads(self.meta_path.read_text()).get("dim") != self.dim:
+                # Different vector size means a different model; start over.
+                os.ftruncate(fd, 0)
+            self.meta_path.write_text(json.dumps({"dim": self.dim}))
+
+            # A crash mid-append leaves a partial record at the end.
+            size = os.fstat(fd).st_size
+            if size % self.record.itemsize:
+                os.ftruncate(fd, size - size % self.record.itemsize)
+            self._sync(fd)
+
+    def _sync(self, fd: int):
+        """Indexes the records appended since the last sync; the caller holds the lock."""
+        rows = os.fstat(fd).st_size // self.record.itemsize
+        if rows <= self._rows:
+            return
+        self._map = np.memmap(self.entries_path, dtype=self.record, mode="r", shape=(rows,))
+        for row, key in enumerate(self._map["key"][self._rows:rows], start=self._rows):
+            self.index.setdefault(key.decode("ascii"), row)
+        self._rows = rows
+
+    def get(self, key: str) -> Optional[np.ndarray]:
+        slot = self.index.get(key)
+        if slot is None:
+            with self._locked(fcntl.LOCK_SH) as fd:
+                self._sync(fd)
+            slot = self.index.get(key)
+            if slot is None:
+                return None
+        return np.array(self._map[slot]["vector"]) # type: ignore
+
+    def put(self, key: str, vector: np.ndarray):
+        if key in self.index or len(key) != self.KEY_BYTES:
+            return
+        entry = np.zeros(1, dtype=self.record)
+        entry["key"] = key.encode("ascii")
+        entry["vector"] = vector.astype(np.float32)
+        with self._locked(fcntl.LOCK_EX) as fd:
+            # Another process may have stored the same key since our last sync.
+            self._sync(fd)
+            if key in self.index:
+                return
+            os.write(fd, entry.tobytes())
+            self._sync(fd)
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+
+class EmbeddingCache:
+    """
+    Content-addressed cache for embedding vectors, keyed by
+    sha256(model id + normalized text). An in-process LRU tier bounded by bytes
+    sits in front of an optional memory-mapped disk tier.
+    """
+
+    def __init__(self, model_id: str, max_bytes: int, directory: Optional[Path] = None, dim: int = 768):
+        self.model_id = model_id
+        self.max_bytes = max_bytes
+        self.dim = dim
+        self.store = MmapVectorStore(directory, dim) if directory else None
+
+        self._lru: OrderedDict[str, np.ndarray] = OrderedDict()
+        self._lru_bytes = 0
+        self._lock = threading.Lock()
+
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def key(self, text: str) -> str:
+        return hashlib.sha256(f"{self.model_id}\0{normalize_text(text)}".encode("utf-8")).hexdigest()
+
+    def _remember(self, key: str, vector: np.ndarray):
+        if key in self._lru:
+            self._lru.move_to_end(key)
+            return
+        self._lru[key] = vector
+        self._lru_bytes += vector.nbytes
+        while self._lru_bytes > self.max_bytes and self._lru:
+            _, evicted = self._lru.popitem(last=False)
+            self._lru_bytes -= evicted.nbytes
+            self.evictions += 1
+
+    def get(self, text: str) -> Optional[List[float]]:
+        key = self.key(text)
+        with self._lock:
+            vector = self._lru.get(key)
+            if vector is not None:
+                self._lru.move_to_end(key)
+                self.memory_hits += 1
+                return vector.tolist()
+
+            vector = self.store.get(key) if self.store is not None else None
+            if vector is not None:
+                self._remember(key, vector)
+                self.disk_hits += 1
+                return vector.tolist()
+
+            self.misses += 1
+            return None
+
+    def put(self, text: str, embedding: List[float]):
+        key = self.key(text)
+        vector = np.asarray(embedding, dtype=np.float32)
+        if vector.shape != (self.dim,):
+            return
+        with self._lock:
+            self._remember(key, vector)
+            if self.store is not None:
+                self.store.put(key, vector)
+
+    def stats(self) -> dict:
+        lookups = self.memory_hits + self.disk_hits + self.misses
+        return {
+            "model_id": self.model_id,
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": (self.memory_hits + self.disk_hits) / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "memory_entries": len(self._lru),
+            "memory_bytes": self._lru_bytes,
+            "disk_entries": len(self.store) if self.store is not None else 0,
+        }
@@ -0,0 +1,33 @@
+from typing import List
+from backend.core.config import settings
+from backend.services.batching import MicroBatcher
+from backend.services.bi_encoder import encode_and_cache, embedding_cache
+
+embedding_batcher = MicroBatcher(
+    encode_and_cache,
+    max_batch_size=settings.EMBED_MAX_BATCH_SIZE,
+    max_wait_ms=settings.EMBED_MAX_WAIT_MS,
+    name="embedding"
+)
+
+async def embed(input_text: str) -> List[float]:
+    results = await embed_many([input_text])
+    return results[0]
+
+async def embed_many(input_texts: List[str]) -> List[List[float]]:
+    # Cache hits are answered immediately and never wait in the batch queue.
+    results = [embedding_cache.get(text) for text in input_texts]
+    missing = [i for i, r in enumerate(results) if r is None]
+
+    if missing:
+        computed = await embedding_batcher.submit_many([input_texts[i] for i in missing])
+        for i, embedding in zip(missing, computed):
+            results[i] = embedding
+
+    return results # type: ignore
+
+def get_embedding_stats() -> dict:
+    return {
+        "batcher": embedding_batcher.stats(),
+        "cache": embedding_cache.stats(),
+    }
@@ -1,51 +1,111 @@
-import asyncio
-from backend.services.math_utils import calculate_bayesian_rating, determine_status
+from typing import Dict, List, Tuple
 from backend.crud import ai_crud as crud
-from sqlalchemy.orm import Session
+from backend.services.audit_writer import audit_writer
+from backend.services.prompt_index import prompt_index
+from backend.core.metrics import StageTimer
 
-async def process_ai_feedback(db_sql : Session,event_id: str, rating: int):
-    event = await crud.get_event_by_id(event_id)
+async def process_ai_feedback(event_id: str, rating: int):
+    timer = StageTimer("feedback")
+    with timer.stage("load_event"):
+        event = await crud.get_event_by_id(event_id)
     if not event or not event.get("ai_response_ids"):
         return
     
-    crud.create_generation_audit(
-        db_sql, 
-        user_id=event.get("user_id"), 
-        mongo_id=event_id, 
-        rating=rating
-    )
+    with timer.stage("audit_insert"):
+        audit_writer.submit(event.get("user_id"), event_id, rating) # type: ignore
     
     company_id = event["company_id"]
-    company_baseline = await crud.update_company_stats(company_id, rating)
-    
+    with timer.stage("company_stats"):
+        company_baseline = await crud.update_company_stats(company_id, rating)
+
+
+    # One rating for every linked response, applied server-side in one bulk_write.
+    updates = {str(rid): (1, float(rating)) for rid in event["ai_response_ids"]}
+    with timer.stage("response_updates"):
+        deleted = await crud.apply_response_feedback(updates, company_baseline)
+        for res_id in deleted:
+            await prompt_index.remove_response(res_id)
+    timer.observe(company_id, "none")
+
+
+async def apply_feedback_batch(ratings: List[Tuple[str, str, int]]) -> dict:
+    """
+    Applies many (rating_id, event_id, rating) submissions with their writes
+    coalesced: one company_stats update per company and one bulk_write per
+    company for all of its linked responses, scored against the company
+    average after the whole batch. As in process_ai_feedback, every rating
+    counts, so an event rated twice is applied twice; `rating_id` identifies
+    one submission.
+
+    Each stage marks the ratings it wrote on their events, and an event
+    records the rating ids it has fully applied, so a retried or replayed
+    batch skips finished ratings and finished stages. A stage's write and its
+    marker are separate round trips: a crash between the two repeats that
+    stage on replay, so delivery is at-least-once.
+    """
+    timer = StageTimer("feedback_batch")
+    submissions = {rating_id: (event_id, rating) for rating_id, event_id, rating in ratings}
+    with timer.stage("load_event"):
+        events = await crud.get_events_by_ids(list({event_id for event_id, _ in submissions.values()}))
+
+    applied = [
+        (rating_id, events[event_id], rating)
+        for rating_id, (event_id, rating) in submissions.items()
+        if event_id in events and events[event_id].get("ai_response_ids")
+        and rating_id not in events[event_id].get("feedback_applied", [])
+    ]
+    if not applied:
+        return {"ratings": 0, "companies": 0, "responses": 0, "links": 0, "deleted": 0}
 
-    async def update_single_res(res_id: str):
-        ai_res = await crud.get_ai_response_by_id(res_id)
-        if not ai_res:
-            return
+    def pending(stage: str) -> Dict[int, List[Tuple[str, dict, int]]]:
+        by_company: Dict[int, List[Tuple[str, dict, int]]] = {}
+        for rating_id, event, rating in applied:
+            if stage not in (event.get("feedback_stages") or {}).get(rating_id, {}):
+                by_company.setdefault(event["company_id"], []).append((rating_id, event, rating))
+        return by_company
 
-        new_v = ai_res.get("reuse_count", 0) + 1
-        new_rating_sum = ai_res.get("rating_sum", 0.0) + rating
-        new_R = new_rating_sum / new_v
+    def by_event(items: List[Tuple[str, dict, int]]) -> Dict[str, List[str]]:
+        grouped: Dict[str, List[str]] = {}
+        for rating_id, event, _ in items:
+            grouped.setdefault(str(event["_id"]), []).append(rating_id)
+        return grouped
 
-        new_b_score = calculate_bayesian_rating(
-            item_reviews_count=new_v,
-            item_avg_rating=new_R,
-            global_avg_rating=company_baseline
-        )
+    baselines: Dict[int, float] = {}
+    with timer.stage("company_stats"):
+        for company_id, items in pending("company").items():
+            baselines[company_id] = await crud.apply_company_feedback(company_id, len(items), float(sum(rating for _, _, rating in items)))
+            await crud.mark_feedback_stage(by_event(items), "company")
 
-        status = determine_status(new_v, new_b_score)
+    deleted = []
+    response_count = 0
+    with timer.stage("response_updates"):
+        for company_id, items in pending("responses").items():
+            updates: Dict[str, Tuple[int, float]] = {}
+            for _, event, rating in items:
+                for rid in event["ai_response_ids"]:
+                    count, total = updates.get(str(rid), (0, 0.0))
+                    updates[str(rid)] = (count + 1, total + float(rating))
+            if company_id not in baselines:
+                baselines[company_id] = await crud.get_company_avg_rating(company_id)
+            deleted += await crud.apply_response_feedback(updates, baselines[company_id])
+            await crud.mark_feedback_stage(by_event(items), "responses")
+            response_count += len(updates)
+        for res_id in deleted:
+            await prompt_index.remove_response(res_id)
 
-        if status == "DELETE":
-            await crud.delete_ai_response_record(res_id)
-        else:
-            await crud.update_ai_response_stats(
-                res_id=res_id, 
-                rating=float(rating), 
-                b_score=new_b_score, 
-                status=status
-            )
+    with timer.stage("audit_insert"):
+        for _, event, rating in applied:
+            audit_writer.submit(event.get("user_id"), str(event["_id"]), rating) # type: ignore
 
+    with timer.stage("mark_applied"):
+        await crud.mark_feedback_applied(by_event(applied))
 
-    tasks = [update_single_res(str(rid)) for rid in event["ai_response_ids"]]
-    await asyncio.gather(*tasks)
\ No newline at end of file
+    companies = {event["company_id"] for _, event, _ in applied}
+    timer.observe(next(iter(companies)) if len(companies) == 1 else "mixed", "none") # type: ignore
+    return {
+        "ratings": len(applied),
+        "companies": len(companies),
+        "responses": response_count,
+        "links": sum(len(event["ai_response_ids"]) for _, event, _ in applied),
+        "deleted": len(deleted),
+    }
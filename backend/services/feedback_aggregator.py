@@ -0,0 +1,244 @@
+import asyncio
+import fcntl
+import json
+import os
+import time
+import uuid
+from datetime import datetime, UTC
+from pathlib import Path
+from typing import IO, List, Optional, Tuple
+from pymongo.errors import ConnectionFailure
+from backend.core.config import settings
+from backend.services.feedback import apply_feedback_batch
+
+
+class FeedbackAggregator:
+    """
+    Write-behind buffer for feedback. A rating is given an id, appended to a
+    local log and acknowledged at once; every `flush_interval_s`, or as soon as
+    `max_pending` ratings are waiting, the buffered ratings are applied as one
+    coalesced batch.
+
+    Every process writes its own log, `<log_path>.<pid>`, and holds an flock
+    on `<log_path>.<pid>.lock` while it runs, so several server workers can
+    share one directory. On start a process adopts the logs of processes
+    whose lock is free (they died) and replays them. The log is flushed to the
+    OS on every append, which survives a process crash; with `fsync` it also
+    survives a power loss, at the cost of one disk sync per rating.
+
+    A batch that keeps failing is retried rating by rating after
+    `max_attempts` tries; ratings that still fail on their own, other than on
+    a lost database connection, go to `<log_path>.deadletter`.
+    """
+
+    def __init__(self, log_path: str, flush_interval_s: float, max_pending: int, max_attempts: int = 3, fsync: bool = False):
+        self.log_path = Path(log_path)
+        self.flush_interval = flush_interval_s
+        self.max_pending = max(1, max_pending)
+        self.max_attempts = max(1, max_attempts)
+        self.fsync = fsync
+        self.pid = os.getpid()
+        self.deadletter_path = self.log_path.with_name(f"{self.log_path.name}.deadletter")
+
+        # (rating_id, event_id, rating)
+        self._pending: List[Tuple[str, str, int]] = []
+        # Rotated log segments whose ratings are in `_pending` or being flushed.
+        self._segments: List[Path] = []
+        self._log: Optional[IO[str]] = None
+        self._lock_fd: Optional[int] = None
+        self._lock = asyncio.Lock()
+        self._wake = asyncio.Event()
+        self._flusher: Optional[asyncio.Task] = None
+        self._attempts = 0
+
+        self._submitted = 0
+        self._flushed = 0
+        self._flushes = 0
+        self._replayed = 0
+        self._failures = 0
+        self._dead_lettered = 0
+        self._writes_saved = 0
+        self._last_flush_s = 0.0
+
+    def _path(self, pid: int, suffix: str = "") -> Path:
+        return self.log_path.with_name(f"{self.log_path.name}.{pid}{suffix}")
+
+    async def start(self):
+        self.pid = os.getpid()
+        self.log_path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock_fd = os.open(self._path(self.pid, ".lock"), os.O_RDWR | os.O_CREAT, 0o644)
+        fcntl.flock(self._lock_fd, fcntl.LOCK_EX)
+
+        self._adopt_orphans()
+        for segment in self._segments:
+            self._pending.extend(self._read_segment(segment))
+        self._replayed = len(self._pending)
+
+        self._log = open(self._path(self.pid), "a", encoding="utf-8")
+        if self._pending:
+            await self.flush()
+        self._flusher = asyncio.create_task(self._flush_loop())
+
+    async def stop(self):
+        if self._flusher:
+            self._flusher.cancel()
+            await asyncio.gather(self._flusher, return_exceptions=True)
+            self._flusher = None
+        await self.flush()
+        if self._log:
+            self._log.close()
+            self._log = None
+        if self._lock_fd is not None:
+            # Unflushed segments stay on disk and are adopted by the next process to start.
+            if not self._segments and not self._pending:
+                self._path(self.pid).unlink(missing_ok=True)
+                self._path(self.pid, ".lock").unlink(missing_ok=True)
+            os.close(self._lock_fd)
+            self._lock_fd = None
+
+    def _adopt_orphans(self):
+        """Takes over the logs of every process whose lock is not held, including an earlier holder of our pid."""
+        for lock_path in sorted(self.log_path.parent.glob(f"{self.log_path.name}.*.lock")):
+            pid = int(lock_path.name[len(self.log_path.name) + 1:-len(".lock")])
+            if pid != self.pid:
+                try:
+                    fd = os.open(lock_path, os.O_RDWR)
+                except FileNotFoundError:
+                    continue
+                try:
+                    fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except BlockingIOError:
+                    # Still running, or being adopted by another starting process.
+                    os.close(fd)
+                    continue
+            try:
+                orphaned = sorted(self.log_path.parent.glob(f"{self.log_path.name}.{pid}.*.flushing"))
+                if self._path(pid).exists():
+                    orphaned.append(self._path(pid))
+                for path in orphaned:
+                    self._rotate(path)
+                if pid != self.pid:
+                    lock_path.unlink(missing_ok=True)
+            finally:
+                if pid != self.pid:
+                    os.close(fd)
+
+    async def submit(self, event_id: str, rating: int):
+        if self._log is None:
+            raise RuntimeError("Feedback aggregator is not running")
+        # Logged before it is acknowledged, so a crash cannot lose an accepted rating.
+        rating_id = uuid.uuid4().hex
+        self._log.write(json.dumps({"id": rating_id, "event_id": event_id, "rating": rating}) + "\n")
+        self._log.flush()
+        if self.fsync:
+            os.fsync(self._log.fileno())
+        self._pending.append((rating_id, event_id, rating))
+        self._submitted += 1
+        if len(self._pending) >= self.max_pending:
+            self._wake.set()
+
+    async def _flush_loop(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            await self.flush()
+
+    async def flush(self):
+        async with self._lock:
+            if not self._pending:
+                return
+            if self._log and self._log.tell():
+                self._log.close()
+                self._rotate(self._path(self.pid))
+                self._log = open(self._path(self.pid), "a", encoding="utf-8")
+
+            batch, self._pending = self._pending, []
+            start = time.perf_counter()
+            try:
+                result = await apply_feedback_batch(batch)
+            except Exception as e:
+                self._failures += 1
+                self._attempts += 1
+                print(f"Feedback flush of {len(batch)} ratings failed (attempt {self._attempts}): {e}")
+                if self._attempts < self.max_attempts or not await self._isolate(batch):
+                    # Keep the segments on disk and retry the ratings with the next flush.
+                    self._pending = batch + self._pending
+                    return
+                result = None
+
+            for segment in self._segments:
+                segment.unlink(missing_ok=True)
+            self._segments = []
+            self._attempts = 0
+
+            self._flushes += 1
+            self._flushed += len(batch)
+            if result:
+                # Per rating, the unbatched path writes company_stats once and each linked response once.
+                self._writes_saved += max(0, result["ratings"] - result["companies"]) + max(0, result["links"] - result["responses"])
+            self._last_flush_s = time.perf_counter() - start
+
+    async def _isolate(self, batch: List[Tuple[str, str, int]]) -> bool:
+        """
+        Applies a repeatedly failing batch one rating at a time and dead-letters
+        the ratings that fail on their own. Returns False, leaving the batch
+        pending, when the database is unreachable rather than a rating bad.
+        """
+        dead = []
+        for rating_id, event_id, rating in batch:
+            try:
+                await apply_feedback_batch([(rating_id, event_id, rating)])
+            except (ConnectionFailure, asyncio.TimeoutError) as e:
+                print(f"Feedback retry deferred, database unavailable: {e}")
+                return False
+            except Exception as e:
+                dead.append({"id": rating_id, "event_id": event_id, "rating": rating, "error": str(e), "failed_at": datetime.now(UTC).isoformat()})
+
+        if dead:
+            with open(self.deadletter_path, "a", encoding="utf-8") as f:
+                f.writelines(json.dumps(entry) + "\n" for entry in dead)
+            self._dead_lettered += len(dead)
+            print(f"Feedback: {len(dead)} ratings moved to {self.deadletter_path}")
+        return True
+
+    def _rotate(self, path: Path):
+        segment = self._path(self.pid, f".{time.time_ns()}.flushing")
+        path.rename(segment)
+        self._segments.append(segment)
+
+    @staticmethod
+    def _read_segment(segment: Path) -> List[Tuple[str, str, int]]:
+        ratings = []
+        for line in segment.read_text(encoding="utf-8").splitlines():
+            try:
+                entry = json.loads(line)
+                ratings.append((entry["id"], entry["event_id"], int(entry["rating"])))
+            except (ValueError, KeyError):
+                # A torn last line from a crash mid-write; it was never acknowledged.
+                continue
+        return ratings
+
+    def stats(self) -> dict:
+        return {
+            "submitted": self._submitted,
+            "flushed": self._flushed,
+            "flushes": self._flushes,
+            "pending": len(self._pending),
+            "replayed": self._replayed,
+            "failures": self._failures,
+            "dead_lettered": self._dead_lettered,
+            "writes_saved": self._writes_saved,
+            "last_flush_s": round(self._last_flush_s, 4),
+        }
+
+
+feedback_aggregator = FeedbackAggregator(
+    log_path=settings.FEEDBACK_LOG_PATH,
+    flush_interval_s=settings.FEEDBACK_FLUSH_INTERVAL_S,
+    max_pending=settings.FEEDBACK_FLUSH_MAX_PENDING,
+    max_attempts=settings.FEEDBACK_MAX_ATTEMPTS,
+    fsync=settings.FEEDBACK_LOG_FSYNC
+)
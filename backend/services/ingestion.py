@@ -0,0 +1,378 @@
+import asyncio
+import hashlib
+import json
+import time
+from collections import defaultdict
+from contextlib import ExitStack
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple
+from backend.core.config import settings
+from backend.core.vector_codec import encode_embedding
+from backend.crud import document_crud
+from backend.schemas.nosql.document_chunk import DocumentChunk
+from backend.services.vector_index import doc_index
+
+
+@dataclass
+class IngestionItem:
+    path: Path
+    company_id: int
+    name: str = ""
+    # Identifies the document across re-ingestions when the file is stored
+    # somewhere new each time, as uploads are; defaults to the file's own path.
+    source: str = ""
+
+    def __post_init__(self):
+        self.path = Path(self.path)
+        self.name = self.name or self.path.stem
+
+    @property
+    def source_path(self) -> str:
+        return self.source or str(self.path.resolve())
+
+
+def scan_directory(directory: Path, company_id: int) -> List[IngestionItem]:
+    return [IngestionItem(path, company_id) for path in sorted(Path(directory).glob("*.docx"))]
+
+
+def load_manifest(manifest_path: Path) -> List[IngestionItem]:
+    """
+    Reads a JSON list of {"path", "company_id", "name"?} entries. Relative
+    paths are resolved against the manifest's own directory.
+    """
+    manifest_path = Path(manifest_path)
+    entries = json.loads(manifest_path.read_text(encoding="utf-8"))
+    return [
+        IngestionItem(manifest_path.parent / entry["path"], int(entry["company_id"]), entry.get("name", ""))
+        for entry in entries
+    ]
+
+
+def file_fingerprint(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return f"sha256:{digest.hexdigest()}"
+
+
+def chunk_hash(content: str) -> str:
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+
+def parse_document(path: str) -> List[str]:
+    """Process-pool entry point: parses a docx and splits it into chunk texts."""
+    from backend.services.document_processor import DocumentProcessor
+    return DocumentProcessor.chunk_sections(DocumentProcessor.extract_docx_text(path))
+
+
+def embed_chunks(texts: List[str]) -> List[List[float]]:
+    from backend.services.bi_encoder import create_embeddings_bucketed
+    from backend.services.document_processor import DocumentProcessor
+    cleaned = [DocumentProcessor.clean_text_for_embedding(text) for text in texts]
+    return create_embeddings_bucketed(cleaned, batch_size=settings.INGEST_MODEL_BATCH_SIZE)
+
+
+@dataclass
+class _Parsed:
+    item: IngestionItem
+    fingerprint: str = ""
+    texts: List[str] = field(default_factory=list)
+    error: Optional[str] = None
+
+
+@dataclass
+class _Plan:
+    """What re-ingesting one document changes, diffed by chunk content hash."""
+    item: IngestionItem
+    document_id: Any
+    fingerprint: str
+    texts: List[str]
+    hashes: List[str]
+    new: List[int]
+    moves: List[Tuple[Any, int]]
+    stale: List[Any]
+
+    @property
+    def parent_id(self) -> str:
+        return str(self.document_id)
+
+
+@dataclass
+class _Batch:
+    plan: _Plan
+    indexes: List[int]
+    embeddings: List[List[float]]
+    last: bool
+
+
+_DONE = object()
+
+
+def diff_chunks(hashes: List[str], existing: List[dict]) -> Tuple[List[int], List[Tuple[Any, int]], List[Any]]:
+    """
+    Matches the new chunk hashes against the stored chunks. Returns the
+    indexes that need embedding, the (id, index) moves for stored chunks
+    whose position changed, and the ids of stored chunks no longer present.
+    """
+    stored: Dict[str, List[dict]] = defaultdict(list)
+    for chunk in sorted(existing, key=lambda c: c.get("chunk_index", 0)):
+        stored[chunk.get("content_hash") or ""].append(chunk)
+
+    new, moves = [], []
+    for index, h in enumerate(hashes):
+        matches = stored.get(h)
+        if not matches:
+            new.append(index)
+            continue
+        chunk = matches.pop(0)
+        if chunk.get("chunk_index") != index:
+            moves.append((chunk["_id"], index))
+
+    stale = [chunk["_id"] for chunks in stored.values() for chunk in chunks]
+    return new, moves, stale
+
+
+class IngestionPipeline:
+    """
+    Staged document ingestion. Parsing and chunking run in a process pool,
+    embedding runs in batches on one dedicated thread, and chunks are written
+    with bounded `insert_many` calls. The stages are joined by bounded queues,
+    so a slow stage holds the others back instead of buffering the corpus.
+
+    Ingestion is incremental. A file whose fingerprint matches its document
+    record is skipped without parsing. Otherwise only chunks whose content
+    hash is new are embedded and inserted, and vanished ones are deleted.
+    The fingerprint is recorded last, so an interrupted run redoes the
+    document and reconciles whatever it had written.
+    """
+
+    def __init__(
+        self,
+        parse_workers: int = settings.INGEST_PARSE_WORKERS,
+        embed_batch_size: int = settings.INGEST_EMBED_BATCH_SIZE,
+        insert_batch_size: int = settings.INGEST_INSERT_BATCH_SIZE,
+        on_progress: Optional[Callable[[dict], None]] = None,
+        parse_pool: Optional[ProcessPoolExecutor] = None,
+        embed_thread: Optional[ThreadPoolExecutor] = None,
+    ):
+        # Long-lived callers such as the job queue pass shared executors; otherwise each run owns its own.
+        self.parse_pool = parse_pool
+        self.embed_thread = embed_thread
+        self.parse_workers = max(1, parse_workers)
+        self.embed_batch_size = max(1, embed_batch_size)
+        self.insert_batch_size = max(1, insert_batch_size)
+        self.on_progress = on_progress
+
+        self.documents_total = 0
+        self.documents_done = 0
+        self.documents_skipped = 0
+        self.chunks_parsed = 0
+        self.chunks_embedded = 0
+        self.chunks_written = 0
+        self.chunks_reused = 0
+        self.chunks_deleted = 0
+        self.chunks_by_company: Dict[int, int] = {}
+        self.errors: List[str] = []
+        self.stage_seconds = {"parse": 0.0, "embed": 0.0, "write": 0.0}
+        self._rebuild: Set[int] = set()
+        self._started_at: Optional[float] = None
+        self._finished_at: Optional[float] = None
+
+    async def run(self, items: Iterable[IngestionItem]) -> dict:
+        items = list(items)
+        self.documents_total = len(items)
+        self._started_at = time.perf_counter()
+
+        parsed: asyncio.Queue = asyncio.Queue(maxsize=self.parse_workers)
+        batches: asyncio.Queue = asyncio.Queue(maxsize=4)
+        with ExitStack() as stack:
+            parse_pool = self.parse_pool or stack.enter_context(ProcessPoolExecutor(max_workers=self.parse_workers))
+            embed_thread = self.embed_thread or stack.enter_context(ThreadPoolExecutor(max_workers=1, thread_name_prefix="ingest-embed"))
+            await asyncio.gather(
+                self._parse_stage(items, parse_pool, parsed),
+                self._embed_stage(embed_thread, parsed, batches),
+                self._write_stage(batches),
+            )
+
+        # Deleted and renumbered chunks cannot be patched into the local index in place.
+        if settings.DOC_RETRIEVER == "local":
+            for company_id in self._rebuild:
+                await doc_index.rebuild(document_crud.document_chunks_col, company_id)
+
+        self._finished_at = time.perf_counter()
+        return self.stats()
+
+    async def _parse_stage(self, items: List[IngestionItem], pool: ProcessPoolExecutor, out: asyncio.Queue):
+        loop = asyncio.get_running_loop()
+        # Keep every worker busy while parsed documents wait in `out`.
+        window = asyncio.Semaphore(self.parse_workers * 2)
+
+        async def parse(item: IngestionItem):
+            async with window:
+                if not item.path.exists():
+                    await out.put(_Parsed(item, error=f"File not found: {item.path}"))
+                    return
+                start = time.perf_counter()
+                try:
+                    fingerprint = await asyncio.to_thread(file_fingerprint, item.path)
+                    document = await document_crud.get_document(item.company_id, item.source_path)
+                    if document and document.get("fingerprint") == fingerprint:
+                        self.documents_skipped += 1
+                        self._report()
+                        return
+                    texts = await loop.run_in_executor(pool, parse_document, str(item.path))
+                    await out.put(_Parsed(item, fingerprint, texts))
+                except Exception as e:
+                    await out.put(_Parsed(item, error=f"Error parsing {item.name}: {e}"))
+                finally:
+                    self.stage_seconds["parse"] += time.perf_counter() - start
+
+        try:
+            await asyncio.gather(*(parse(item) for item in items))
+        finally:
+            await out.put(_DONE)
+
+    async def _plan(self, parsed: _Parsed) -> _Plan:
+        item = parsed.item
+        document = await document_crud.get_or_create_document(item.company_id, item.source_path, item.name)
+        hashes = [chunk_hash(text) for text in parsed.texts]
+        existing = await document_crud.get_chunk_hashes(str(document["_id"]))
+        new, moves, stale = diff_chunks(hashes, existing)
+        return _Plan(item, document["_id"], parsed.fingerprint, parsed.texts, hashes, new, moves, stale)
+
+    async def _embed_stage(self, thread: ThreadPoolExecutor, inbox: asyncio.Queue, out: asyncio.Queue):
+        loop = asyncio.get_running_loop()
+        try:
+            while (parsed := await inbox.get()) is not _DONE:
+                if parsed.error or not parsed.texts:
+                    self._fail(parsed.item, parsed.error or f"No chunks generated for {parsed.item.name}")
+                    continue
+
+                self.chunks_parsed += len(parsed.texts)
+                try:
+                    plan = await self._plan(parsed)
+                except Exception as e:
+                    self._fail(parsed.item, f"Error diffing {parsed.item.name}: {e}")
+                    continue
+
+                if not plan.new:
+                    await out.put(_Batch(plan, [], [], last=True))
+                    continue
+
+                for start in range(0, len(plan.new), self.embed_batch_size):
+                    indexes = plan.new[start:start + self.embed_batch_size]
+                    began = time.perf_counter()
+                    try:
+                        embeddings = await loop.run_in_executor(thread, embed_chunks, [plan.texts[i] for i in indexes])
+                    except Exception as e:
+                        # The fingerprint is not recorded, so the next run picks this document up again.
+                        self._fail(parsed.item, f"Error embedding {parsed.item.name}: {e}")
+                        break
+                    finally:
+                        self.stage_seconds["embed"] += time.perf_counter() - began
+                    self.chunks_embedded += len(indexes)
+                    last = start + len(indexes) >= len(plan.new)
+                    await out.put(_Batch(plan, indexes, embeddings, last))
+        finally:
+            await out.put(_DONE)
+
+    async def _write_stage(self, inbox: asyncio.Queue):
+        failed = set()
+        while (batch := await inbox.get()) is not _DONE:
+            plan = batch.plan
+            if plan.parent_id in failed:
+                continue
+            began = time.perf_counter()
+            try:
+                await self._write_batch(batch)
+                if batch.last:
+                    await self._finish_document(plan)
+            except Exception as e:
+                failed.add(plan.parent_id)
+                self._fail(plan.item, f"Error storing {plan.item.name}: {e}")
+            finally:
+                self.stage_seconds["write"] += time.perf_counter() - began
+
+    async def _write_batch(self, batch: _Batch):
+        plan = batch.plan
+        chunks = [
+            DocumentChunk(
+                parent_doc_id=plan.parent_id,
+                company_id=plan.item.company_id,
+                chunk_index=index,
+                content=plan.texts[index],
+                content_hash=plan.hashes[index],
+                embedding=embedding,
+            )
+            for index, embedding in zip(batch.indexes, batch.embeddings)
+        ]
+
+        for start in range(0, len(chunks), self.insert_batch_size):
+            group = chunks[start:start + self.insert_batch_size]
+            docs = []
+            for chunk in group:
+                doc = chunk.model_dump(by_alias=True, exclude_none=True)
+                doc["embedding"] = encode_embedding(doc["embedding"])
+                docs.append(doc)
+
+            inserted_ids = await document_crud.insert_chunks(docs)
+            self.chunks_written += len(inserted_ids)
+
+            # Keep the local vector index in step with the collection
+            if settings.DOC_RETRIEVER == "local":
+                for doc, inserted_id in zip(docs, inserted_ids):
+                    doc["_id"] = inserted_id
+                doc_index.add(plan.item.company_id, docs, [chunk.embedding for chunk in group], persist=False)
+            self._report()
+
+    async def _finish_document(self, plan: _Plan):
+        """Applies renumbering and deletions after the new chunks are stored, then records the fingerprint."""
+        item = plan.item
+        await document_crud.renumber_chunks(plan.moves)
+        deleted = await document_crud.delete_chunks(plan.stale)
+        await document_crud.mark_document_ingested(plan.document_id, plan.fingerprint, len(plan.texts))
+
+        if settings.DOC_RETRIEVER == "local":
+            if plan.moves or plan.stale:
+                self._rebuild.add(item.company_id)
+            else:
+                doc_index.save(item.company_id)
+
+        reused = len(plan.texts) - len(plan.new)
+        self.chunks_reused += reused
+        self.chunks_deleted += deleted
+        self.documents_done += 1
+        self.chunks_by_company[item.company_id] = self.chunks_by_company.get(item.company_id, 0) + len(plan.new)
+        print(f"✅ {item.name}: {len(plan.new)} new, {reused} unchanged, {deleted} deleted chunks (company {item.company_id})")
+        self._report()
+
+    def _fail(self, item: IngestionItem, message: str):
+        print(f"❌ {message}")
+        self.errors.append(message)
+        self._report()
+
+    def _report(self):
+        if self.on_progress:
+            self.on_progress(self.stats())
+
+    def stats(self) -> dict:
+        end = self._finished_at or time.perf_counter()
+        elapsed = end - self._started_at if self._started_at else 0.0
+        return {
+            "documents_total": self.documents_total,
+            "documents_done": self.documents_done,
+            "documents_skipped": self.documents_skipped,
+            "chunks_parsed": self.chunks_parsed,
+            "chunks_embedded": self.chunks_embedded,
+            "chunks_written": self.chunks_written,
+            "chunks_reused": self.chunks_reused,
+            "chunks_deleted": self.chunks_deleted,
+            "chunks_by_company": dict(self.chunks_by_company),
+            "elapsed_s": elapsed,
+            "chunks_per_sec": self.chunks_written / elapsed if elapsed else 0.0,
+            "stage_seconds": dict(self.stage_seconds),
+            "errors": list(self.errors),
+        }
@@ -0,0 +1,255 @@
+import asyncio
+import multiprocessing
+import os
+import shutil
+import socket
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from pathlib import Path
+from typing import List, Optional
+from bson import ObjectId
+from fastapi import UploadFile
+from backend.core.config import settings
+from backend.crud import document_crud, ingestion_job_crud as crud
+from backend.services.ingestion import IngestionItem, IngestionPipeline
+
+UPLOAD_READ_BYTES = 1 << 20
+
+
+class IngestionQueueFull(Exception):
+    pass
+
+
+class UploadTooLarge(Exception):
+    pass
+
+
+def upload_path(company_id: int, upload_id: str, filename: str) -> Path:
+    """
+    Where one upload request stores a file. Each request gets its own
+    directory, so two uploads of the same name cannot overwrite each other
+    while their jobs wait or run. Only the base name is kept, so a crafted
+    filename cannot escape that directory.
+    """
+    return Path(settings.INGEST_UPLOAD_DIR) / f"company_{company_id}" / upload_id / Path(filename).name
+
+
+def upload_source(company_id: int, filename: str) -> str:
+    """The document identity of an uploaded file: uploading the same name again updates that document."""
+    return str((Path(settings.INGEST_UPLOAD_DIR) / f"company_{company_id}" / Path(filename).name).resolve())
+
+
+async def save_upload(upload: UploadFile, destination: Path, max_bytes: int) -> int:
+    """
+    Copies an upload to `destination` a block at a time through a temporary
+    file, so a failed copy is never left half-written under its final name.
+    Starlette has already spooled the request body to its own temporary
+    file by now, so `max_bytes` bounds what is kept, not what was received.
+    """
+    destination.parent.mkdir(parents=True, exist_ok=True)
+    tmp = destination.with_name(destination.name + ".part")
+    written = 0
+    try:
+        with open(tmp, "wb") as out:
+            while block := await upload.read(UPLOAD_READ_BYTES):
+                written += len(block)
+                if written > max_bytes:
+                    raise UploadTooLarge(f"{upload.filename} is larger than {max_bytes // (1024 * 1024)} MB")
+                await asyncio.to_thread(out.write, block)
+        os.replace(tmp, destination)
+    finally:
+        tmp.unlink(missing_ok=True)
+    return written
+
+
+class IngestionJobQueue:
+    """
+    Runs ingestion jobs submitted through the API on `max_jobs` workers per
+    process. The queue itself is the ingestion_jobs collection: workers claim
+    the oldest queued job, or one whose lease expired because its process
+    died, and renew the lease every `report_interval_s` along with the
+    progress. An upload reserves its queue slot before its files are
+    stored, and holds it for at most `reserve_s` if it never submits. Idle
+    workers poll every `poll_interval_s`, and a submit in the same process
+    wakes them at once. Parsing goes to a shared process pool
+    and embedding to one shared thread, so a large upload does not stall
+    prompt traffic on the event loop.
+    """
+
+    def __init__(self, max_jobs: int, max_queued: int, parse_workers: int, report_interval_s: float, lease_s: float, poll_interval_s: float, reserve_s: float):
+        self.max_jobs = max(1, max_jobs)
+        self.max_queued = max(1, max_queued)
+        self.parse_workers = max(1, parse_workers)
+        self.report_interval = report_interval_s
+        self.lease_s = max(lease_s, 3 * report_interval_s)
+        self.poll_interval = poll_interval_s
+        self.reserve_s = reserve_s
+        self.owner = ""
+
+        self._wake: Optional[asyncio.Event] = None
+        self._workers: List[asyncio.Task] = []
+        self._parse_pool: Optional[ProcessPoolExecutor] = None
+        self._embed_thread: Optional[ThreadPoolExecutor] = None
+
+        self._queued = 0
+        self._running = 0
+        self._completed = 0
+        self._failed = 0
+        self._lost = 0
+        self._chunks_written = 0
+
+    async def start(self):
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._wake = asyncio.Event()
+        # spawn, not fork: the server process already runs model and event-loop threads.
+        self._parse_pool = ProcessPoolExecutor(max_workers=self.parse_workers, mp_context=multiprocessing.get_context("spawn"))
+        self._embed_thread = ThreadPoolExecutor(max_workers=1, thread_name_prefix="ingest-embed")
+
+        try:
+            await crud.ensure_ingestion_job_indexes()
+            await document_crud.ensure_document_indexes()
+        except Exception as e:
+            print(f"Ingestion index setup skipped: {e}")
+        self._workers = [asyncio.create_task(self._work()) for _ in range(self.max_jobs)]
+
+    async def stop(self):
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        if self._parse_pool:
+            self._parse_pool.shutdown(wait=False, cancel_futures=True)
+        if self._embed_thread:
+            self._embed_thread.shutdown(wait=False, cancel_futures=True)
+
+    async def reserve(self, company_id: int, user_id: int) -> dict:
+        """Takes a queue slot for an upload before its files are stored; raises IngestionQueueFull when there is none."""
+        if self._wake is None:
+            raise IngestionQueueFull("Ingestion is not running, try again later")
+        job = await crud.reserve_job(company_id, user_id, self.max_queued, self.reserve_s)
+        if job is None:
+            raise IngestionQueueFull("Ingestion queue is full, try again later")
+        return job
+
+    async def cancel(self, reservation: dict):
+        await crud.cancel_reservation(reservation["_id"])
+
+    async def submit(self, reservation: dict, paths: List[Path]) -> dict:
+        company_id = reservation["company_id"]
+        files = [{"name": path.stem, "path": str(path), "source": upload_source(company_id, path.name)} for path in paths]
+        job = await crud.queue_reserved_job(reservation["_id"], files)
+        if job is None:
+            raise IngestionQueueFull("Upload reservation was cancelled, try again")
+        self._queued = await crud.count_queued_jobs()
+        self._wake.set() # type: ignore
+        return job
+
+    async def _work(self):
+        while True:
+            try:
+                job = await crud.claim_next_job(self.owner, self.lease_s)
+            except Exception as e:
+                print(f"Ingestion worker could not claim a job: {e}")
+                job = None
+
+            if job is None:
+                try:
+                    await asyncio.wait_for(self._wake.wait(), timeout=self.poll_interval) # type: ignore
+                except asyncio.TimeoutError:
+                    pass
+                self._wake.clear() # type: ignore
+                continue
+
+            self._running += 1
+            try:
+                await self._run(job)
+            except Exception as e:
+                # Keep the worker alive; the job's lease expires and another worker picks it up again.
+                print(f"Ingestion worker error on job {job['_id']}: {e}")
+            finally:
+                self._running -= 1
+
+    async def _run(self, job: dict):
+        job_id: ObjectId = job["_id"]
+        items = [IngestionItem(Path(f["path"]), job["company_id"], f["name"], f.get("source", "")) for f in job["files"]]
+        pipeline = IngestionPipeline(
+            parse_workers=self.parse_workers,
+            parse_pool=self._parse_pool,
+            embed_thread=self._embed_thread
+        )
+        task = asyncio.create_task(pipeline.run(items))
+        lost = False
+
+        async def report():
+            nonlocal lost
+            while True:
+                await asyncio.sleep(self.report_interval)
+                try:
+                    owned = await crud.update_job_progress(job_id, self.owner, pipeline.stats(), self.lease_s)
+                except Exception as e:
+                    print(f"Ingestion job {job_id} progress update failed: {e}")
+                    continue
+                if not owned:
+                    print(f"Ingestion job {job_id} lease lost to another worker; stopping")
+                    lost = True
+                    task.cancel()
+                    return
+
+        reporter = asyncio.create_task(report())
+        start = time.perf_counter()
+        try:
+            stats = await task
+        except asyncio.CancelledError:
+            if lost:
+                self._lost += 1
+                return
+            # Shutting down: hand the job back rather than leaving it to wait out its lease.
+            await crud.release_job(job_id, self.owner)
+            raise
+        except Exception as e:
+            self._failed += 1
+            await crud.finish_job(job_id, self.owner, "failed", pipeline.stats(), [*pipeline.errors, f"Ingestion failed: {e}"])
+            print(f"Ingestion job {job_id} failed: {e}")
+            return
+        finally:
+            reporter.cancel()
+            if not task.done():
+                task.cancel()
+
+        self._chunks_written += stats["chunks_written"]
+        if stats["errors"] and not stats["documents_done"] and not stats["documents_skipped"]:
+            status = "failed"
+            self._failed += 1
+        else:
+            status = "completed_with_errors" if stats["errors"] else "completed"
+            self._completed += 1
+        await crud.finish_job(job_id, self.owner, status, stats, stats["errors"])
+        if status != "failed":
+            # The chunks are stored; a failed job keeps its files for inspection.
+            for directory in {Path(f["path"]).parent for f in job["files"]}:
+                shutil.rmtree(directory, ignore_errors=True)
+        print(f"Ingestion job {job_id} {status} in {time.perf_counter() - start:.1f}s: {stats['chunks_written']} new chunks")
+
+    def stats(self) -> dict:
+        return {
+            "queued": self._queued,
+            "running": self._running,
+            "completed": self._completed,
+            "failed": self._failed,
+            "lost_leases": self._lost,
+            "chunks_written": self._chunks_written,
+            "max_jobs": self.max_jobs,
+            "max_queued": self.max_queued,
+        }
+
+
+ingestion_jobs = IngestionJobQueue(
+    max_jobs=settings.INGEST_MAX_JOBS,
+    max_queued=settings.INGEST_MAX_QUEUED_JOBS,
+    parse_workers=settings.INGEST_PARSE_WORKERS,
+    report_interval_s=settings.INGEST_JOB_REPORT_S,
+    lease_s=settings.INGEST_JOB_LEASE_S,
+    poll_interval_s=settings.INGEST_JOB_POLL_S,
+    reserve_s=settings.INGEST_UPLOAD_RESERVE_S
+)
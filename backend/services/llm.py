@@ -1,18 +1,17 @@
-from google import genai
-from backend.core.config import settings
-from transformers import AutoTokenizer
+from typing import AsyncIterator, Optional
+from backend.services.llm_gateway import gateway
 
-client = genai.Client(api_key=settings.GEMINI_API_KEY)
 DEFAULT_MODEL = "gemini-2.5-flash"
-TOKENIZER = AutoTokenizer.from_pretrained("backend/ml_models/multilingual-e5-base")
+SUMMARY_MODEL = "gemini-2.0-flash-lite"
 
 
-async def ask_llm(prompt: str) -> str:
-    response = client.models.generate_content(
-        model=DEFAULT_MODEL,
-        contents=prompt
-    )
-    return response.text #type: ignore
+async def ask_llm(prompt: str, deadline: Optional[float] = None) -> str:
+    return await gateway.generate(prompt, model=DEFAULT_MODEL, deadline=deadline)
+
+
+async def stream_llm(prompt: str, deadline: Optional[float] = None) -> AsyncIterator[str]:
+    async for chunk in gateway.stream(prompt, model=DEFAULT_MODEL, deadline=deadline):
+        yield chunk
 
 
 async def summarize(text :str) -> str:
@@ -21,15 +20,16 @@ async def summarize(text :str) -> str:
         f"No introductory phrases. Maximum output length is 450 tokens.\n\n"
         f"CONTENT TO SUMMARIZE:\n{text}"
     )
-    response = client.models.generate_content(
-        model="gemini-2.0-flash-lite",
-        contents=prompt,
+    response = await gateway.generate(
+        prompt,
+        model=SUMMARY_MODEL,
         config={
             "temperature": 0.1, 
             "max_output_tokens": 470
         }
     )
-    return response.text.strip() #type: ignore
+    return response.strip()
 
 if __name__ == "__main__": 
-    print(ask_llm("Explain quantum physics to a 5-year-old."))
\ No newline at end of file
+    import asyncio
+    print(asyncio.run(ask_llm("Explain quantum physics to a 5-year-old.")))
@@ -0,0 +1,273 @@
+import asyncio
+import hashlib
+import random
+import time
+from dataclasses import dataclass
+from typing import AsyncIterator, Dict, Optional
+import httpx
+from backend.core.config import settings
+
+RETRYABLE_STATUS = {408, 429, 500, 502, 503, 504}
+
+
+@dataclass
+class LLMResult:
+    text: str
+    input_tokens: int = 0
+    output_tokens: int = 0
+
+
+class LLMProvider:
+    name = "base"
+
+    async def generate(self, model: str, prompt: str, config: Optional[dict] = None) -> LLMResult:
+        raise NotImplementedError
+
+    def stream(self, model: str, prompt: str, config: Optional[dict] = None) -> AsyncIterator[str]:
+        raise NotImplementedError
+
+
+class GeminiProvider(LLMProvider):
+    name = "gemini"
+
+    def __init__(self, api_key: str):
+        from google import genai
+        if not api_key:
+            raise RuntimeError("GEMINI_API_KEY must be set when LLM_PROVIDER=gemini")
+        self.client = genai.Client(api_key=api_key)
+
+    async def generate(self, model: str, prompt: str, config: Optional[dict] = None) -> LLMResult:
+        response = await self.client.aio.models.generate_content(model=model, contents=prompt, config=config) # type: ignore
+        usage = response.usage_metadata
+        return LLMResult(
+            text=response.text or "",
+            input_tokens=(usage.prompt_token_count or 0) if usage else 0,
+            output_tokens=(usage.candidates_token_count or 0) if usage else 0,
+        )
+
+    async def stream(self, model: str, prompt: str, config: Optional[dict] = None) -> AsyncIterator[str]:
+        stream = await self.client.aio.models.generate_content_stream(model=model, contents=prompt, config=config) # type: ignore
+        async for chunk in stream:
+            if chunk.text:
+                yield chunk.text
+
+
+class StubProvider(LLMProvider):
+    """
+    Deterministic offline provider: the answer is derived from a hash of the
+    prompt, after a fixed first-token latency and a per-word delay.
+    """
+
+    name = "stub"
+    WORDS = ("data", "pipeline", "policy", "model", "review", "access", "owner", "quality", "platform", "standard")
+
+    def __init__(self, latency_ms: float, token_ms: float, answer_words: int = 60):
+        self.latency = latency_ms / 1000
+        self.token_delay = token_ms / 1000
+        self.answer_words = answer_words
+
+    def _answer(self, model: str, prompt: str, config: Optional[dict]) -> list[str]:
+        digest = hashlib.sha256(f"{model}\0{prompt}".encode("utf-8")).digest()
+        limit = (config or {}).get("max_output_tokens", self.answer_words)
+        count = min(self.answer_words, limit)
+        return [self.WORDS[digest[i % len(digest)] % len(self.WORDS)] for i in range(count)]
+
+    async def generate(self, model: str, prompt: str, config: Optional[dict] = None) -> LLMResult:
+        words = self._answer(model, prompt, config)
+        await asyncio.sleep(self.latency + self.token_delay * len(words))
+        return LLMResult(text=" ".join(words), input_tokens=len(prompt.split()), output_tokens=len(words))
+
+    async def stream(self, model: str, prompt: str, config: Optional[dict] = None) -> AsyncIterator[str]:
+        await asyncio.sleep(self.latency)
+        for i, word in enumerate(self._answer(model, prompt, config)):
+            await asyncio.sleep(self.token_delay)
+            yield word if i == 0 else f" {word}"
+
+
+class ModelStats:
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        self.retries = 0
+        self.timeouts = 0
+        self.in_flight = 0
+        self.latency_total = 0.0
+        self.latency_max = 0.0
+        self.waits = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+        self.input_tokens = 0
+        self.output_tokens = 0
+
+    def record_wait(self, seconds: float):
+        """Time one attempt spent waiting for the model's concurrency slot."""
+        self.waits += 1
+        self.wait_total += seconds
+        self.wait_max = max(self.wait_max, seconds)
+
+    def as_dict(self) -> dict:
+        return {
+            "calls": self.calls,
+            "errors": self.errors,
+            "retries": self.retries,
+            "timeouts": self.timeouts,
+            "in_flight": self.in_flight,
+            "avg_latency_s": self.latency_total / self.calls if self.calls else 0.0,
+            "max_latency_s": self.latency_max,
+            "avg_queue_wait_s": self.wait_total / self.waits if self.waits else 0.0,
+            "max_queue_wait_s": self.wait_max,
+            "input_tokens": self.input_tokens,
+            "output_tokens": self.output_tokens,
+        }
+
+
+def _is_retryable(exc: BaseException) -> bool:
+    if isinstance(exc, (asyncio.TimeoutError, httpx.TransportError)):
+        return True
+    return getattr(exc, "code", None) in RETRYABLE_STATUS
+
+
+class LLMGateway:
+    """
+    Single entry point for LLM calls. Each model gets its own concurrency cap,
+    every attempt is bounded by LLM_TIMEOUT_S and by the caller's deadline
+    (a streamed attempt as a whole, not per chunk), and transient failures
+    are retried with full-jitter exponential backoff. Latency stats cover the
+    provider call only; time spent waiting for the concurrency cap is
+    reported as queue wait.
+    """
+
+    def __init__(self, provider: LLMProvider, max_concurrency: int, timeout: float, max_retries: int, retry_base: float):
+        self.provider = provider
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.retry_base = retry_base
+        self._semaphores: Dict[str, asyncio.Semaphore] = {}
+        self._stats: Dict[str, ModelStats] = {}
+
+    def _semaphore(self, model: str) -> asyncio.Semaphore:
+        if model not in self._semaphores:
+            self._semaphores[model] = asyncio.Semaphore(self.max_concurrency)
+        return self._semaphores[model]
+
+    def _model_stats(self, model: str) -> ModelStats:
+        if model not in self._stats:
+            self._stats[model] = ModelStats()
+        return self._stats[model]
+
+    def _attempt_timeout(self, deadline: Optional[float]) -> float:
+        if deadline is None:
+            return self.timeout
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise asyncio.TimeoutError("LLM deadline exceeded")
+        return min(self.timeout, remaining)
+
+    async def _backoff(self, attempt: int, deadline: Optional[float]):
+        delay = random.uniform(0, self.retry_base * (2 ** attempt))
+        if deadline is not None:
+            delay = min(delay, max(0.0, deadline - time.monotonic()))
+        await asyncio.sleep(delay)
+
+    async def generate(self, prompt: str, model: str, config: Optional[dict] = None, deadline: Optional[float] = None) -> str:
+        stats = self._model_stats(model)
+        attempt = 0
+
+        while True:
+            queued = time.perf_counter()
+            try:
+                async with self._semaphore(model):
+                    start = time.perf_counter()
+                    stats.record_wait(start - queued)
+                    stats.in_flight += 1
+                    try:
+                        timeout = self._attempt_timeout(deadline)
+                        result = await asyncio.wait_for(self.provider.generate(model, prompt, config), timeout=timeout)
+                    finally:
+                        stats.in_flight -= 1
+            except Exception as e:
+                stats.errors += 1
+                if isinstance(e, asyncio.TimeoutError):
+                    stats.timeouts += 1
+                if attempt >= self.max_retries or not _is_retryable(e) or (deadline is not None and time.monotonic() >= deadline):
+                    raise
+                stats.retries += 1
+                await self._backoff(attempt, deadline)
+                attempt += 1
+                continue
+
+            elapsed = time.perf_counter() - start
+            stats.calls += 1
+            stats.latency_total += elapsed
+            stats.latency_max = max(stats.latency_max, elapsed)
+            stats.input_tokens += result.input_tokens
+            stats.output_tokens += result.output_tokens
+            return result.text
+
+    async def stream(self, prompt: str, model: str, config: Optional[dict] = None, deadline: Optional[float] = None) -> AsyncIterator[str]:
+        """Retries only until the first chunk arrives; after that a failure is passed to the caller."""
+        stats = self._model_stats(model)
+        attempt = 0
+
+        while True:
+            queued = time.perf_counter()
+            yielded = 0
+            try:
+                async with self._semaphore(model):
+                    start = time.perf_counter()
+                    stats.record_wait(start - queued)
+                    stats.in_flight += 1
+                    attempt_deadline = time.monotonic() + self.timeout
+                    if deadline is not None:
+                        attempt_deadline = min(attempt_deadline, deadline)
+                    chunks = self.provider.stream(model, prompt, config)
+                    try:
+                        while True:
+                            try:
+                                chunk = await asyncio.wait_for(anext(chunks), timeout=self._attempt_timeout(attempt_deadline)) # type: ignore
+                            except StopAsyncIteration:
+                                break
+                            yielded += 1
+                            yield chunk
+                    finally:
+                        stats.in_flight -= 1
+                        await chunks.aclose() # type: ignore
+            except Exception as e:
+                stats.errors += 1
+                if isinstance(e, asyncio.TimeoutError):
+                    stats.timeouts += 1
+                if yielded or attempt >= self.max_retries or not _is_retryable(e) or (deadline is not None and time.monotonic() >= deadline):
+                    raise
+                stats.retries += 1
+                await self._backoff(attempt, deadline)
+                attempt += 1
+                continue
+
+            elapsed = time.perf_counter() - start
+            stats.calls += 1
+            stats.latency_total += elapsed
+            stats.latency_max = max(stats.latency_max, elapsed)
+            stats.input_tokens += len(prompt.split())
+            stats.output_tokens += yielded
+            return
+
+    def stats(self) -> dict:
+        return {"provider": self.provider.name, "models": {m: s.as_dict() for m, s in self._stats.items()}}
+
+
+def create_provider() -> LLMProvider:
+    if settings.LLM_PROVIDER == "stub":
+        return StubProvider(settings.LLM_STUB_LATENCY_MS, settings.LLM_STUB_TOKEN_MS)
+    if settings.LLM_PROVIDER == "gemini":
+        return GeminiProvider(settings.GEMINI_API_KEY)
+    raise ValueError(f"Unknown LLM_PROVIDER '{settings.LLM_PROVIDER}', expected 'gemini' or 'stub'")
+
+
+gateway = LLMGateway(
+    create_provider(),
+    max_concurrency=settings.LLM_MAX_CONCURRENCY,
+    timeout=settings.LLM_TIMEOUT_S,
+    max_retries=settings.LLM_MAX_RETRIES,
+    retry_base=settings.LLM_RETRY_BASE_S
+)
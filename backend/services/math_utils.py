@@ -1,5 +1,9 @@
+MIN_REVIEWS_THRESHOLD = 5
+MIN_REUSE_FOR_STATUS = 5
+CANONICAL_MIN_SCORE = 4.0
+QUARANTINE_MAX_SCORE = 2.0
 
-def calculate_bayesian_rating(item_reviews_count: int, item_avg_rating: float,global_avg_rating: float,min_reviews_threshold: int = 5) -> float:
+def calculate_bayesian_rating(item_reviews_count: int, item_avg_rating: float,global_avg_rating: float,min_reviews_threshold: int = MIN_REVIEWS_THRESHOLD) -> float:
     """
     Formula: (v / (v + m)) * R + (m / (v + m)) * C
     """
@@ -14,13 +18,42 @@ def calculate_bayesian_rating(item_reviews_count: int, item_avg_rating: float,gl
     return (item_trust_weight * item_avg_rating) + (global_trust_weight * global_avg_rating)
 
 def determine_status(reuse_count: int, bayesian_rating: float) -> str:
-    if reuse_count < 5:
+    if reuse_count < MIN_REUSE_FOR_STATUS:
         return "candidate"
     
-    if bayesian_rating >= 4.0:
+    if bayesian_rating >= CANONICAL_MIN_SCORE:
         return "canonical"
     
-    if bayesian_rating <= 2.0:
+    if bayesian_rating <= QUARANTINE_MAX_SCORE:
         return "quarantine"
     
-    return "DELETE"
\ No newline at end of file
+    return "DELETE"
+
+# Aggregation-expression versions of the two functions above, for
+# pipeline updates that compute the score and status inside MongoDB.
+# They perform the same floating-point operations in the same order.
+
+def bayesian_rating_expr(count: str, rating_sum: str, global_avg_rating: float, min_reviews_threshold: int = MIN_REVIEWS_THRESHOLD) -> dict:
+    total_weight = {"$add": [count, min_reviews_threshold]}
+    return {
+        "$cond": [
+            {"$eq": [total_weight, 0]},
+            0.0,
+            {"$add": [
+                {"$multiply": [{"$divide": [count, total_weight]}, {"$divide": [rating_sum, count]}]},
+                {"$multiply": [{"$divide": [min_reviews_threshold, total_weight]}, global_avg_rating]}
+            ]}
+        ]
+    }
+
+def status_expr(reuse_count: str, bayesian_rating: str) -> dict:
+    return {
+        "$switch": {
+            "branches": [
+                {"case": {"$lt": [reuse_count, MIN_REUSE_FOR_STATUS]}, "then": "candidate"},
+                {"case": {"$gte": [bayesian_rating, CANONICAL_MIN_SCORE]}, "then": "canonical"},
+                {"case": {"$lte": [bayesian_rating, QUARANTINE_MAX_SCORE]}, "then": "quarantine"},
+            ],
+            "default": "DELETE"
+        }
+    }
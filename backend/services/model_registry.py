@@ -0,0 +1,88 @@
+import sys
+import threading
+import time
+from typing import Any, Callable, Dict
+from backend.core.config import settings
+
+EMBEDDING_MODEL_ID = "multilingual-e5-base"
+EMBEDDING_MODEL_DIR = f"backend/ml_models/{EMBEDDING_MODEL_ID}"
+RERANKER_MODEL_DIR = "./backend/ml_models/bge-reranker-v2-m3"
+
+_models: Dict[str, Any] = {}
+_lock = threading.Lock()
+
+
+def _get_or_load(name: str, loader: Callable[[], Any]) -> Any:
+    model = _models.get(name)
+    if model is not None:
+        return model
+
+    with _lock:
+        if name not in _models:
+            start = time.perf_counter()
+            _models[name] = loader()
+            print(f"Loaded {name} in {time.perf_counter() - start:.2f}s")
+    return _models[name]
+
+
+def _load_tokenizer():
+    from transformers import AutoTokenizer
+    return AutoTokenizer.from_pretrained(EMBEDDING_MODEL_DIR)
+
+
+def _load_embedding_backend():
+    from backend.services.embedding_backends import load_backend
+    return load_backend(
+        settings.EMBEDDING_BACKEND,
+        EMBEDDING_MODEL_DIR,
+        onnx_path=settings.EMBEDDING_ONNX_PATH,
+        num_threads=settings.EMBEDDING_NUM_THREADS
+    )
+
+
+def _load_reranker():
+    import torch
+    import torch.nn as nn
+    from sentence_transformers import CrossEncoder
+    return CrossEncoder(
+        RERANKER_MODEL_DIR,
+        activation_fn=nn.Sigmoid(),
+        device="cuda" if torch.cuda.is_available() else "cpu"
+    )
+
+
+def get_tokenizer():
+    """The e5 tokenizer, shared by embedding, token counting and truncation."""
+    return _get_or_load("tokenizer", _load_tokenizer)
+
+
+def get_embedding_backend():
+    return _get_or_load("embedding_backend", _load_embedding_backend)
+
+
+def get_reranker():
+    return _get_or_load("reranker", _load_reranker)
+
+
+def loaded_models() -> list[str]:
+    return list(_models)
+
+
+def pin_cuda_device():
+    """Worker threads start on the default CUDA device; pin them explicitly when a GPU is present."""
+    torch = sys.modules.get("torch")
+    if torch is not None and torch.cuda.is_available():
+        torch.cuda.set_device(0)
+
+
+def warmup_models():
+    """Loads every model and pushes a dummy batch through it so the first request pays no setup cost."""
+    start = time.perf_counter()
+
+    tokenizer = get_tokenizer()
+    batch = tokenizer(["query: warmup", "passage: warmup"], max_length=512, padding=True, truncation=True, return_tensors="np")
+    get_embedding_backend().encode(batch["input_ids"], batch["attention_mask"])
+
+    get_reranker().predict([["warmup", "warmup"]])
+
+    print(f"Model warmup finished in {time.perf_counter() - start:.2f}s")
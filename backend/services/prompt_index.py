@@ -0,0 +1,102 @@
+import hashlib
+import re
+import time
+import unicodedata
+from typing import Dict, Iterable, List, Optional
+from backend.core.config import settings
+from backend.crud import prompt_index_crud as crud
+
+_TRAILING_PUNCTUATION = re.compile(r"[\s?!.。？！]+$")
+
+def normalize_prompt(text: str) -> str:
+    text = unicodedata.normalize("NFKC", text).casefold()
+    text = " ".join(text.split())
+    return _TRAILING_PUNCTUATION.sub("", text)
+
+def prompt_hash(text: str) -> str:
+    return hashlib.sha256(normalize_prompt(text).encode("utf-8")).hexdigest()
+
+
+class PromptIndex:
+    """
+    Exact-match index from normalized prompt text (canonical_prompt and aliases)
+    to an AIResponse id. Stored per company in the `prompt_hashes` collection and
+    mirrored in memory; a company's mirror is reloaded after
+    PROMPT_INDEX_REFRESH_S so entries written by other workers show up.
+    """
+
+    def __init__(self, refresh_seconds: float):
+        self.refresh_seconds = refresh_seconds
+        self._mirror: Dict[int, Dict[str, str]] = {}
+        self._loaded_at: Dict[int, float] = {}
+        self._indexes_ready = False
+
+        self.hits = 0
+        self.misses = 0
+
+    async def _ensure_indexes(self):
+        if not self._indexes_ready:
+            await crud.ensure_prompt_hash_indexes()
+            self._indexes_ready = True
+
+    async def _company(self, company_id: int) -> Dict[str, str]:
+        loaded_at = self._loaded_at.get(company_id)
+        if loaded_at is None or time.monotonic() - loaded_at > self.refresh_seconds:
+            self._mirror[company_id] = await crud.get_company_prompt_hashes(company_id)
+            self._loaded_at[company_id] = time.monotonic()
+        return self._mirror[company_id]
+
+    async def lookup(self, company_id: int, text: str) -> Optional[str]:
+        response_id = (await self._company(company_id)).get(prompt_hash(text))
+        if response_id:
+            self.hits += 1
+        else:
+            self.misses += 1
+        return response_id
+
+    async def register(self, company_id: int, response_id: str, texts: Iterable[str]):
+        hashes = list({prompt_hash(t) for t in texts if t and t.strip()})
+        if not hashes:
+            return
+        await self._ensure_indexes()
+        await crud.upsert_prompt_hashes(company_id, response_id, hashes)
+
+        mirror = self._mirror.get(company_id)
+        if mirror is not None:
+            for h in hashes:
+                mirror[h] = response_id
+
+    async def remove_response(self, response_id: str):
+        await crud.delete_prompt_hashes_for_response(response_id)
+        self.forget(response_id)
+
+    def forget(self, response_id: str):
+        for mirror in self._mirror.values():
+            for h in [h for h, rid in mirror.items() if rid == response_id]:
+                del mirror[h]
+
+    async def rebuild(self, company_id: int | None = None) -> int:
+        await self._ensure_indexes()
+        await crud.delete_all_prompt_hashes(company_id)
+
+        count = 0
+        async for doc in crud.iter_indexable_responses(company_id):
+            texts: List[str] = [doc.get("canonical_prompt", "")] + doc.get("aliases", [])
+            await self.register(doc["company_id"], str(doc["_id"]), texts)
+            count += 1
+
+        self._mirror.clear()
+        self._loaded_at.clear()
+        return count
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "companies_loaded": len(self._mirror),
+        }
+
+
+prompt_index = PromptIndex(refresh_seconds=settings.PROMPT_INDEX_REFRESH_S)
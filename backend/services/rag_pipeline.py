@@ -1,16 +1,25 @@
 import asyncio
-from typing import List, Tuple
-from backend.services.bi_encoder import create_embedding
-from backend.services.cross_encoder import rerank_documents, find_similarities
+import time
+from typing import AsyncIterator, List, Optional, Tuple
+from bson import ObjectId
+from backend.services.embedding_service import embed
+from backend.services.rerank_scheduler import rerank_documents_scored, find_similarities_scored
+from backend.services.cascade import cascade_candidates
+from backend.services.context_assembler import ContextSection, assemble_context
+from backend.services.vector_index import doc_index
+from backend.core.config import settings
+from backend.core.metrics import StageTimer
 from backend.core.database import ai_responses as ai_response_col
 from backend.core.database import document_chunks as doc_chunk_col
-from backend.services.llm import DEFAULT_MODEL, summarize, ask_llm
+from backend.services.llm import DEFAULT_MODEL, ask_llm, stream_llm
+from backend.services.summary_cache import summary_cache
 from backend.services.bi_encoder import count_tokens
 from backend.schemas.nosql.ai_response import AIResponse
 from backend.schemas.nosql.prompt_event import PromptEvent
-from backend.crud.ai_crud import create_ai_response, create_prompt_event, push_ai_response_to_event
+from backend.crud.ai_crud import create_ai_response, create_prompt_event, delete_prompt_event, get_ai_response_by_id, push_ai_response_to_event, record_cached_answer
+from backend.services.prompt_index import normalize_prompt, prompt_index
+from backend.services.single_flight import SingleFlight
 from pydantic import BaseModel
-import torch
 
 class RAGResult(BaseModel):
     ai_response_id: str
@@ -18,9 +27,16 @@ class RAGResult(BaseModel):
     response_text: str
     model: str
     feedback_required: bool = True
+    used_cached_answer: bool = False
 
 #  Memory Retrieval
-async def fetch_memory_context(query: str, query_vector: List[float], company_id: int) -> Tuple[List[str], List[str]]:
+MEMORY_LABELS = {
+    "canonical": "Verified Good Answer",
+    "quarantine": "AVOID THIS - INCORRECT PREVIOUS ANSWER"
+}
+
+async def fetch_memory_context(query: str, query_vector: List[float], company_id: int, timer: StageTimer) -> Tuple[List[ContextSection], Optional[dict]]:
+    """Returns context sections and a canonical answer confident enough to serve as-is."""
     pipeline = [
         {"$vectorSearch": {
             "index": "ai_responses_vector_index",
@@ -29,39 +45,48 @@ async def fetch_memory_context(query: str, query_vector: List[float], company_id
             "numCandidates": 15, "limit": 5,
             "filter": {"company_id": company_id} 
         }},
-        {"$project": {"_id": 1, "canonical_prompt": 1, "response": 1, "status": 1}}
+        {"$project": {"_id": 1, "canonical_prompt": 1, "response": 1, "status": 1, "model": 1, "score": {"$meta": "vectorSearchScore"}}}
     ]
-    cursor = await ai_response_col.aggregate(pipeline) 
-    results = await cursor.to_list(length=20) #type: ignore
-    if not results: return [], [] # type: ignore
-
-    memory_map = {m["canonical_prompt"]: m for m in results}
+    with timer.stage("memory_search"):
+        cursor = await ai_response_col.aggregate(pipeline) 
+        results = await cursor.to_list(length=20) #type: ignore
 
+    _, candidates = cascade_candidates(
+        results,
+        min_score=settings.CASCADE_MEMORY_MIN_SCORE,
+        margin=settings.CASCADE_MARGIN,
+        max_candidates=settings.CASCADE_MAX_RERANK
+    )
+    if not candidates: return [], None
 
-    def _find_similarities():
-        if torch.cuda.is_available():
-            torch.cuda.set_device(0)
+    memory_map = {m["canonical_prompt"]: m for m in candidates}
 
-        return find_similarities(query, list(memory_map.keys()), top_n=2)
+    with timer.stage("memory_rerank"):
+        hits = await find_similarities_scored(query, list(memory_map.keys()), top_n=2)
 
-    hits = await asyncio.to_thread(_find_similarities)
+    cached = None
+    if settings.ANSWER_CACHE_ENABLED and hits:
+        top_hit, top_score = hits[0]
+        if top_score >= settings.ANSWER_CACHE_THRESHOLD and memory_map[top_hit]["status"] == "canonical":
+            cached = memory_map[top_hit]
     
     sections = []
-    used_ids = []
-    for hit in hits:
-        m = memory_map.get(hit)
-        used_ids.append(str(m["_id"]))  # type: ignore
-        label = {
-            "canonical": "Verified Good Answer",
-            "quarantine": "AVOID THIS - INCORRECT PREVIOUS ANSWER"
-        }.get(m["status"], "Previous Draft Answer") # type: ignore
-        
-        sections.append(f"[{label}]: {m['response']}") # type: ignore
-    return sections, used_ids
+    for hit, score in hits:
+        m = memory_map[hit]
+        sections.append(ContextSection(
+            label=MEMORY_LABELS.get(m["status"], "Previous Draft Answer"),
+            text=m["response"],
+            score=score,
+            source_ids=[str(m["_id"])]
+        ))
+    return sections, cached
 
 
 # Document Retrieval
-async def fetch_document_context(query: str, query_vector: List[float], company_id: int) -> Tuple[List[str], List[str]]:
+async def search_document_chunks(query_vector: List[float], company_id: int) -> List[dict]:
+    if settings.DOC_RETRIEVER == "local":
+        return doc_index.search(company_id, query_vector, k=15)
+
     pipeline = [
         {"$vectorSearch": {
             "index": "docs_vector_index",
@@ -70,97 +95,319 @@ async def fetch_document_context(query: str, query_vector: List[float], company_
             "numCandidates": 25, "limit": 15,
             "filter": {"company_id": company_id} 
         }},
-        {"$project": {"_id": 1, "content": 1}}
+        {"$project": {"_id": 1, "content": 1, "parent_doc_id": 1, "chunk_index": 1, "score": {"$meta": "vectorSearchScore"}}}
     ]
     cursor = await doc_chunk_col.aggregate(pipeline)
-    results = await cursor.to_list(length=50)#type: ignore
-    if not results: return [], [] # type: ignore
+    return await cursor.to_list(length=50)#type: ignore
 
-    chunk_map = {d["content"]: d for d in results}
+async def fetch_document_context(query: str, query_vector: List[float], company_id: int, timer: StageTimer) -> List[ContextSection]:
+    with timer.stage("doc_search"):
+        results = await search_document_chunks(query_vector, company_id)
 
+    accepted, candidates = cascade_candidates(
+        results,
+        min_score=settings.CASCADE_DOC_MIN_SCORE,
+        margin=settings.CASCADE_MARGIN,
+        max_candidates=settings.CASCADE_MAX_RERANK,
+        accept_score=settings.CASCADE_DOC_ACCEPT_SCORE
+    )
+    if not accepted and not candidates: return []
 
-    def _rerank_documents():
-        if torch.cuda.is_available():
-            torch.cuda.set_device(0)
-        return rerank_documents(query, list(chunk_map.keys()), top_n=10)
-    
-    top_chunks = await asyncio.to_thread(_rerank_documents)
+    chunk_map = {d["content"]: d for d in accepted + candidates}
+
+    # Accepted hits skipped the cross-encoder; their vector score stands in for it.
+    top_chunks = [(d["content"], d["score"]) for d in accepted][:10]
+    if candidates and len(top_chunks) < 10:
+        with timer.stage("doc_rerank"):
+            top_chunks += await rerank_documents_scored(query, [d["content"] for d in candidates], top_n=10 - len(top_chunks))
 
     sections = []
-    used_chunk_ids = []
-    for chunk in top_chunks:
-        c = chunk_map.get(chunk)
-        used_chunk_ids.append(str(c["_id"])) # type: ignore
-        sections.append(f"[Document Knowledge]: {chunk}")
+    for chunk, score in top_chunks:
+        c = chunk_map[chunk]
+        sections.append(ContextSection(
+            label="Document Knowledge",
+            text=chunk,
+            score=score,
+            source_ids=[str(c["_id"])],
+            parent_doc_id=str(c["parent_doc_id"]) if c.get("parent_doc_id") is not None else None,
+            chunk_index=c.get("chunk_index")
+        ))
         
-    return sections, used_chunk_ids
+    return sections
 
-import time
+# Exact-match Lookup
+async def find_exact_answer(query: str, company_id: int) -> Optional[dict]:
+    response_id = await prompt_index.lookup(company_id, query)
+    if not response_id:
+        return None
+
+    response = await get_ai_response_by_id(response_id)
+    if not response:
+        prompt_index.forget(response_id)
+        return None
+    if response.get("status") not in settings.EXACT_MATCH_STATUSES:
+        return None
+    return response
+
+async def serve_cached_answer(event_id, cached: dict) -> RAGResult:
+    await record_cached_answer(event_id, str(cached["_id"]))
+    return RAGResult(
+        ai_response_id=str(cached["_id"]),
+        event_id=str(event_id),
+        response_text=cached["response"],
+        model=cached.get("model", DEFAULT_MODEL),
+        feedback_required=True,
+        used_cached_answer=True
+    )
+
+class PreparedPrompt(BaseModel):
+    original_query: str
+    search_query: str
+    query_vector: List[float]
+    final_prompt: str
+    prompt_tokens: int
+    memory_ids: List[str]
+    doc_ids: List[str]
+    company_id: int
+
+class SharedAnswer(BaseModel):
+    """The part of a pipeline run that concurrent duplicates of a prompt can share."""
+    ai_response_id: str
+    response_text: str
+    model: str
+    related_ids: List[str]
+    used_cached_answer: bool = False
+
+    @classmethod
+    def from_cached(cls, cached: dict) -> "SharedAnswer":
+        return cls(
+            ai_response_id=str(cached["_id"]),
+            response_text=cached["response"],
+            model=cached.get("model", DEFAULT_MODEL),
+            related_ids=[str(cached["_id"])],
+            used_cached_answer=True
+        )
+
+# Concurrent identical prompts within a company await one summarization and one answer.
+summary_flight = SingleFlight("summarize")
+answer_flight = SingleFlight("answer")
+
+def flight_key(company_id: int, query: str) -> Tuple[int, str]:
+    return company_id, normalize_prompt(query)
 
 # Main Pipeline
-async def run_rag_pipeline(query: str, user_id: int, company_id: int):
-    t0 = time.perf_counter()
+async def open_prompt(query: str, user_id: int, company_id: int, timer: StageTimer) -> Tuple[ObjectId, str] | RAGResult:
+    """Per-user start of a run: exact-match lookup, summarization and the user's PromptEvent."""
+    with timer.stage("exact_lookup"):
+        exact = await find_exact_answer(query, company_id)
+    if exact:
+        with timer.stage("event_insert"):
+            event_id = await create_prompt_event(PromptEvent(
+                prompt_text=query,
+                user_id=user_id,
+                company_id=company_id
+            ))
+        with timer.stage("db_writes"):
+            return await serve_cached_answer(event_id, exact)
 
-    original_query = query
     search_query = query
-    
     if count_tokens(query) > 500:
-        search_query = await summarize(query)
-    
-    t1 = time.perf_counter()
-    print(f"Summarization: {t1-t0:.2f}s")
+        with timer.stage("summarize"):
+            search_query = await summary_flight.do(flight_key(company_id, query), lambda: summary_cache.summarize(query))
 
     new_event = PromptEvent(
-        prompt_text=original_query,
+        prompt_text=query,
         user_id=user_id,
         company_id=company_id
     )
-    event_id = await create_prompt_event(new_event)
-    t2 = time.perf_counter()
-    print(f"Create prompt event: {t2-t1:.2f}s")
+    with timer.stage("event_insert"):
+        event_id = await create_prompt_event(new_event)
+    return event_id, search_query
 
-    query_vector = await asyncio.to_thread(create_embedding, f"query: {search_query}")
+async def prepare_rag_prompt(original_query: str, search_query: str, company_id: int, timer: StageTimer) -> PreparedPrompt | SharedAnswer:
+    """Everything between the PromptEvent and the LLM call. Returns a SharedAnswer when a cached answer can be served."""
+    with timer.stage("embed"):
+        query_vector = await embed(f"query: {search_query}")
 
-    t3 = time.perf_counter()
-    print(f"Embedding creation: {t3-t2:.2f}s")
+    docs_task = asyncio.create_task(fetch_document_context(search_query, query_vector, company_id, timer))
+    try:
+        memory_sections, cached = await fetch_memory_context(search_query, query_vector, company_id, timer)
+    except BaseException:
+        docs_task.cancel()
+        raise
 
-    memory_task = fetch_memory_context(search_query, query_vector, company_id)
-    docs_task = fetch_document_context(search_query, query_vector, company_id)
-    
-    (memory_sections, memory_ids), (doc_sections, doc_ids) = await asyncio.gather(
-        memory_task, docs_task
-    )
-    t4 = time.perf_counter()
-    print(f"Vector search + reranking: {t4-t3:.2f}s")
+    if cached:
+        # Smart cache hit: the canonical answer is served as-is, no LLM call and no new AIResponse.
+        docs_task.cancel()
+        return SharedAnswer.from_cached(cached)
+
+    doc_sections = await docs_task
+
+    with timer.stage("context_assembly"):
+        context = assemble_context(memory_sections + doc_sections, settings.CONTEXT_TOKEN_BUDGET, count_tokens)
+        used_ids = set(context.source_ids)
+        final_prompt = f"Context:\n{context.text}\n\nQuestion: {search_query}\nAnswer:"
+        prompt_tokens = count_tokens(final_prompt)
+    print(f"Context: {len(context.sections)} sections ({context.dropped} dropped), prompt tokens: {prompt_tokens}")
 
-    all_context = memory_sections + doc_sections
+    return PreparedPrompt(
+        original_query=original_query,
+        search_query=search_query,
+        query_vector=query_vector,
+        final_prompt=final_prompt,
+        prompt_tokens=prompt_tokens,
+        memory_ids=[sid for s in memory_sections for sid in s.source_ids if sid in used_ids],
+        doc_ids=[sid for s in doc_sections for sid in s.source_ids if sid in used_ids],
+        company_id=company_id
+    )
 
-    final_prompt = f"Context:\n{'\n\n'.join(all_context)}\n\nQuestion: {search_query}\nAnswer:"
-    answer_text = await ask_llm(final_prompt) # type: ignore
-    t5 = time.perf_counter()
-    print(f"LLM call: {t5-t4:.2f}s")
+async def store_answer(prepared: PreparedPrompt, answer_text: str, timer: StageTimer) -> SharedAnswer:
     new_response = AIResponse(
-        canonical_prompt=search_query,
+        canonical_prompt=prepared.search_query,
         response=answer_text,
-        embedding=query_vector,
+        embedding=prepared.query_vector,
         model=DEFAULT_MODEL,
-        company_id=company_id,
-        source_doc_ids=doc_ids
+        prompt_tokens=prepared.prompt_tokens,
+        company_id=prepared.company_id,
+        source_doc_ids=prepared.doc_ids,
+        aliases=[prepared.original_query] if prepared.original_query != prepared.search_query else []
     )
-    ai_res_id = await create_ai_response(new_response)
-
-    all_related_ids = memory_ids + [str(ai_res_id)]
-    
-    await push_ai_response_to_event(event_id, all_related_ids)
-    t6 = time.perf_counter()
-    print(f"DB writes: {t6-t5:.2f}s")
-    
-    print(f"TOTAL: {t6-t0:.2f}s")
+    with timer.stage("db_writes"):
+        ai_res_id = await create_ai_response(new_response)
+        await prompt_index.register(prepared.company_id, str(ai_res_id), [prepared.search_query, prepared.original_query])
 
-    return RAGResult(
+    return SharedAnswer(
         ai_response_id=str(ai_res_id),
-        event_id=str(event_id),
         response_text=answer_text,
         model=DEFAULT_MODEL,
-        feedback_required=True
-    )
\ No newline at end of file
+        related_ids=prepared.memory_ids + [str(ai_res_id)]
+    )
+
+async def link_answer(event_id: ObjectId, shared: SharedAnswer, timer: StageTimer) -> RAGResult:
+    """Attaches a (possibly shared) answer to one user's PromptEvent."""
+    with timer.stage("db_writes"):
+        if shared.used_cached_answer:
+            await record_cached_answer(event_id, shared.ai_response_id)
+        else:
+            await push_ai_response_to_event(event_id, shared.related_ids)
+
+    return RAGResult(
+        ai_response_id=shared.ai_response_id,
+        event_id=str(event_id),
+        response_text=shared.response_text,
+        model=shared.model,
+        feedback_required=True,
+        used_cached_answer=shared.used_cached_answer
+    )
+
+def request_deadline() -> float:
+    """Deadline, on the time.monotonic() clock, for the LLM work of a request starting now."""
+    return time.monotonic() + settings.LLM_REQUEST_DEADLINE_S
+
+async def answer_query(original_query: str, search_query: str, company_id: int, timer: StageTimer, deadline: float) -> SharedAnswer:
+    prepared = await prepare_rag_prompt(original_query, search_query, company_id, timer)
+    if isinstance(prepared, SharedAnswer):
+        return prepared
+
+    with timer.stage("llm"):
+        answer_text = await ask_llm(prepared.final_prompt, deadline=deadline)
+
+    return await store_answer(prepared, answer_text, timer)
+
+def cache_outcome(shared: SharedAnswer, leader: bool) -> str:
+    """`cache` metric label: exact | answer | shared | miss."""
+    if not leader:
+        return "shared"
+    return "answer" if shared.used_cached_answer else "miss"
+
+def finish(timer: StageTimer, company_id: int, cache: str):
+    timer.observe(company_id, cache)
+    print(f"RAG {timer.pipeline} [{cache}]: {timer.summary()}")
+
+async def run_rag_pipeline(query: str, user_id: int, company_id: int) -> RAGResult:
+    timer = StageTimer("rag")
+    deadline = request_deadline()
+    opened = await open_prompt(query, user_id, company_id, timer)
+    if isinstance(opened, RAGResult):
+        finish(timer, company_id, "exact")
+        return opened
+    event_id, search_query = opened
+
+    # The shared stages are timed by the leader; followers record their wait as one stage.
+    key = flight_key(company_id, search_query)
+    leader = answer_flight.get(key) is None
+    if leader:
+        shared = await answer_flight.do(key, lambda: answer_query(query, search_query, company_id, timer, deadline))
+    else:
+        with timer.stage("shared_wait"):
+            shared = await answer_flight.do(key, lambda: answer_query(query, search_query, company_id, timer, deadline))
+
+    result = await link_answer(event_id, shared, timer)
+    finish(timer, company_id, cache_outcome(shared, leader))
+    return result
+
+async def stream_rag_pipeline(query: str, user_id: int, company_id: int) -> AsyncIterator[str | RAGResult]:
+    """
+    Yields answer text as the LLM produces it, then the persisted RAGResult.
+    A stream that finds the same prompt already in flight waits for that answer
+    and yields it in one piece; a stream that starts its own generation is not
+    joinable, since its tokens go to a single client.
+
+    If the stream ends before the RAGResult is delivered (the client
+    disconnects or generation fails), the user's PromptEvent is deleted:
+    the client never learns its id, so it could not be rated and would block
+    the user's next prompt.
+    """
+    timer = StageTimer("rag_stream")
+    deadline = request_deadline()
+    opened = await open_prompt(query, user_id, company_id, timer)
+    event_id = ObjectId(opened.event_id) if isinstance(opened, RAGResult) else opened[0]
+    stream = _stream_answer(opened, query, company_id, timer, deadline)
+    try:
+        async for item in stream:
+            yield item
+    except (GeneratorExit, asyncio.CancelledError, Exception):
+        await asyncio.shield(delete_prompt_event(event_id))
+        raise
+    finally:
+        await stream.aclose()
+
+async def _stream_answer(opened: Tuple[ObjectId, str] | RAGResult, query: str, company_id: int, timer: StageTimer, deadline: float) -> AsyncIterator[str | RAGResult]:
+    if isinstance(opened, RAGResult):
+        finish(timer, company_id, "exact")
+        yield opened.response_text
+        yield opened
+        return
+    event_id, search_query = opened
+
+    key = flight_key(company_id, search_query)
+    if answer_flight.get(key) is not None:
+        with timer.stage("shared_wait"):
+            shared = await answer_flight.do(key, lambda: answer_query(query, search_query, company_id, timer, deadline))
+        result = await link_answer(event_id, shared, timer)
+        finish(timer, company_id, "shared")
+        yield shared.response_text
+        yield result
+        return
+
+    prepared = await prepare_rag_prompt(query, search_query, company_id, timer)
+    if isinstance(prepared, SharedAnswer):
+        result = await link_answer(event_id, prepared, timer)
+        finish(timer, company_id, "answer")
+        yield prepared.response_text
+        yield result
+        return
+
+    parts = []
+    llm_started = time.perf_counter()
+    with timer.stage("llm"):
+        async for part in stream_llm(prepared.final_prompt, deadline=deadline):
+            if not parts:
+                timer.record("llm_first_token", time.perf_counter() - llm_started)
+            parts.append(part)
+            yield part
+
+    shared = await store_answer(prepared, "".join(parts), timer)
+    result = await link_answer(event_id, shared, timer)
+    finish(timer, company_id, "miss")
+    yield result
@@ -0,0 +1,46 @@
+from typing import List, Tuple
+from backend.core.config import settings
+from backend.services.batching import MicroBatcher
+from backend.services.cross_encoder import MEMORY_THRESHOLD, RERANK_THRESHOLD, score_pairs, select_relevant, select_relevant_scored
+
+# Pairs from the memory and document rerank of one prompt, and from every
+# concurrent prompt, share cross-encoder forward passes.
+rerank_batcher = MicroBatcher(
+    score_pairs,
+    max_batch_size=settings.RERANK_MAX_BATCH_SIZE,
+    max_wait_ms=settings.RERANK_MAX_WAIT_MS,
+    name="rerank"
+)
+
+async def score(query: str, docs: List[str]) -> List[float]:
+    return await rerank_batcher.submit_many([(query, doc) for doc in docs])
+
+async def get_relevant_content(query: str, docs: List[str], threshold: float, top_n: int = 5) -> List[str]:
+    if not docs:
+        return []
+
+    scores = await score(query, docs)
+    return select_relevant(docs, scores, threshold, top_n)
+
+async def rerank_documents(query: str, retrieved_docs: List[str], top_n=5) -> List[str]:
+    return await get_relevant_content(query, retrieved_docs, threshold=RERANK_THRESHOLD, top_n=top_n)
+
+async def rerank_documents_scored(query: str, retrieved_docs: List[str], top_n=5) -> List[Tuple[str, float]]:
+    if not retrieved_docs:
+        return []
+
+    scores = await score(query, retrieved_docs)
+    return select_relevant_scored(retrieved_docs, scores, RERANK_THRESHOLD, top_n)
+
+async def find_similarities(query: str, stored_questions: List[str], top_n=2) -> List[str]:
+    return await get_relevant_content(query, stored_questions, threshold=MEMORY_THRESHOLD, top_n=top_n)
+
+async def find_similarities_scored(query: str, stored_questions: List[str], top_n=2) -> List[Tuple[str, float]]:
+    if not stored_questions:
+        return []
+
+    scores = await score(query, stored_questions)
+    return select_relevant_scored(stored_questions, scores, MEMORY_THRESHOLD, top_n)
+
+def get_rerank_stats() -> dict:
+    return rerank_batcher.stats()
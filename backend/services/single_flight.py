@@ -0,0 +1,50 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional
+
+
+class SingleFlight:
+    """
+    Collapses concurrent calls that share a key into one computation. The first
+    caller starts `fn` as its own task; callers arriving while it runs await the
+    same task. The task is shielded, so a caller that disconnects does not cancel
+    the work for everyone else. Results are not kept once the task finishes.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._inflight: Dict[Hashable, asyncio.Task] = {}
+        self._leaders = 0
+        self._followers = 0
+
+    def get(self, key: Hashable) -> Optional[asyncio.Task]:
+        task = self._inflight.get(key)
+        return task if task is not None and not task.done() else None
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        task = self.get(key)
+        if task is None:
+            self._leaders += 1
+            task = asyncio.create_task(fn())
+            self._inflight[key] = task
+            task.add_done_callback(lambda t: self._finish(key, t))
+        else:
+            self._followers += 1
+
+        return await asyncio.shield(task)
+
+    def _finish(self, key: Hashable, task: asyncio.Task):
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        # Mark the exception as retrieved in case every caller was cancelled.
+        if not task.cancelled():
+            task.exception()
+
+    def stats(self) -> dict:
+        calls = self._leaders + self._followers
+        return {
+            "name": self.name,
+            "in_flight": len(self._inflight),
+            "leaders": self._leaders,
+            "followers": self._followers,
+            "coalesced_ratio": self._followers / calls if calls else 0.0,
+        }
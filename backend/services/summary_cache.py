@@ -0,0 +1,71 @@
+import hashlib
+import backend.crud.summary_cache_crud as crud
+from backend.core.config import settings
+from backend.services.llm import SUMMARY_MODEL, summarize
+
+
+def summary_key(text: str) -> str:
+    return hashlib.sha256(f"{SUMMARY_MODEL}\0{text.strip()}".encode("utf-8")).hexdigest()
+
+
+class SummaryCache:
+    """
+    Summaries of long prompts and responses, keyed by a hash of the summary
+    model and the exact text and stored in the `summary_cache` collection.
+    Entries expire TTL seconds after their last use (a Mongo TTL index), and
+    the least recently used ones are evicted once the stored summaries
+    exceed `max_bytes`.
+    """
+
+    def __init__(self, ttl_seconds: int, max_bytes: int):
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self._indexes_ready = False
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    async def _ensure_indexes(self):
+        if not self._indexes_ready:
+            await crud.ensure_summary_cache_indexes(self.ttl_seconds)
+            self._indexes_ready = True
+
+    async def _enforce_size(self):
+        size = await crud.get_summary_cache_size()
+        if size > self.max_bytes:
+            # Free an extra 10% so the next few inserts do not each trigger eviction.
+            self.evictions += await crud.evict_least_recent(size - int(self.max_bytes * 0.9))
+
+    async def summarize(self, text: str) -> str:
+        key = summary_key(text)
+        cached = await crud.get_summary(key)
+        if cached:
+            self.hits += 1
+            return cached["summary"]
+
+        self.misses += 1
+        summary = await summarize(text)
+
+        await self._ensure_indexes()
+        await crud.put_summary(key, summary, SUMMARY_MODEL, len(text))
+        await self._enforce_size()
+        return summary
+
+    async def clear(self):
+        await crud.clear_summary_cache()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+        }
+
+
+summary_cache = SummaryCache(
+    ttl_seconds=settings.SUMMARY_CACHE_TTL_S,
+    max_bytes=settings.SUMMARY_CACHE_MAX_MB * 1024 * 1024
+)
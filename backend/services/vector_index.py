@@ -0,0 +1,156 @@
+import json
+import os
+from pathlib import Path
+from typing import Dict, List
+import numpy as np
+from backend.core.config import settings
+from backend.core.vector_codec import decode_vector
+
+META_FIELDS = ("content", "parent_doc_id", "chunk_index")
+
+
+class CompanyIndex:
+    """Exact inner-product search over one company's L2-normalized vectors."""
+
+    def __init__(self, docs: List[dict], vectors: np.ndarray):
+        self.docs = docs
+        self.vectors = vectors.astype(np.float32, copy=False)
+
+    def add(self, docs: List[dict], vectors: np.ndarray):
+        self.docs = self.docs + docs
+        self.vectors = np.vstack([self.vectors, vectors.astype(np.float32, copy=False)])
+
+    def search(self, query: np.ndarray, k: int) -> List[dict]:
+        if not self.docs:
+            return []
+
+        sims = self.vectors @ query
+        k = min(k, len(self.docs))
+        top = np.argpartition(-sims, k - 1)[:k]
+        top = top[np.argsort(-sims[top])]
+
+        # Same scale as Atlas vectorSearchScore for cosine, so cascade
+        # thresholds apply unchanged to either retriever.
+        return [{**self.docs[i], "score": float((1 + sims[i]) / 2)} for i in top]
+
+    def __len__(self) -> int:
+        return len(self.docs)
+
+
+class LocalVectorIndex:
+    """
+    In-process replacement for an Atlas `$vectorSearch` index. Holds one
+    CompanyIndex per company and persists each as `company_<id>.npy` plus a
+    JSON sidecar with chunk ids and metadata.
+    """
+
+    def __init__(self, directory: Path, dim: int = 768):
+        self.directory = directory
+        self.dim = dim
+        self.companies: Dict[int, CompanyIndex] = {}
+        self._mtimes: Dict[int, float] = {}
+
+    def _paths(self, company_id: int):
+        return self.directory / f"company_{company_id}.npy", self.directory / f"company_{company_id}.json"
+
+    def save(self, company_id: int):
+        index = self.companies.get(company_id)
+        if index is None:
+            return
+        self.directory.mkdir(parents=True, exist_ok=True)
+        vectors_path, docs_path = self._paths(company_id)
+
+        tmp_vectors = vectors_path.with_name(f"{vectors_path.stem}.tmp.npy")
+        tmp_docs = docs_path.with_suffix(".json.tmp")
+        np.save(tmp_vectors, index.vectors)
+        tmp_docs.write_text(json.dumps(index.docs), encoding="utf-8")
+        os.replace(tmp_vectors, vectors_path)
+        os.replace(tmp_docs, docs_path)
+        self._mtimes[company_id] = docs_path.stat().st_mtime
+
+    def load(self, company_id: int) -> bool:
+        vectors_path, docs_path = self._paths(company_id)
+        if not vectors_path.exists() or not docs_path.exists():
+            return False
+
+        mtime = docs_path.stat().st_mtime
+        docs = json.loads(docs_path.read_text(encoding="utf-8"))
+        vectors = np.load(vectors_path, mmap_mode="r")
+        if len(docs) != vectors.shape[0]:
+            return False
+
+        self.companies[company_id] = CompanyIndex(docs, np.asarray(vectors))
+        self._mtimes[company_id] = mtime
+        return True
+
+    def _refresh(self, company_id: int):
+        # Ingestion runs in a separate process and rewrites the files; pick up its changes.
+        _, docs_path = self._paths(company_id)
+        try:
+            mtime = docs_path.stat().st_mtime
+        except FileNotFoundError:
+            return
+        if self._mtimes.get(company_id) != mtime:
+            self.load(company_id)
+
+    def add(self, company_id: int, docs: List[dict], vectors: List[List[float]], persist: bool = True):
+        if not docs:
+            return
+        if company_id not in self.companies:
+            self._refresh(company_id)
+
+        entries = [{"_id": str(d["_id"]), **{f: d.get(f) for f in META_FIELDS}} for d in docs]
+        matrix = np.asarray(vectors, dtype=np.float32).reshape(len(entries), self.dim)
+
+        index = self.companies.get(company_id)
+        if index is None:
+            self.companies[company_id] = CompanyIndex(entries, matrix)
+        else:
+            index.add(entries, matrix)
+
+        if persist:
+            self.save(company_id)
+
+    def search(self, company_id: int, query_vector: List[float], k: int) -> List[dict]:
+        self._refresh(company_id)
+        index = self.companies.get(company_id)
+        if index is None:
+            return []
+        return index.search(np.asarray(query_vector, dtype=np.float32), k)
+
+    async def load_or_build(self, collection):
+        """Loads persisted indexes, rebuilding any company whose chunk count no longer matches Mongo."""
+        company_ids = await collection.distinct("company_id")
+
+        for company_id in company_ids:
+            expected = await collection.count_documents({"company_id": company_id})
+            if self.load(company_id) and len(self.companies[company_id]) == expected:
+                continue
+            await self.rebuild(collection, company_id)
+
+        print(f"Local vector index ready: { {cid: len(idx) for cid, idx in self.companies.items()} }")
+
+    async def rebuild(self, collection, company_id: int, batch_size: int = 1000):
+        docs, vectors = [], []
+        projection = {"_id": 1, "embedding": 1, **{f: 1 for f in META_FIELDS}}
+        cursor = collection.find({"company_id": company_id}, projection, batch_size=batch_size)
+        async for doc in cursor:
+            docs.append(doc)
+            vectors.append(decode_vector(doc.pop("embedding")))
+
+        if not docs:
+            self.companies.pop(company_id, None)
+            return
+
+        entries = [{"_id": str(d["_id"]), **{f: d.get(f) for f in META_FIELDS}} for d in docs]
+        self.companies[company_id] = CompanyIndex(entries, np.asarray(vectors, dtype=np.float32).reshape(len(entries), self.dim))
+        self.save(company_id)
+
+    def clear(self):
+        for path in self.directory.glob("company_*"):
+            path.unlink()
+        self.companies.clear()
+        self._mtimes.clear()
+
+
+doc_index = LocalVectorIndex(Path(settings.LOCAL_INDEX_DIR) / "document_chunks")
@@ -0,0 +1,31 @@
+"""
+The suite runs against the in-memory stand-ins in backend.benchmarks.fakes:
+
+    python -m pytest backend/tests -q
+
+Settings are read and the CRUD modules bind their collections on first
+import, so the environment and the fakes are installed here, before any test
+module imports the code under test.
+"""
+import os
+
+os.environ.setdefault("POSTGRES_URI", "sqlite://")
+os.environ.setdefault("MONGO_URI", "mongodb://localhost:27017")
+os.environ.setdefault("MONGO_DB_NAME", "adaptive_genai_test")
+os.environ.setdefault("SECRET_KEY", "test")
+os.environ["LLM_PROVIDER"] = "stub"
+os.environ["EMBED_CACHE_DIR"] = ""
+os.environ["WARMUP_MODELS"] = "false"
+
+import pytest
+from backend.benchmarks.fakes import install_fakes
+
+fake_db = install_fakes(mongo=True, models=True)
+
+
+@pytest.fixture
+def mongo():
+    """The fake database, emptied before each test."""
+    for collection in fake_db.collections.values(): # type: ignore
+        collection.docs.clear()
+    return fake_db
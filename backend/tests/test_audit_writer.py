@@ -0,0 +1,110 @@
+import asyncio
+import time
+from typing import Any, List, Optional
+from backend.benchmarks.fakes import FakeEngine
+from backend.services.audit_writer import AuditWriter
+
+
+class RecordingEngine(FakeEngine):
+    """Keeps the size of every insert and rejects any insert that contains a negative rating, as a constraint would."""
+
+    def __init__(self):
+        super().__init__()
+        self.inserts: List[int] = []
+
+    def execute(self, statement: Any, rows: Optional[List[dict]] = None):
+        rows = rows or []
+        self.inserts.append(len(rows))
+        if any(row["rating"] < 0 for row in rows):
+            raise ValueError("rating violates check constraint")
+        super().execute(statement, rows)
+
+
+def writer(engine: FakeEngine, **kwargs) -> AuditWriter:
+    options = {"batch_size": 4, "max_wait_ms": 20, "max_queue": 100, "shutdown_timeout_s": 5}
+    return AuditWriter(engine, **{**options, **kwargs})
+
+
+def test_rows_are_written_in_batches_of_at_most_batch_size():
+    engine = RecordingEngine()
+    audit = writer(engine, max_wait_ms=1000)
+
+    async def run():
+        await audit.start()
+        for i in range(10):
+            audit.submit(1, f"event{i}", 1)
+        await audit.stop()
+
+    asyncio.run(run())
+    assert [row["mongo_event_id"] for row in engine.rows] == [f"event{i}" for i in range(10)]
+    assert engine.inserts == [4, 4, 2]
+    assert audit.stats()["batches"] == 3
+    assert audit.stats()["max_batch_size"] == 4
+
+
+def test_a_partial_batch_is_written_after_max_wait():
+    engine = RecordingEngine()
+    audit = writer(engine, max_wait_ms=20)
+
+    async def run():
+        await audit.start()
+        audit.submit(1, "event", 1)
+        await asyncio.sleep(0.3)
+        written = list(engine.rows)
+        await audit.stop()
+        return written
+
+    assert len(asyncio.run(run())) == 1
+    assert engine.inserts == [1]
+
+
+def test_stop_flushes_a_partial_batch_without_waiting_it_out():
+    engine = RecordingEngine()
+    audit = writer(engine, batch_size=100, max_wait_ms=60_000)
+
+    async def run():
+        await audit.start()
+        for i in range(5):
+            audit.submit(1, f"event{i}", 1)
+        await asyncio.sleep(0.05)
+        started = time.perf_counter()
+        await audit.stop()
+        audit.submit(1, "late", 1)
+        return time.perf_counter() - started
+
+    assert asyncio.run(run()) < 1
+    assert len(engine.rows) == 5
+    assert audit.stats()["written"] == 5
+    assert audit.stats()["dropped"] == 1
+
+
+def test_a_failed_batch_is_retried_row_by_row():
+    engine = RecordingEngine()
+    audit = writer(engine, max_wait_ms=1000)
+
+    async def run():
+        await audit.start()
+        for rating in (1, 1, -1, 1):
+            audit.submit(1, f"event{rating}", rating)
+        await audit.stop()
+
+    asyncio.run(run())
+    assert engine.inserts == [4, 1, 1, 1, 1]
+    assert [row["rating"] for row in engine.rows] == [1, 1, 1]
+    assert audit.stats()["written"] == 3
+    assert audit.stats()["failed"] == 1
+
+
+def test_rows_beyond_max_queue_are_dropped():
+    engine = RecordingEngine()
+    audit = writer(engine, max_queue=3)
+
+    async def run():
+        await audit.start()
+        for i in range(5):
+            audit.submit(1, f"event{i}", 1)
+        await audit.stop()
+
+    asyncio.run(run())
+    assert len(engine.rows) == 3
+    assert audit.stats()["dropped"] == 2
@@ -0,0 +1,65 @@
+import asyncio
+import time
+import pytest
+from backend.services.batching import MicroBatcher
+
+
+def test_concurrent_submits_share_batches_up_to_max_size():
+    sizes = []
+
+    def double(items):
+        sizes.append(len(items))
+        return [item * 2 for item in items]
+
+    async def run():
+        batcher = MicroBatcher(double, max_batch_size=4, max_wait_ms=50, name="test")
+        return batcher, await asyncio.gather(*(batcher.submit(i) for i in range(10)))
+
+    batcher, results = asyncio.run(run())
+    assert results == [i * 2 for i in range(10)]
+    assert sizes == [4, 4, 2]
+    assert batcher.stats()["batch_size_counts"] == {2: 1, 4: 2}
+
+
+def test_submit_many_keeps_order():
+    async def run():
+        batcher = MicroBatcher(lambda items: [s.upper() for s in items], max_batch_size=2, max_wait_ms=5, name="test")
+        return await batcher.submit_many(["a", "b", "c"])
+
+    assert asyncio.run(run()) == ["A", "B", "C"]
+
+
+def test_partial_batch_is_flushed_after_max_wait():
+    async def run():
+        batcher = MicroBatcher(lambda items: items, max_batch_size=100, max_wait_ms=20, name="test")
+        start = time.perf_counter()
+        result = await batcher.submit("x")
+        return result, time.perf_counter() - start
+
+    result, elapsed = asyncio.run(run())
+    assert result == "x"
+    assert elapsed < 1.0
+
+
+def test_batch_error_reaches_every_caller():
+    def fail(items):
+        raise ValueError("model failed")
+
+    async def run():
+        batcher = MicroBatcher(fail, max_batch_size=8, max_wait_ms=20, name="test")
+        results = await asyncio.gather(*(batcher.submit(i) for i in range(3)), return_exceptions=True)
+        # The worker survives a failed batch.
+        batcher.process_batch = lambda items: items
+        return results, await batcher.submit("ok")
+
+    results, after = asyncio.run(run())
+    assert all(isinstance(r, ValueError) for r in results)
+    assert after == "ok"
+
+
+def test_empty_submit_many_skips_the_worker():
+    async def run():
+        batcher = MicroBatcher(lambda items: pytest.fail("called"), max_batch_size=2, max_wait_ms=5, name="test")
+        return await batcher.submit_many([]), batcher.stats()["batches"]
+
+    assert asyncio.run(run()) == ([], 0)
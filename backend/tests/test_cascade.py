@@ -0,0 +1,41 @@
+from backend.services.cascade import cascade_candidates
+
+
+def hits(*scores):
+    return [{"id": i, "score": s} for i, s in enumerate(scores)]
+
+
+def ids(candidates):
+    return [c["id"] for c in candidates]
+
+
+def test_no_candidates():
+    assert cascade_candidates([], min_score=0.5, margin=0.1, max_candidates=5) == ([], [])
+
+
+def test_drops_hits_below_min_score_and_outside_margin():
+    accepted, ambiguous = cascade_candidates(hits(0.7, 0.9, 0.4, 0.85, 0.79), min_score=0.5, margin=0.1, max_candidates=10)
+    assert accepted == []
+    assert ids(ambiguous) == [1, 3]
+
+
+def test_min_score_wins_over_a_wide_margin():
+    _, ambiguous = cascade_candidates(hits(0.6, 0.45), min_score=0.5, margin=1.0, max_candidates=10)
+    assert ids(ambiguous) == [0]
+
+
+def test_accept_score_skips_the_cross_encoder():
+    accepted, ambiguous = cascade_candidates(hits(0.97, 0.9, 0.95), min_score=0.5, margin=0.2, max_candidates=10, accept_score=0.95)
+    assert ids(accepted) == [0, 2]
+    assert ids(ambiguous) == [1]
+
+
+def test_ambiguous_hits_are_capped_best_first():
+    _, ambiguous = cascade_candidates(hits(0.81, 0.84, 0.83, 0.82), min_score=0.5, margin=0.1, max_candidates=2)
+    assert ids(ambiguous) == [1, 2]
+
+
+def test_accepted_hits_are_not_capped():
+    accepted, ambiguous = cascade_candidates(hits(0.99, 0.98, 0.97), min_score=0.5, margin=0.1, max_candidates=1, accept_score=0.9)
+    assert ids(accepted) == [0, 1, 2]
+    assert ambiguous == []
@@ -0,0 +1,70 @@
+from backend.services.context_assembler import (
+    ContextSection,
+    assemble_context,
+    dedupe_sections,
+    fit_to_budget,
+    join_overlapping,
+    merge_adjacent,
+)
+
+
+def count_words(text: str) -> int:
+    return len(text.split())
+
+
+def chunk(text, score, parent=None, index=None, label="Doc"):
+    return ContextSection(label=label, text=text, score=score, source_ids=[f"{parent}:{index}"], parent_doc_id=parent, chunk_index=index)
+
+
+def test_join_overlapping_removes_the_shared_text():
+    assert join_overlapping("alpha beta gamma", "beta gamma delta") == "alpha beta gamma delta"
+    assert join_overlapping("alpha", "delta") == "alpha\ndelta"
+
+
+def test_dedupe_drops_repeated_and_contained_text_keeping_order():
+    low = chunk("refunds  take five days", 0.2)
+    high = chunk("Policy: refunds take five days to process.", 0.9)
+    other = chunk("shipping is free", 0.5)
+    assert dedupe_sections([low, high, other]) == [high, other]
+
+
+def test_merge_adjacent_joins_consecutive_chunks():
+    first = chunk("one two three", 0.4, "d1", 0)
+    unrelated = chunk("elsewhere", 0.6, "d2", 0)
+    second = chunk("two three four", 0.8, "d1", 1)
+    far = chunk("ten", 0.3, "d1", 5)
+
+    merged = merge_adjacent([first, unrelated, second, far])
+    assert [s.text for s in merged] == ["one two three four", "elsewhere", "ten"]
+    assert merged[0].score == 0.8
+    assert merged[0].source_ids == ["d1:0", "d1:1"]
+
+
+def test_merged_section_takes_the_first_position_of_its_chunks():
+    later = chunk("b c", 0.9, "d1", 1)
+    middle = chunk("x", 0.5)
+    earlier = chunk("a b", 0.1, "d1", 0)
+    merged = merge_adjacent([later, middle, earlier])
+    assert [s.text for s in merged] == ["a b c", "x"]
+
+
+def test_fit_to_budget_drops_lowest_scores_first():
+    sections = [chunk("a a a", 0.9), chunk("b b b", 0.1), chunk("c c c", 0.5)]
+    # Each renders as "[Doc]: x x x", four words.
+    kept, tokens = fit_to_budget(sections, budget=8, count_tokens=count_words)
+    assert [s.text for s in kept] == ["a a a", "c c c"]
+    assert tokens == 8
+
+
+def test_assemble_context():
+    sections = [
+        chunk("the plan covers dental", 0.7, "d1", 3),
+        chunk("covers dental and vision", 0.6, "d1", 4),
+        chunk("covers dental", 0.2),
+        chunk("unrelated filler text here", 0.1),
+    ]
+    context = assemble_context(sections, budget=9, count_tokens=count_words)
+    assert context.text == "[Doc]: the plan covers dental and vision"
+    assert context.source_ids == ["d1:3", "d1:4"]
+    assert context.dropped == 1
+    assert context.context_tokens == 7
@@ -0,0 +1,78 @@
+import re
+import pytest
+
+pytest.importorskip("unstructured.partition.docx")
+
+from backend.benchmarks.chunker_bench import check_overlapped, legacy_chunk_text
+from backend.services import document_processor
+from backend.services.document_processor import DocumentProcessor
+
+SPECIAL_TOKENS = 2
+
+
+class WordTokenizer:
+    """One token per word, with offsets, plus [CLS]/[SEP] like the real tokenizer."""
+
+    def __call__(self, text, add_special_tokens=True, return_offsets_mapping=False):
+        return {"offset_mapping": [m.span() for m in re.finditer(r"\S+", text)]}
+
+    def num_special_tokens_to_add(self):
+        return SPECIAL_TOKENS
+
+
+def count_tokens(text: str) -> int:
+    return len(text.split()) + SPECIAL_TOKENS
+
+
+@pytest.fixture(autouse=True)
+def word_tokenizer(monkeypatch):
+    monkeypatch.setattr(document_processor, "get_tokenizer", WordTokenizer)
+
+
+def sentence(n: int, words: int) -> str:
+    return " ".join(f"s{n}w{i}" for i in range(words)) + "."
+
+
+TEXT = " ".join(sentence(n, words) for n, words in enumerate([5, 9, 3, 12, 7, 4, 8, 2, 6, 10]))
+
+
+def test_empty_text():
+    assert DocumentProcessor.chunk_text("") == []
+
+
+@pytest.mark.parametrize("chunk_size", [8, 12, 20, 40])
+def test_without_overlap_reproduces_the_previous_chunker(chunk_size):
+    expected = legacy_chunk_text(TEXT, chunk_size, count_tokens)
+    assert DocumentProcessor.chunk_text(TEXT, chunk_size=chunk_size, overlap=0) == expected
+
+
+@pytest.mark.parametrize("chunk_size,overlap", [(16, 4), (20, 6), (30, 10)])
+def test_overlapped_chunks_fit_and_start_with_the_previous_tail(chunk_size, overlap):
+    chunks = DocumentProcessor.chunk_text(TEXT, chunk_size=chunk_size, overlap=overlap)
+    assert len(chunks) > 1
+    assert check_overlapped(chunks, chunk_size, overlap, count_tokens, DocumentProcessor._sentence_spans, tolerance=0) == []
+
+
+def test_overlap_check_rejects_chunks_without_overlap():
+    chunks = DocumentProcessor.chunk_text(TEXT, chunk_size=16, overlap=0)
+    assert check_overlapped(chunks, 16, 4, count_tokens, DocumentProcessor._sentence_spans, tolerance=0)
+    # Sharing only a trailing period is not an overlap.
+    chunks = ["alpha beta gamma delta.", ". epsilon zeta eta."]
+    assert check_overlapped(chunks, 10, 3, count_tokens, DocumentProcessor._sentence_spans, tolerance=0)
+
+
+def test_overlap_takes_whole_sentences_when_they_fit():
+    text = " ".join([sentence(0, 6), sentence(1, 2), sentence(2, 6)])
+    chunks = DocumentProcessor.chunk_text(text, chunk_size=12, overlap=3)
+    assert chunks == [f"{sentence(0, 6)} {sentence(1, 2)}", f"{sentence(1, 2)} {sentence(2, 6)}"]
+
+
+def test_oversized_sentence_is_its_own_chunk():
+    long = sentence(1, 30)
+    chunks = DocumentProcessor.chunk_text(f"{sentence(0, 3)} {long} {sentence(2, 3)}", chunk_size=10, overlap=0)
+    assert chunks == [sentence(0, 3), long, sentence(2, 3)]
+
+
+def test_sections_are_chunked_separately():
+    text = f"{sentence(0, 2)} {sentence(1, 2)}\n\n{sentence(2, 2)}"
+    assert DocumentProcessor.chunk_sections(text) == [f"{sentence(0, 2)} {sentence(1, 2)}", sentence(2, 2)]
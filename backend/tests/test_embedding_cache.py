@@ -0,0 +1,106 @@
+import hashlib
+import multiprocessing
+import numpy as np
+from backend.services.embedding_cache import EmbeddingCache, MmapVectorStore
+
+DIM = 4
+
+
+def vec(seed: int) -> list:
+    return [float(seed), seed + 0.5, -float(seed), 1.0]
+
+
+def store_key(n: int) -> str:
+    return hashlib.sha256(str(n).encode()).hexdigest()
+
+
+def test_lru_stays_within_its_byte_budget():
+    # Three float32 vectors of DIM 4 fit in 48 bytes.
+    cache = EmbeddingCache("m", max_bytes=48, dim=DIM)
+    for i in range(3):
+        cache.put(f"text {i}", vec(i))
+    assert cache.get("text 0") == vec(0)  # now the most recently used
+
+    cache.put("text 3", vec(3))
+
+    assert cache.get("text 1") is None
+    assert [cache.get(f"text {i}") for i in (0, 2, 3)] == [vec(0), vec(2), vec(3)]
+    stats = cache.stats()
+    assert (stats["evictions"], stats["memory_entries"], stats["memory_bytes"]) == (1, 3, 48)
+
+
+def test_keys_normalize_text_and_separate_models():
+    cache = EmbeddingCache("m", max_bytes=1 << 20, dim=DIM)
+    cache.put("  hello \n world ", vec(1))
+    assert cache.get("hello world") == vec(1)
+    assert EmbeddingCache("other", max_bytes=1 << 20, dim=DIM).key("hello world") != cache.key("hello world")
+
+
+def test_wrong_dimension_is_not_cached():
+    cache = EmbeddingCache("m", max_bytes=1 << 20, dim=DIM)
+    cache.put("text", [1.0, 2.0])
+    assert cache.get("text") is None
+
+
+def test_disk_tier_outlives_the_process_cache(tmp_path):
+    EmbeddingCache("m", max_bytes=1 << 20, directory=tmp_path, dim=DIM).put("text", vec(7))
+
+    cache = EmbeddingCache("m", max_bytes=1 << 20, directory=tmp_path, dim=DIM)
+    assert cache.get("text") == vec(7)
+    assert cache.get("text") == vec(7)
+    assert (cache.disk_hits, cache.memory_hits) == (1, 1)
+
+
+def test_partial_record_and_dimension_change_are_recovered(tmp_path):
+    store = MmapVectorStore(tmp_path, DIM)
+    store.put(store_key(1), np.array(vec(1)))
+    with open(tmp_path / "entries.bin", "ab") as f:
+        f.write(b"torn")
+
+    reopened = MmapVectorStore(tmp_path, DIM)
+    assert len(reopened) == 1
+    assert reopened.get(store_key(1)).tolist() == vec(1)
+
+    assert len(MmapVectorStore(tmp_path, DIM + 1)) == 0
+
+
+def _write_entries(directory, start: int, count: int):
+    store = MmapVectorStore(directory, DIM)
+    for n in range(start, start + count):
+        store.put(store_key(n), np.array(vec(n)))
+
+
+def _spawn(target, *args):
+    process = multiprocessing.get_context("spawn").Process(target=target, args=args)
+    process.start()
+    return process
+
+
+def test_reader_sees_entries_appended_by_another_process(tmp_path):
+    reader = MmapVectorStore(tmp_path, DIM)
+    assert reader.get(store_key(0)) is None
+
+    writer = _spawn(_write_entries, tmp_path, 0, 500)
+    # Reads made while the writer is appending see either nothing or the whole record.
+    while writer.is_alive():
+        for n in range(0, 500, 7):
+            found = reader.get(store_key(n))
+            assert found is None or found.tolist() == vec(n)
+    writer.join(timeout=60)
+    assert writer.exitcode == 0
+
+    assert [reader.get(store_key(n)).tolist() for n in range(500)] == [vec(n) for n in range(500)] # type: ignore
+    assert len(reader) == 500
+
+
+def test_concurrent_writers_keep_every_record_whole(tmp_path):
+    # Overlapping ranges: every key is written by two processes at once.
+    writers = [_spawn(_write_entries, tmp_path, start, 100) for start in (0, 50, 100, 150)]
+    for writer in writers:
+        writer.join(timeout=60)
+        assert writer.exitcode == 0
+
+    store = MmapVectorStore(tmp_path, DIM)
+    assert len(store) == 250
+    assert (tmp_path / "entries.bin").stat().st_size == 250 * store.record.itemsize
+    assert all(store.get(store_key(n)).tolist() == vec(n) for n in range(250)) # type: ignore
@@ -0,0 +1,136 @@
+import asyncio
+import itertools
+from datetime import datetime, UTC
+import pytest
+from bson import ObjectId
+from backend.crud import ai_crud
+from backend.services.feedback import apply_feedback_batch, process_ai_feedback
+from backend.services.math_utils import calculate_bayesian_rating, determine_status
+
+
+def add_response(mongo, company_id=1, **fields) -> str:
+    oid = ObjectId()
+    mongo.ai_responses.docs[oid] = {"_id": oid, "company_id": company_id, "status": "candidate", **fields}
+    return str(oid)
+
+
+def add_event(mongo, response_ids, company_id=1, **fields) -> str:
+    oid = ObjectId()
+    mongo.prompt_events.docs[oid] = {
+        "_id": oid, "user_id": 7, "company_id": company_id,
+        "ai_response_ids": [ObjectId(r) for r in response_ids], **fields
+    }
+    return str(oid)
+
+
+def response(mongo, res_id):
+    return mongo.ai_responses.docs.get(ObjectId(res_id))
+
+
+def company(mongo, company_id=1):
+    return next((d for d in mongo.company_stats.docs.values() if d["company_id"] == company_id), None)
+
+
+def python_score(reuse_count, rating_sum, count, added_sum, company_avg):
+    """The per-response computation process_ai_feedback did before it moved into MongoDB."""
+    new_v = reuse_count + count
+    new_rating_sum = rating_sum + added_sum
+    score = calculate_bayesian_rating(item_reviews_count=new_v, item_avg_rating=new_rating_sum / new_v, global_avg_rating=company_avg)
+    return new_v, new_rating_sum, score, determine_status(new_v, score)
+
+
+@pytest.mark.parametrize("company_avg", [1.0, 2.7, 3.5, 4.8])
+def test_pipeline_update_matches_python_scoring(mongo, company_avg):
+    states = [(None, None), (0, 0.0), (3, 12.0), (4, 6.0), (4, 17.0), (5, 10.0), (9, 40.0), (20, 50.0), (30, 120.0)]
+    added = [(1, 1.0), (1, 3.0), (1, 5.0), (3, 7.0), (6, 29.0)]
+
+    cases, updates = {}, {}
+    for (reuse_count, rating_sum), (count, added_sum) in itertools.product(states, added):
+        fields = {} if reuse_count is None else {"reuse_count": reuse_count, "rating_sum": rating_sum}
+        res_id = add_response(mongo, **fields)
+        cases[res_id] = python_score(reuse_count or 0, rating_sum or 0.0, count, added_sum, company_avg)
+        updates[res_id] = (count, added_sum)
+
+    deleted = asyncio.run(ai_crud.apply_response_feedback(updates, company_avg))
+
+    assert sorted(deleted) == sorted(res_id for res_id, (*_, status) in cases.items() if status == "DELETE")
+    for res_id, (reuse_count, rating_sum, score, status) in cases.items():
+        doc = response(mongo, res_id)
+        if status == "DELETE":
+            assert doc is None
+            continue
+        assert (doc["reuse_count"], doc["rating_sum"], doc["bayesian_score"], doc["status"]) == (reuse_count, rating_sum, score, status)
+
+
+def test_company_average_matches_python(mongo):
+    ratings = [5, 2, 4, 4, 1]
+    for i, rating in enumerate(ratings, 1):
+        avg = asyncio.run(ai_crud.update_company_stats(1, rating))
+        assert avg == sum(ratings[:i]) / i
+    assert asyncio.run(ai_crud.apply_company_feedback(1, 2, 9.0)) == (sum(ratings) + 9.0) / (len(ratings) + 2)
+
+
+def test_batch_applies_every_rating(mongo):
+    res_id = add_response(mongo)
+    first, second = add_event(mongo, [res_id]), add_event(mongo, [res_id])
+
+    result = asyncio.run(apply_feedback_batch([("r1", first, 1), ("r2", second, 4), ("r3", first, 5)]))
+
+    assert result == {"ratings": 3, "companies": 1, "responses": 1, "links": 3, "deleted": 0}
+    assert (company(mongo)["total_review_count"], company(mongo)["total_rating_sum"]) == (3, 10.0)
+    doc = response(mongo, res_id)
+    assert (doc["reuse_count"], doc["rating_sum"]) == (3, 10.0)
+    assert mongo.prompt_events.docs[ObjectId(first)]["feedback_applied"] == ["r1", "r3"]
+    assert mongo.prompt_events.docs[ObjectId(first)]["feedback_stages"] == {}
+
+
+def test_rerating_counts_the_same_as_the_direct_path(mongo):
+    """A re-rated event is applied again in both modes, with identical results."""
+    direct_res, batched_res = add_response(mongo, company_id=1), add_response(mongo, company_id=2)
+    direct_event, batched_event = add_event(mongo, [direct_res], company_id=1), add_event(mongo, [batched_res], company_id=2)
+
+    async def run():
+        for rating_id, rating in (("r1", 4), ("r2", 1), ("r3", 5)):
+            await process_ai_feedback(direct_event, rating)
+            await apply_feedback_batch([(rating_id, batched_event, rating)])
+
+    asyncio.run(run())
+
+    fields = ["total_review_count", "total_rating_sum", "company_avg_score"]
+    assert [company(mongo, 1)[f] for f in fields] == [company(mongo, 2)[f] for f in fields] == [3, 10.0, 10.0 / 3]
+    fields = ["reuse_count", "rating_sum", "bayesian_score", "status"]
+    assert [response(mongo, direct_res)[f] for f in fields] == [response(mongo, batched_res)[f] for f in fields]
+
+
+def test_replayed_rating_is_skipped(mongo):
+    res_id = add_response(mongo)
+    event_id = add_event(mongo, [res_id])
+    asyncio.run(apply_feedback_batch([("r1", event_id, 4)]))
+
+    result = asyncio.run(apply_feedback_batch([("r1", event_id, 4)]))
+
+    assert result["ratings"] == 0
+    assert company(mongo)["total_review_count"] == 1
+    assert response(mongo, res_id)["reuse_count"] == 1
+
+
+def test_retry_after_partial_failure_redoes_only_unfinished_stages(mongo):
+    res_id = add_response(mongo)
+    done = datetime.now(UTC)
+    # The company stage of an earlier attempt was written, its response stage was not.
+    event_id = add_event(mongo, [res_id], feedback_stages={"r1": {"company": done}})
+    mongo.company_stats.docs["c1"] = {"_id": "c1", "company_id": 1, "total_rating_sum": 2.0, "total_review_count": 1, "company_avg_score": 2.0}
+
+    asyncio.run(apply_feedback_batch([("r1", event_id, 2)]))
+
+    assert company(mongo)["total_review_count"] == 1
+    doc = response(mongo, res_id)
+    assert (doc["reuse_count"], doc["rating_sum"]) == (1, 2.0)
+    assert doc["bayesian_score"] == calculate_bayesian_rating(1, 2.0, 2.0)
+    assert mongo.prompt_events.docs[ObjectId(event_id)]["feedback_applied"] == ["r1"]
+
+
+def test_events_without_responses_are_ignored(mongo):
+    event_id = add_event(mongo, [])
+    assert asyncio.run(apply_feedback_batch([("r1", event_id, 5)]))["ratings"] == 0
+    assert company(mongo) is None
@@ -0,0 +1,145 @@
+import asyncio
+import json
+import pytest
+from bson import ObjectId
+from pymongo.errors import ConnectionFailure
+from backend.services import feedback_aggregator as aggregator_module
+from backend.services.feedback import apply_feedback_batch
+from backend.services.feedback_aggregator import FeedbackAggregator
+from backend.tests.test_feedback import add_event, add_response, company, response
+
+
+def make_aggregator(tmp_path, **kwargs) -> FeedbackAggregator:
+    return FeedbackAggregator(log_path=str(tmp_path / "feedback.log"), flush_interval_s=3600, max_pending=1000, **kwargs)
+
+
+def leftover_files(tmp_path):
+    return sorted(p.name for p in tmp_path.iterdir())
+
+
+def test_replays_the_log_of_a_dead_process(mongo, tmp_path):
+    res_id = add_response(mongo)
+    first, second = add_event(mongo, [res_id]), add_event(mongo, [res_id])
+    # A process that crashed: its lock is no longer held, and its last line was torn mid-write.
+    (tmp_path / "feedback.log.999999.lock").touch()
+    (tmp_path / "feedback.log.999999").write_text(
+        json.dumps({"id": "r1", "event_id": first, "rating": 5}) + "\n" + json.dumps({"id": "r2", "event_id": second, "rating": 3}) + "\n" + '{"id": "r3", "ev'
+    )
+
+    async def run():
+        aggregator = make_aggregator(tmp_path)
+        await aggregator.start()
+        stats = aggregator.stats()
+        await aggregator.stop()
+        return stats
+
+    stats = asyncio.run(run())
+    assert (stats["replayed"], stats["flushed"], stats["pending"]) == (2, 2, 0)
+    assert response(mongo, res_id)["rating_sum"] == 8.0
+    assert leftover_files(tmp_path) == []
+
+
+def test_failed_flush_keeps_ratings_and_retries_once(mongo, tmp_path, monkeypatch):
+    res_id = add_response(mongo)
+    event_id = add_event(mongo, [res_id])
+    calls = []
+
+    async def flaky(batch):
+        calls.append(batch)
+        if len(calls) == 1:
+            raise ConnectionFailure("primary stepped down")
+        return await apply_feedback_batch(batch)
+
+    monkeypatch.setattr(aggregator_module, "apply_feedback_batch", flaky)
+
+    async def run():
+        aggregator = make_aggregator(tmp_path)
+        await aggregator.start()
+        await aggregator.submit(event_id, 4)
+        await aggregator.flush()
+        failed = aggregator.stats()
+        segments = [p.name for p in tmp_path.glob("*.flushing")]
+        await aggregator.flush()
+        # Applying it again, as a replay after a crash before segment cleanup would, is a no-op.
+        await apply_feedback_batch(calls[-1])
+        await aggregator.stop()
+        return failed, segments, aggregator.stats()
+
+    failed, segments, stats = asyncio.run(run())
+    assert (failed["failures"], failed["pending"], failed["flushed"]) == (1, 1, 0)
+    assert len(segments) == 1
+    assert (stats["pending"], stats["flushed"]) == (0, 1)
+    assert company(mongo)["total_review_count"] == 1
+    assert response(mongo, res_id)["reuse_count"] == 1
+    assert leftover_files(tmp_path) == []
+
+
+def test_bad_rating_is_dead_lettered_after_max_attempts(mongo, tmp_path):
+    res_id = add_response(mongo)
+    good = add_event(mongo, [res_id])
+
+    async def run():
+        aggregator = make_aggregator(tmp_path, max_attempts=2)
+        await aggregator.start()
+        await aggregator.submit(good, 5)
+        await aggregator.submit("not-an-object-id", 1)
+        await aggregator.flush()
+        first = aggregator.stats()
+        await aggregator.flush()
+        await aggregator.stop()
+        return first, aggregator.stats()
+
+    first, stats = asyncio.run(run())
+    assert (first["pending"], first["dead_lettered"]) == (2, 0)
+    assert (stats["pending"], stats["dead_lettered"], stats["flushed"]) == (0, 1, 2)
+    assert response(mongo, res_id)["rating_sum"] == 5.0
+
+    dead = [json.loads(line) for line in (tmp_path / "feedback.log.deadletter").read_text().splitlines()]
+    assert [(d["event_id"], d["rating"]) for d in dead] == [("not-an-object-id", 1)]
+    assert leftover_files(tmp_path) == ["feedback.log.deadletter"]
+
+
+def test_unreachable_database_dead_letters_nothing(mongo, tmp_path, monkeypatch):
+    event_id = add_event(mongo, [add_response(mongo)])
+
+    async def down(batch):
+        raise ConnectionFailure("no servers available")
+
+    monkeypatch.setattr(aggregator_module, "apply_feedback_batch", down)
+
+    async def run():
+        aggregator = make_aggregator(tmp_path, max_attempts=1)
+        await aggregator.start()
+        await aggregator.submit(event_id, 3)
+        for _ in range(3):
+            await aggregator.flush()
+        await aggregator.stop()
+        return aggregator.stats()
+
+    stats = asyncio.run(run())
+    assert (stats["pending"], stats["dead_lettered"], stats["failures"]) == (1, 0, 4)
+    # The unflushed rating stays on disk for the next process to adopt.
+    assert any(name.endswith(".flushing") for name in leftover_files(tmp_path))
+    assert not (tmp_path / "feedback.log.deadletter").exists()
+
+
+def test_submit_requires_a_running_aggregator(tmp_path):
+    with pytest.raises(RuntimeError):
+        asyncio.run(make_aggregator(tmp_path).submit(str(ObjectId()), 5))
+
+
+def test_rerating_an_applied_event_counts_again(mongo, tmp_path):
+    res_id = add_response(mongo)
+    event_id = add_event(mongo, [res_id])
+
+    async def run():
+        aggregator = make_aggregator(tmp_path)
+        await aggregator.start()
+        await aggregator.submit(event_id, 4)
+        await aggregator.flush()
+        await aggregator.submit(event_id, 2)
+        await aggregator.stop()
+
+    asyncio.run(run())
+    assert company(mongo)["total_review_count"] == 2
+    assert (response(mongo, res_id)["reuse_count"], response(mongo, res_id)["rating_sum"]) == (2, 6.0)
@@ -0,0 +1,34 @@
+from backend.services.ingestion import diff_chunks
+
+
+def stored(*hashes):
+    return [{"_id": f"id{i}", "content_hash": h, "chunk_index": i} for i, h in enumerate(hashes)]
+
+
+def test_unchanged_document_needs_nothing():
+    assert diff_chunks(["a", "b", "c"], stored("a", "b", "c")) == ([], [], [])
+
+
+def test_inserted_chunk_is_new_and_the_rest_move():
+    new, moves, stale = diff_chunks(["x", "a", "b"], stored("a", "b"))
+    assert new == [0]
+    assert moves == [("id0", 1), ("id1", 2)]
+    assert stale == []
+
+
+def test_removed_and_edited_chunks_are_stale():
+    new, moves, stale = diff_chunks(["a", "c2"], stored("a", "b", "c"))
+    assert new == [1]
+    assert moves == []
+    assert sorted(stale) == ["id1", "id2"]
+
+
+def test_repeated_chunks_are_matched_one_to_one():
+    new, moves, stale = diff_chunks(["a", "a", "a"], stored("b", "a", "a"))
+    assert new == [2]
+    assert moves == [("id1", 0), ("id2", 1)]
+    assert stale == ["id0"]
+
+
+def test_new_document():
+    assert diff_chunks(["a", "b"], []) == ([0, 1], [], [])
@@ -0,0 +1,142 @@
+import asyncio
+from datetime import datetime, timedelta, UTC
+from pathlib import Path
+import pytest
+from backend.crud import ingestion_job_crud as crud
+from backend.services.ingestion_jobs import IngestionJobQueue, IngestionQueueFull
+
+
+def jobs(mongo):
+    return mongo.ingestion_jobs.docs
+
+
+async def queued_job(company_id: int = 1) -> dict:
+    job = await crud.reserve_job(company_id, 7, max_queued=100, reserve_s=60)
+    return await crud.queue_reserved_job(job["_id"], [{"name": "a", "path": "a.docx", "source": "a.docx"}]) # type: ignore
+
+
+def expire(mongo, job: dict):
+    jobs(mongo)[job["_id"]]["lease_expires_at"] = datetime.now(UTC) - timedelta(seconds=1)
+
+
+def test_claim_takes_the_oldest_queued_job_under_a_lease(mongo):
+    async def run():
+        first = await queued_job()
+        await queued_job()
+        claimed = await crud.claim_next_job("worker-a", lease_s=30)
+        return first, claimed
+
+    first, claimed = asyncio.run(run())
+    assert claimed["_id"] == first["_id"]
+    assert claimed["status"] == "running"
+    assert claimed["owner"] == "worker-a"
+    assert timedelta(seconds=25) < claimed["lease_expires_at"] - datetime.now(UTC) <= timedelta(seconds=30)
+
+
+def test_a_leased_job_is_not_claimed_twice(mongo):
+    async def run():
+        await queued_job()
+        return await crud.claim_next_job("worker-a", 30), await crud.claim_next_job("worker-b", 30)
+
+    claimed, second = asyncio.run(run())
+    assert claimed is not None
+    assert second is None
+
+
+def test_progress_renews_the_lease(mongo):
+    async def run():
+        await queued_job()
+        job = await crud.claim_next_job("worker-a", 30)
+        jobs(mongo)[job["_id"]]["lease_expires_at"] = datetime.now(UTC) + timedelta(seconds=1) # type: ignore
+        owned = await crud.update_job_progress(job["_id"], "worker-a", {"documents_done": 1}, 30) # type: ignore
+        return job, owned
+
+    job, owned = asyncio.run(run())
+    stored = jobs(mongo)[job["_id"]]
+    assert owned
+    assert stored["progress"] == {"documents_done": 1}
+    assert stored["lease_expires_at"] - datetime.now(UTC) > timedelta(seconds=25)
+
+
+def test_an_expired_lease_is_taken_over_and_the_old_owner_stops(mongo):
+    async def run():
+        await queued_job()
+        job = await crud.claim_next_job("worker-a", 30)
+        expire(mongo, job) # type: ignore
+        taken = await crud.claim_next_job("worker-b", 30)
+        owned = await crud.update_job_progress(job["_id"], "worker-a", {}, 30) # type: ignore
+        await crud.finish_job(job["_id"], "worker-a", "completed", {}, []) # type: ignore
+        return job, taken, owned
+
+    job, taken, owned = asyncio.run(run())
+    assert taken["_id"] == job["_id"]
+    assert taken["owner"] == "worker-b"
+    assert not owned
+    assert jobs(mongo)[job["_id"]]["status"] == "running"
+
+
+def test_a_released_job_is_claimed_again(mongo):
+    async def run():
+        await queued_job()
+        job = await crud.claim_next_job("worker-a", 30)
+        await crud.release_job(job["_id"], "worker-a") # type: ignore
+        return job, await crud.claim_next_job("worker-b", 30)
+
+    job, again = asyncio.run(run())
+    assert again["_id"] == job["_id"]
+    assert again["owner"] == "worker-b"
+
+
+def test_reservations_fill_the_queue_and_are_not_claimable(mongo):
+    async def run():
+        first = await crud.reserve_job(1, 7, max_queued=2, reserve_s=60)
+        second = await crud.reserve_job(1, 7, max_queued=2, reserve_s=60)
+        third = await crud.reserve_job(1, 7, max_queued=2, reserve_s=60)
+        return first, second, third, await crud.claim_next_job("worker-a", 30)
+
+    first, second, third, claimed = asyncio.run(run())
+    assert first is not None and second is not None
+    assert third is None
+    assert claimed is None
+    assert len(jobs(mongo)) == 2
+
+
+def test_racing_uploads_never_overfill_the_queue(mongo):
+    async def run():
+        await queued_job()
+        return await asyncio.gather(*(crud.reserve_job(1, 7, max_queued=3, reserve_s=60) for _ in range(8)))
+
+    admitted = [job for job in asyncio.run(run()) if job is not None]
+    assert len(admitted) <= 2
+    assert len(jobs(mongo)) == 1 + len(admitted)
+
+
+def test_cancelled_and_abandoned_reservations_free_their_slot(mongo):
+    async def run():
+        cancelled = await crud.reserve_job(1, 7, max_queued=2, reserve_s=60)
+        await crud.cancel_reservation(cancelled["_id"]) # type: ignore
+        abandoned = await crud.reserve_job(1, 7, max_queued=2, reserve_s=60)
+        expire(mongo, abandoned) # type: ignore
+        return [await crud.reserve_job(1, 7, max_queued=2, reserve_s=60) for _ in range(2)]
+
+    assert all(job is not None for job in asyncio.run(run()))
+
+
+def test_queue_reserves_before_submit(mongo):
+    queue = IngestionJobQueue(max_jobs=1, max_queued=1, parse_workers=1, report_interval_s=1, lease_s=30, poll_interval_s=1, reserve_s=60)
+
+    async def run():
+        with pytest.raises(IngestionQueueFull):
+            await queue.reserve(1, 7)
+        queue._wake = asyncio.Event()
+        reservation = await queue.reserve(1, 7)
+        with pytest.raises(IngestionQueueFull):
+            await queue.reserve(1, 7)
+        job = await queue.submit(reservation, [Path("uploads/abc/report.docx")])
+        return job, queue._wake.is_set()
+
+    job, woken = asyncio.run(run())
+    assert job["status"] == "queued"
+    assert [f["name"] for f in job["files"]] == ["report"]
+    assert woken
+    assert queue.stats()["queued"] == 1
@@ -0,0 +1,143 @@
+import asyncio
+import time
+import httpx
+import pytest
+from backend.services import llm_gateway
+from backend.services.llm_gateway import LLMGateway, StubProvider
+
+
+class FlakyStub(StubProvider):
+    """The stub provider, failing its first `failures` attempts with `error`."""
+
+    def __init__(self, failures: int = 0, error: Exception = httpx.ConnectError("refused"), fail_after_chunks: int = 0, **kwargs):
+        super().__init__(latency_ms=kwargs.pop("latency_ms", 0.0), token_ms=kwargs.pop("token_ms", 0.0), **kwargs)
+        self.failures = failures
+        self.error = error
+        self.fail_after_chunks = fail_after_chunks
+        self.attempts = 0
+
+    async def generate(self, model, prompt, config=None):
+        self.attempts += 1
+        if self.attempts <= self.failures:
+            raise self.error
+        return await super().generate(model, prompt, config)
+
+    async def stream(self, model, prompt, config=None):
+        self.attempts += 1
+        sent = 0
+        async for chunk in super().stream(model, prompt, config):
+            if self.attempts <= self.failures and sent == self.fail_after_chunks:
+                raise self.error
+            sent += 1
+            yield chunk
+
+
+def make_gateway(provider, timeout=5.0, max_retries=2, retry_base=0.001, max_concurrency=4) -> LLMGateway:
+    return LLMGateway(provider, max_concurrency=max_concurrency, timeout=timeout, max_retries=max_retries, retry_base=retry_base)
+
+
+async def consume(stream):
+    return [chunk async for chunk in stream]
+
+
+def test_transient_errors_are_retried_with_exponential_backoff(monkeypatch):
+    ranges = []
+    monkeypatch.setattr(llm_gateway.random, "uniform", lambda low, high: ranges.append((low, high)) or 0.0)
+    provider = FlakyStub(failures=2)
+    gateway = make_gateway(provider, retry_base=0.5)
+
+    text = asyncio.run(gateway.generate("prompt", "m"))
+
+    assert text == asyncio.run(StubProvider(0, 0).generate("m", "prompt")).text
+    assert ranges == [(0, 0.5), (0, 1.0)]
+    stats = gateway.stats()["models"]["m"]
+    assert (stats["calls"], stats["errors"], stats["retries"]) == (1, 2, 2)
+
+
+def test_retries_are_capped():
+    provider = FlakyStub(failures=5)
+    with pytest.raises(httpx.ConnectError):
+        asyncio.run(make_gateway(provider, max_retries=2).generate("prompt", "m"))
+    assert provider.attempts == 3
+
+
+def test_permanent_errors_are_not_retried():
+    provider = FlakyStub(failures=1, error=ValueError("bad request"))
+    with pytest.raises(ValueError):
+        asyncio.run(make_gateway(provider).generate("prompt", "m"))
+    assert provider.attempts == 1
+
+
+def test_each_attempt_is_bounded_by_the_timeout():
+    provider = FlakyStub(latency_ms=500)
+    gateway = make_gateway(provider, timeout=0.05, max_retries=1)
+    start = time.perf_counter()
+    with pytest.raises(asyncio.TimeoutError):
+        asyncio.run(gateway.generate("prompt", "m"))
+    assert time.perf_counter() - start < 0.4
+    assert gateway.stats()["models"]["m"]["timeouts"] == 2
+
+
+def test_deadline_stops_retries():
+    provider = FlakyStub(latency_ms=1000)
+    gateway = make_gateway(provider, timeout=10.0, max_retries=5)
+    start = time.perf_counter()
+    with pytest.raises(asyncio.TimeoutError):
+        asyncio.run(gateway.generate("prompt", "m", deadline=time.monotonic() + 0.1))
+    assert time.perf_counter() - start < 0.5
+    assert provider.attempts == 1
+
+
+def test_expired_deadline_fails_before_calling_the_provider():
+    provider = FlakyStub()
+    with pytest.raises(asyncio.TimeoutError):
+        asyncio.run(make_gateway(provider, max_retries=0).generate("prompt", "m", deadline=time.monotonic() - 1))
+    assert provider.attempts == 0
+
+
+def test_stream_is_retried_before_its_first_chunk():
+    provider = FlakyStub(failures=1, fail_after_chunks=0)
+    chunks = asyncio.run(consume(make_gateway(provider).stream("prompt", "m")))
+    assert "".join(chunks) == asyncio.run(StubProvider(0, 0).generate("m", "prompt")).text
+    assert provider.attempts == 2
+
+
+def test_stream_is_not_retried_after_its_first_chunk():
+    provider = FlakyStub(failures=1, fail_after_chunks=3)
+    received = []
+
+    async def run():
+        async for chunk in make_gateway(provider, max_retries=3).stream("prompt", "m"):
+            received.append(chunk)
+
+    with pytest.raises(httpx.ConnectError):
+        asyncio.run(run())
+    assert len(received) == 3
+    assert provider.attempts == 1
+
+
+def test_stream_timeout_bounds_the_whole_attempt():
+    provider = FlakyStub(token_ms=20)
+    gateway = make_gateway(provider, timeout=0.1, max_retries=2)
+    received = []
+
+    async def run():
+        async for chunk in gateway.stream("prompt", "m"):
+            received.append(chunk)
+
+    with pytest.raises(asyncio.TimeoutError):
+        asyncio.run(run())
+    assert 0 < len(received) < provider.answer_words
+    assert provider.attempts == 1
+
+
+def test_latency_excludes_the_wait_for_a_concurrency_slot():
+    gateway = make_gateway(FlakyStub(latency_ms=100), max_concurrency=1)
+
+    async def run():
+        await asyncio.gather(gateway.generate("a", "m"), gateway.generate("b", "m"))
+
+    asyncio.run(run())
+    stats = gateway.stats()["models"]["m"]
+    assert stats["max_latency_s"] < 0.18
+    assert stats["max_queue_wait_s"] >= 0.09
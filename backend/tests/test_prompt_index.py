@@ -0,0 +1,91 @@
+import asyncio
+from bson import ObjectId
+from backend.services.prompt_index import PromptIndex, normalize_prompt
+from backend.services.rag_pipeline import find_exact_answer
+
+
+def test_normalization_ignores_case_spacing_and_trailing_punctuation():
+    assert normalize_prompt("  How do I  RESET my password?! ") == normalize_prompt("how do i reset my password")
+    assert normalize_prompt("Ｗｉｆｉ？") == "wifi"
+
+
+def test_hit_miss_and_company_isolation(mongo):
+    index = PromptIndex(refresh_seconds=300)
+    response_id = str(ObjectId())
+
+    async def run():
+        await index.register(1, response_id, ["How do I reset my password?", "password reset"])
+        return [
+            await index.lookup(1, "how do i reset my password"),
+            await index.lookup(1, "PASSWORD RESET."),
+            await index.lookup(1, "how do i reset my email"),
+            await index.lookup(2, "password reset"),
+        ]
+
+    assert asyncio.run(run()) == [response_id, response_id, None, None]
+    assert (index.hits, index.misses) == (2, 2)
+
+
+def test_entries_from_another_worker_appear_after_the_refresh(mongo):
+    reader, writer = PromptIndex(refresh_seconds=0.05), PromptIndex(refresh_seconds=300)
+    response_id = str(ObjectId())
+
+    async def run():
+        before = await reader.lookup(1, "vacation policy")
+        await writer.register(1, response_id, ["vacation policy"])
+        cached = await reader.lookup(1, "vacation policy")
+        await asyncio.sleep(0.06)
+        return before, cached, await reader.lookup(1, "vacation policy")
+
+    assert asyncio.run(run()) == (None, None, response_id)
+
+
+def test_remove_response_drops_every_alias(mongo):
+    index = PromptIndex(refresh_seconds=300)
+    kept, removed = str(ObjectId()), str(ObjectId())
+
+    async def run():
+        await index.register(1, kept, ["expense limits"])
+        await index.register(1, removed, ["travel policy", "travel rules"])
+        await index.lookup(1, "travel policy")
+        await index.remove_response(removed)
+        fresh = PromptIndex(refresh_seconds=300)
+        return [
+            await index.lookup(1, "travel policy"),
+            await index.lookup(1, "travel rules"),
+            await index.lookup(1, "expense limits"),
+            await fresh.lookup(1, "travel rules"),
+        ]
+
+    assert asyncio.run(run()) == [None, None, kept, None]
+
+
+def test_rebuild_indexes_canonical_prompts_and_aliases(mongo):
+    oid = ObjectId()
+    mongo.ai_responses.docs[oid] = {"_id": oid, "company_id": 3, "canonical_prompt": "Who approves leave?", "aliases": ["leave approver"]}
+    index = PromptIndex(refresh_seconds=300)
+
+    async def run():
+        count = await index.rebuild()
+        return count, await index.lookup(3, "leave approver"), await index.lookup(3, "who approves leave")
+
+    assert asyncio.run(run()) == (1, str(oid), str(oid))
+
+
+def test_exact_answers_come_from_canonical_responses_only(mongo, monkeypatch):
+    from backend.services import rag_pipeline
+    index = PromptIndex(refresh_seconds=300)
+    monkeypatch.setattr(rag_pipeline, "prompt_index", index)
+    canonical, candidate = ObjectId(), ObjectId()
+    mongo.ai_responses.docs[canonical] = {"_id": canonical, "company_id": 1, "status": "canonical", "response": "yes"}
+    mongo.ai_responses.docs[candidate] = {"_id": candidate, "company_id": 1, "status": "candidate", "response": "maybe"}
+
+    async def run():
+        await index.register(1, str(canonical), ["is parking free"])
+        await index.register(1, str(candidate), ["is lunch free"])
+        await index.register(1, str(ObjectId()), ["is coffee free"])
+        return [await find_exact_answer(q, 1) for q in ("Is parking free?", "Is lunch free?", "Is coffee free?")]
+
+    found = asyncio.run(run())
+    assert found[0]["_id"] == canonical
+    assert found[1:] == [None, None]
@@ -0,0 +1,74 @@
+import asyncio
+import pytest
+from bson import ObjectId
+from backend.services import rag_pipeline
+from backend.services.rag_pipeline import RAGResult, stream_rag_pipeline
+
+
+async def collect(stream, limit=None):
+    items = []
+    async for item in stream:
+        items.append(item)
+        if limit is not None and len(items) == limit:
+            break
+    return items
+
+
+def events(mongo):
+    return list(mongo.prompt_events.docs.values())
+
+
+def test_completed_stream_keeps_its_linked_event(mongo):
+    items = asyncio.run(collect(stream_rag_pipeline("How many vacation days do I get?", user_id=1, company_id=1)))
+
+    result = items[-1]
+    assert isinstance(result, RAGResult)
+    assert "".join(items[:-1]) == result.response_text
+    [event] = events(mongo)
+    assert str(event["_id"]) == result.event_id
+    assert event["ai_response_ids"] == [ObjectId(result.ai_response_id)]
+
+
+def test_disconnected_stream_deletes_its_event(mongo):
+    async def run():
+        stream = stream_rag_pipeline("What is the remote work policy?", user_id=1, company_id=1)
+        first = await collect(stream, limit=1)
+        assert len(events(mongo)) == 1
+        await stream.aclose()
+        return first
+
+    assert len(asyncio.run(run())) == 1
+    assert events(mongo) == []
+
+
+def test_failed_generation_deletes_its_event(mongo, monkeypatch):
+    async def broken_llm(prompt, deadline=None):
+        yield "partial "
+        raise RuntimeError("provider dropped the stream")
+
+    monkeypatch.setattr(rag_pipeline, "stream_llm", broken_llm)
+
+    with pytest.raises(RuntimeError):
+        asyncio.run(collect(stream_rag_pipeline("Who approves expenses?", user_id=1, company_id=1)))
+    assert events(mongo) == []
+
+
+def test_cancelled_request_deletes_its_event(mongo, monkeypatch):
+    async def slow_llm(prompt, deadline=None):
+        yield "first "
+        await asyncio.sleep(60)
+        yield "never"
+
+    monkeypatch.setattr(rag_pipeline, "stream_llm", slow_llm)
+
+    async def run():
+        task = asyncio.create_task(collect(stream_rag_pipeline("Where is the office?", user_id=1, company_id=1)))
+        while not events(mongo):
+            await asyncio.sleep(0.01)
+        await asyncio.sleep(0.05)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(run())
+    assert events(mongo) == []
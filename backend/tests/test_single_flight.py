@@ -0,0 +1,73 @@
+import asyncio
+import pytest
+from backend.services.single_flight import SingleFlight
+
+
+def test_concurrent_calls_with_one_key_run_once():
+    calls = []
+
+    async def compute():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return "answer"
+
+    async def run():
+        flight = SingleFlight("test")
+        results = await asyncio.gather(*(flight.do("k", compute) for _ in range(5)))
+        return flight, results
+
+    flight, results = asyncio.run(run())
+    assert results == ["answer"] * 5
+    assert len(calls) == 1
+    stats = flight.stats()
+    assert (stats["leaders"], stats["followers"], stats["in_flight"]) == (1, 4, 0)
+
+
+def test_distinct_keys_run_separately():
+    async def run():
+        flight = SingleFlight("test")
+
+        async def compute(key):
+            await asyncio.sleep(0.01)
+            return key
+
+        return await asyncio.gather(*(flight.do(k, lambda k=k: compute(k)) for k in ("a", "b", "a")))
+
+    assert asyncio.run(run()) == ["a", "b", "a"]
+
+
+def test_error_reaches_followers_and_key_is_released():
+    async def fail():
+        await asyncio.sleep(0.01)
+        raise RuntimeError("upstream")
+
+    async def ok():
+        return "retried"
+
+    async def run():
+        flight = SingleFlight("test")
+        results = await asyncio.gather(flight.do("k", fail), flight.do("k", fail), return_exceptions=True)
+        return results, await flight.do("k", ok)
+
+    results, retried = asyncio.run(run())
+    assert all(isinstance(r, RuntimeError) for r in results)
+    assert retried == "retried"
+
+
+def test_cancelled_caller_does_not_cancel_shared_work():
+    async def compute():
+        await asyncio.sleep(0.05)
+        return "done"
+
+    async def run():
+        flight = SingleFlight("test")
+        leader = asyncio.create_task(flight.do("k", compute))
+        await asyncio.sleep(0)
+        follower = asyncio.create_task(flight.do("k", compute))
+        await asyncio.sleep(0.01)
+        leader.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        return await follower
+
+    assert asyncio.run(run()) == "done"
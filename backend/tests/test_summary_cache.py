@@ -0,0 +1,87 @@
+import asyncio
+from datetime import datetime, timedelta, UTC
+import pytest
+from pymongo.errors import OperationFailure
+from backend.crud import summary_cache_crud
+from backend.services import summary_cache as summary_cache_module
+from backend.services.summary_cache import SummaryCache, summary_key
+
+
+@pytest.fixture
+def summarizer(monkeypatch):
+    calls = []
+
+    async def summarize(text: str) -> str:
+        calls.append(text)
+        return f"summary of {text[:20]}"
+
+    monkeypatch.setattr(summary_cache_module, "summarize", summarize)
+    return calls
+
+
+def entries(mongo):
+    return mongo.summary_cache.docs
+
+
+def test_repeated_text_is_summarized_once(mongo, summarizer):
+    cache = SummaryCache(ttl_seconds=60, max_bytes=1 << 20)
+
+    async def run():
+        return [await cache.summarize(t) for t in ("long text one", "  long text one\n", "long text two")]
+
+    results = asyncio.run(run())
+    assert results[0] == results[1]
+    assert summarizer == ["long text one", "long text two"]
+    assert (cache.hits, cache.misses) == (1, 2)
+
+
+def test_a_hit_renews_the_entry_the_ttl_index_expires(mongo, summarizer):
+    cache = SummaryCache(ttl_seconds=60, max_bytes=1 << 20)
+    asyncio.run(cache.summarize("text"))
+    entry = entries(mongo)[summary_key("text")]
+    entry["last_used_at"] = datetime.now(UTC) - timedelta(seconds=50)
+
+    asyncio.run(cache.summarize("text"))
+
+    assert datetime.now(UTC) - entry["last_used_at"] < timedelta(seconds=5)
+    assert entry["hits"] == 1
+
+
+def test_ttl_index_is_created_and_updated_when_the_ttl_changes(mongo, monkeypatch):
+    calls = []
+
+    async def create_index(key, **kwargs):
+        calls.append(("create_index", key, kwargs))
+        if len(calls) > 1:
+            raise OperationFailure("IndexOptionsConflict")
+
+    async def command(name, *args, **kwargs):
+        calls.append((name, args, kwargs))
+
+    monkeypatch.setattr(summary_cache_crud.summary_cache_col, "create_index", create_index)
+    monkeypatch.setattr(summary_cache_crud.mongo_db, "command", command)
+
+    asyncio.run(summary_cache_crud.ensure_summary_cache_indexes(60))
+    asyncio.run(summary_cache_crud.ensure_summary_cache_indexes(120))
+
+    assert calls[0] == ("create_index", "last_used_at", {"expireAfterSeconds": 60})
+    assert calls[2] == ("collMod", ("summary_cache",), {"index": {"keyPattern": {"last_used_at": 1}, "expireAfterSeconds": 120}})
+
+
+def test_least_recently_used_summaries_are_evicted_over_budget(mongo, summarizer):
+    # Every summary here is 31 bytes, so four exceed the budget and eviction frees down to 90.
+    cache = SummaryCache(ttl_seconds=60, max_bytes=100)
+    texts = [f"text {i} padding padding" for i in range(4)]
+
+    async def run():
+        for i, text in enumerate(texts[:3]):
+            await cache.summarize(text)
+            entries(mongo)[summary_key(text)]["last_used_at"] = datetime.now(UTC) - timedelta(days=3 - i)
+        await cache.summarize(texts[0])  # most recently used again
+        await cache.summarize(texts[3])
+
+    asyncio.run(run())
+    remaining = {doc["_id"] for doc in entries(mongo).values()}
+    assert remaining == {summary_key(texts[0]), summary_key(texts[3])}
+    assert cache.evictions == 2
+    assert sum(doc["size_bytes"] for doc in entries(mongo).values()) <= 90
@@ -0,0 +1,58 @@
+import bson
+import numpy as np
+import pytest
+from bson.binary import Binary, BinaryVectorDtype
+from pydantic import BaseModel
+from backend.core.vector_codec import FLOAT16_SUBTYPE, VECTOR_SUBTYPE, Embedding, decode_vector, encode_vector
+
+VECTOR = [0.25, -1.5, 3.0, 0.1]
+
+
+def roundtrip(value):
+    """Through BSON bytes, as a value read back from MongoDB."""
+    return bson.decode(bson.encode({"v": value}))["v"]
+
+
+def test_float32_is_a_bson_vector():
+    encoded = encode_vector(VECTOR, "float32")
+    assert encoded.subtype == VECTOR_SUBTYPE
+    assert encoded == Binary.from_vector(VECTOR, BinaryVectorDtype.FLOAT32)
+    decoded = decode_vector(roundtrip(encoded))
+    assert decoded.dtype == np.float32
+    assert decoded.tolist() == np.asarray(VECTOR, dtype=np.float32).tolist()
+
+
+def test_float16_uses_its_own_subtype():
+    encoded = encode_vector(VECTOR, "float16")
+    assert encoded.subtype == FLOAT16_SUBTYPE
+    assert len(encoded) == 2 * len(VECTOR)
+    decoded = decode_vector(roundtrip(encoded))
+    assert decoded.dtype == np.float32
+    np.testing.assert_allclose(decoded, VECTOR, rtol=1e-3)
+
+
+def test_array_format_stays_a_list():
+    assert encode_vector(np.asarray(VECTOR), "array") == VECTOR
+    assert decode_vector(VECTOR).tolist() == np.asarray(VECTOR, dtype=np.float32).tolist()
+
+
+def test_other_bson_vector_dtypes_are_rejected():
+    with pytest.raises(ValueError, match="dtype"):
+        decode_vector(Binary.from_vector([1, 2, 3], BinaryVectorDtype.INT8))
+
+
+def test_unknown_subtype_and_format_are_rejected():
+    with pytest.raises(ValueError, match="subtype"):
+        decode_vector(Binary(b"\x00\x00", 0))
+    with pytest.raises(ValueError, match="format"):
+        encode_vector(VECTOR, "int8")
+
+
+def test_embedding_field_accepts_every_stored_format():
+    class Doc(BaseModel):
+        embedding: Embedding
+
+    expected = np.asarray(VECTOR, dtype=np.float32).tolist()
+    assert Doc(embedding=encode_vector(VECTOR, "float32")).embedding == expected
+    assert Doc(embedding=VECTOR).embedding == VECTOR
+    np.testing.assert_allclose(Doc(embedding=encode_vector(VECTOR, "float16")).embedding, VECTOR, rtol=1e-3)
@@ -0,0 +1,87 @@
+import asyncio
+import os
+import numpy as np
+import pytest
+from bson import ObjectId
+from backend.core.vector_codec import encode_vector
+from backend.services.vector_index import LocalVectorIndex
+
+DIM = 8
+
+
+def unit_vectors(n: int, seed: int = 0) -> np.ndarray:
+    vectors = np.random.default_rng(seed).normal(size=(n, DIM)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def chunk_docs(n: int) -> list:
+    return [{"_id": ObjectId(), "content": f"chunk {i}", "parent_doc_id": "doc", "chunk_index": i} for i in range(n)]
+
+
+def brute_force(vectors: np.ndarray, query: np.ndarray, k: int):
+    sims = vectors @ query
+    order = np.argsort(-sims)[:k]
+    return order.tolist(), ((1 + sims[order]) / 2).tolist()
+
+
+def test_search_matches_brute_force(tmp_path):
+    vectors, docs = unit_vectors(200), chunk_docs(200)
+    index = LocalVectorIndex(tmp_path, dim=DIM)
+    index.add(1, docs, vectors.tolist(), persist=False)
+
+    for query in unit_vectors(10, seed=1):
+        hits = index.search(1, query.tolist(), k=5)
+        order, scores = brute_force(vectors, query, 5)
+        assert [h["chunk_index"] for h in hits] == order
+        np.testing.assert_allclose([h["score"] for h in hits], scores, rtol=1e-6)
+        assert all(0.0 <= h["score"] <= 1.0 for h in hits)
+
+
+def test_k_larger_than_the_index_and_unknown_company(tmp_path):
+    index = LocalVectorIndex(tmp_path, dim=DIM)
+    index.add(1, chunk_docs(3), unit_vectors(3).tolist(), persist=False)
+    assert len(index.search(1, unit_vectors(1)[0].tolist(), k=10)) == 3
+    assert index.search(2, unit_vectors(1)[0].tolist(), k=10) == []
+
+
+def test_companies_are_searched_separately(tmp_path):
+    index = LocalVectorIndex(tmp_path, dim=DIM)
+    vectors = unit_vectors(2)
+    index.add(1, chunk_docs(1), vectors[:1].tolist(), persist=False)
+    index.add(2, chunk_docs(1), vectors[1:].tolist(), persist=False)
+    hits = index.search(1, vectors[1].tolist(), k=5)
+    assert len(hits) == 1
+    assert hits[0]["score"] < 1.0
+
+
+def test_persisted_index_is_picked_up_by_another_instance(tmp_path):
+    vectors, docs = unit_vectors(20), chunk_docs(20)
+    writer = LocalVectorIndex(tmp_path, dim=DIM)
+    writer.add(1, docs[:10], vectors[:10].tolist())
+    reader = LocalVectorIndex(tmp_path, dim=DIM)
+    assert len(reader.search(1, vectors[0].tolist(), k=20)) == 10
+
+    writer.add(1, docs[10:], vectors[10:].tolist())
+    # Rewriting within the same mtime tick would go unnoticed; force a new mtime.
+    docs_path = tmp_path / "company_1.json"
+    stat = docs_path.stat()
+    os.utime(docs_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+
+    hits = reader.search(1, vectors[15].tolist(), k=1)
+    assert hits[0]["_id"] == str(docs[15]["_id"])
+    assert hits[0]["score"] == pytest.approx(1.0)
+
+
+def test_load_or_build_rebuilds_from_any_stored_format(mongo, tmp_path):
+    vectors, docs = unit_vectors(6), chunk_docs(6)
+    for doc, vector, fmt in zip(docs, vectors, ["array", "float32", "float16"] * 2):
+        mongo.document_chunks.docs[doc["_id"]] = {**doc, "company_id": 1, "embedding": encode_vector(vector, fmt)}
+
+    index = LocalVectorIndex(tmp_path, dim=DIM)
+    index.add(1, docs[:2], vectors[:2].tolist())  # stale: fewer chunks than Mongo holds
+    asyncio.run(LocalVectorIndex(tmp_path, dim=DIM).load_or_build(mongo.document_chunks))
+
+    rebuilt = LocalVectorIndex(tmp_path, dim=DIM)
+    assert rebuilt.load(1)
+    assert len(rebuilt.companies[1]) == 6
+    assert rebuilt.search(1, vectors[4].tolist(), k=1)[0]["_id"] == str(docs[4]["_id"])